@@ -0,0 +1,133 @@
+USE smart_university;
+
+-- ==========================================
+-- Running GPA totals (Student_Profiles.quality_points)
+-- ==========================================
+
+ALTER TABLE Student_Profiles
+    ADD COLUMN quality_points DECIMAL(8,2) NOT NULL DEFAULT 0.00 AFTER credits_earned;
+
+-- Filled in by the grade points section below; the API keeps them current
+-- afterwards.
+
+-- ==========================================
+-- Numeric grade points (Enrollments.grade_points)
+-- ==========================================
+
+ALTER TABLE Enrollments
+    ADD COLUMN grade_points DECIMAL(3,2) AFTER grade,
+    ADD INDEX idx_enrollments_student_points (student_id, grade_points),
+    ADD INDEX idx_enrollments_section_points (section_id, completion_status, grade_points);
+
+-- Default scale; with a custom GRADE_SCALE run `python -m src.grade_scale` instead.
+UPDATE Enrollments
+SET grade_points = CASE grade
+    WHEN 'AA' THEN 4.0
+    WHEN 'BA' THEN 3.5
+    WHEN 'BB' THEN 3.0
+    WHEN 'CB' THEN 2.5
+    WHEN 'CC' THEN 2.0
+    WHEN 'DC' THEN 1.5
+    WHEN 'DD' THEN 1.0
+    WHEN 'FD' THEN 0.5
+    WHEN 'FF' THEN 0.0
+    WHEN 'VF' THEN 0.0
+    ELSE NULL
+END
+WHERE grade IS NOT NULL;
+
+-- Rebuild every student's totals once from the numeric points.
+UPDATE Student_Profiles sp
+LEFT JOIN (
+    SELECT
+        e.student_id,
+        SUM(e.grade_points * c.credits) AS points,
+        SUM(c.credits) AS credits
+    FROM Enrollments e
+    JOIN Course_Sections s ON e.section_id = s.section_id
+    JOIN Courses c ON s.course_id = c.course_id
+    WHERE e.grade_points IS NOT NULL
+    GROUP BY e.student_id
+) g ON g.student_id = sp.student_id
+SET sp.quality_points = COALESCE(g.points, 0),
+    sp.credits_earned = COALESCE(g.credits, 0),
+    sp.current_gpa = IF(COALESCE(g.credits, 0) > 0, ROUND(g.points / g.credits, 2), 0);
+
+-- ==========================================
+-- Attendance bitmaps (Attendance_Bitmaps)
+-- ==========================================
+
+CREATE TABLE Attendance_Bitmaps (
+    section_id INT NOT NULL,
+    student_id INT NOT NULL,
+    term_year SMALLINT NOT NULL,
+    -- bit n (little-endian) = day n of term_year, see src/attendance_bitmaps.py
+    present BINARY(46) NOT NULL,
+    absent BINARY(46) NOT NULL,
+    excused BINARY(46) NOT NULL,
+    late BINARY(46) NOT NULL,
+
+    PRIMARY KEY (section_id, student_id, term_year),
+    FOREIGN KEY (section_id) REFERENCES Course_Sections(section_id) ON DELETE CASCADE,
+    FOREIGN KEY (student_id) REFERENCES Users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Bitmaps for the existing rows; `python -m src.attendance_bitmaps` does the
+-- same rebuild later on.
+INSERT INTO Attendance_Bitmaps (section_id, student_id, term_year, present, absent, excused, late)
+SELECT
+    section_id,
+    student_id,
+    term_year,
+    BIT_OR(IF(status = 'Present', mask, zero)),
+    BIT_OR(IF(status = 'Absent', mask, zero)),
+    BIT_OR(IF(status = 'Excused', mask, zero)),
+    BIT_OR(IF(status = 'Late', mask, zero))
+FROM (
+    SELECT
+        section_id,
+        student_id,
+        status,
+        YEAR(attendance_date) AS term_year,
+        REPEAT(X'00', 46) AS zero,
+        -- 46-byte little-endian bitmap with only this day's bit set
+        CONCAT(
+            REPEAT(X'00', (DAYOFYEAR(attendance_date) - 1) DIV 8),
+            CHAR(1 << ((DAYOFYEAR(attendance_date) - 1) % 8) USING binary),
+            REPEAT(X'00', 45 - (DAYOFYEAR(attendance_date) - 1) DIV 8)
+        ) AS mask
+    FROM Attendance
+) a
+GROUP BY section_id, student_id, term_year;
+
+-- ==========================================
+-- Badge reader cards (Users.card_id)
+-- ==========================================
+
+ALTER TABLE Users
+    ADD COLUMN card_id VARCHAR(32) UNIQUE;
+
+-- ==========================================
+-- Content-addressed submission files (Submission_Blobs)
+-- ==========================================
+
+CREATE TABLE Submission_Blobs (
+    digest CHAR(64) PRIMARY KEY,   -- sha256 of the file, see src/blob_store.py
+    size BIGINT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- ==========================================
+-- MinHash signatures for similarity screening (Submission_Signatures)
+-- ==========================================
+
+CREATE TABLE Submission_Signatures (
+    submission_id INT PRIMARY KEY,
+    assignment_id INT NOT NULL,
+    shingle_count INT NOT NULL,
+    signature VARBINARY(1024),     -- 128 x uint64 MinHash values, see src/similarity.py
+
+    FOREIGN KEY (submission_id) REFERENCES Submissions(submission_id) ON DELETE CASCADE,
+    INDEX idx_signatures_assignment (assignment_id)
+) ENGINE=InnoDB;
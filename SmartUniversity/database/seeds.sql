@@ -59,24 +59,42 @@ INSERT INTO Course_Sections (section_id, course_id, instructor_id, semester, yea
 -- =======================================================
 
 -- Omer: Taking Database course (Ongoing)
-INSERT INTO Enrollments (student_id, section_id, grade, completion_status) VALUES
-(4, 2, NULL, 'Enrolled');
+INSERT INTO Enrollments (student_id, section_id, grade, grade_points, completion_status) VALUES
+(4, 2, NULL, NULL, 'Enrolled');
 
 -- Mehmet: Taking Database course (Ongoing)
-INSERT INTO Enrollments (student_id, section_id, grade, completion_status) VALUES
-(5, 2, NULL, 'Enrolled');
+INSERT INTO Enrollments (student_id, section_id, grade, grade_points, completion_status) VALUES
+(5, 2, NULL, NULL, 'Enrolled');
 
 -- PAST COURSE SCENARIO: Omer passed CS101 (Grade: AA)
-INSERT INTO Enrollments (student_id, section_id, grade, completion_status) VALUES
-(4, 1, 'AA', 'Completed');
+INSERT INTO Enrollments (student_id, section_id, grade, grade_points, completion_status) VALUES
+(4, 1, 'AA', 4.00, 'Completed');
 
 -- FAILURE SCENARIO: Mehmet failed CS101 (Grade: FF)
-INSERT INTO Enrollments (student_id, section_id, grade, completion_status) VALUES
-(5, 1, 'FF', 'Completed');
+INSERT INTO Enrollments (student_id, section_id, grade, grade_points, completion_status) VALUES
+(5, 1, 'FF', 0.00, 'Completed');
 
 -- CROSS-DEPARTMENT SCENARIO: Omer (Comp. Eng) taking Architecture course
-INSERT INTO Enrollments (student_id, section_id, grade, completion_status) VALUES
-(4, 3, NULL, 'Enrolled');
+INSERT INTO Enrollments (student_id, section_id, grade, grade_points, completion_status) VALUES
+(4, 3, NULL, NULL, 'Enrolled');
+
+-- GPA totals from the seeded grades, as migrations.sql does. The API only
+-- applies deltas to quality_points, so they have to start out consistent.
+UPDATE Student_Profiles sp
+LEFT JOIN (
+    SELECT
+        e.student_id,
+        SUM(e.grade_points * c.credits) AS points,
+        SUM(c.credits) AS credits
+    FROM Enrollments e
+    JOIN Course_Sections s ON e.section_id = s.section_id
+    JOIN Courses c ON s.course_id = c.course_id
+    WHERE e.grade_points IS NOT NULL
+    GROUP BY e.student_id
+) g ON g.student_id = sp.student_id
+SET sp.quality_points = COALESCE(g.points, 0),
+    sp.credits_earned = COALESCE(g.credits, 0),
+    sp.current_gpa = IF(COALESCE(g.credits, 0) > 0, ROUND(g.points / g.credits, 2), 0);
 
 -- =======================================================
 -- 7. ASSIGNMENTS & SUBMISSIONS
@@ -102,6 +120,34 @@ INSERT INTO Attendance (section_id, student_id, attendance_date, status) VALUES
 (2, 4, '2024-10-25', 'Present'), -- Omer was present
 (2, 5, '2024-10-25', 'Absent');  -- Mehmet was absent
 
+-- Bitmaps for the seeded rows, as migrations.sql builds them. The attendance
+-- analytics only read Attendance_Bitmaps.
+INSERT INTO Attendance_Bitmaps (section_id, student_id, term_year, present, absent, excused, late)
+SELECT
+    section_id,
+    student_id,
+    term_year,
+    BIT_OR(IF(status = 'Present', mask, zero)),
+    BIT_OR(IF(status = 'Absent', mask, zero)),
+    BIT_OR(IF(status = 'Excused', mask, zero)),
+    BIT_OR(IF(status = 'Late', mask, zero))
+FROM (
+    SELECT
+        section_id,
+        student_id,
+        status,
+        YEAR(attendance_date) AS term_year,
+        REPEAT(X'00', 46) AS zero,
+        -- 46-byte little-endian bitmap with only this day's bit set
+        CONCAT(
+            REPEAT(X'00', (DAYOFYEAR(attendance_date) - 1) DIV 8),
+            CHAR(1 << ((DAYOFYEAR(attendance_date) - 1) % 8) USING binary),
+            REPEAT(X'00', 45 - (DAYOFYEAR(attendance_date) - 1) DIV 8)
+        ) AS mask
+    FROM Attendance
+) a
+GROUP BY section_id, student_id, term_year;
+
 -- =======================================================
 -- 9. ANNOUNCEMENTS
 -- =======================================================
@@ -7,7 +7,8 @@ CREATE TABLE Users (
     password_hash VARCHAR(255) NOT NULL,           -- 
     role ENUM('Student', 'Instructor', 'Admin') NOT NULL, -- 
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- 
-    is_active BOOLEAN DEFAULT TRUE                 --  (soft delete)
+    is_active BOOLEAN DEFAULT TRUE,                --  (soft delete)
+    card_id VARCHAR(32) UNIQUE                     -- badge reader card
 )ENGINE=InnoDB;
 
 CREATE TABLE Departments (
@@ -24,6 +25,7 @@ CREATE TABLE Student_Profiles (
     admission_year YEAR,
     current_gpa DECIMAL(3,2) DEFAULT 0.00,
     credits_earned INT DEFAULT 0,
+    quality_points DECIMAL(8,2) NOT NULL DEFAULT 0.00,
     
     FOREIGN KEY (student_id) REFERENCES Users(user_id) ON DELETE CASCADE,
     FOREIGN KEY (department_id) REFERENCES Departments(department_id),
@@ -93,11 +95,14 @@ CREATE TABLE Enrollments (
     section_id INT NOT NULL,
 	enrollment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP, 
     grade VARCHAR(2), -- 'AA', 'BA', 'FF' 
+    grade_points DECIMAL(3,2), -- numeric value of grade, see src/grade_scale.py
     completion_status ENUM('Enrolled', 'Completed', 'Dropped', 'Failed') DEFAULT 'Enrolled',
     FOREIGN KEY (student_id) REFERENCES Users(user_id) ON DELETE CASCADE,
     FOREIGN KEY (section_id) REFERENCES Course_Sections(section_id) ON DELETE CASCADE,
     
-    UNIQUE (student_id, section_id)
+    UNIQUE (student_id, section_id),
+    INDEX idx_enrollments_student_points (student_id, grade_points),
+    INDEX idx_enrollments_section_points (section_id, completion_status, grade_points)
 ) ENGINE=InnoDB;
 
 CREATE TABLE Assignments (
@@ -132,6 +137,25 @@ CREATE TABLE Submissions (
     
 ) ENGINE=InnoDB;
 
+CREATE TABLE Submission_Blobs (
+    digest CHAR(64) PRIMARY KEY,   -- sha256 of the file, see src/blob_store.py
+    size BIGINT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+CREATE TABLE Submission_Signatures (
+    submission_id INT PRIMARY KEY,
+    assignment_id INT NOT NULL,
+    shingle_count INT NOT NULL,
+    signature VARBINARY(1024),     -- 128 x uint64 MinHash values, see src/similarity.py
+
+    FOREIGN KEY (submission_id) REFERENCES Submissions(submission_id) ON DELETE CASCADE,
+    INDEX idx_signatures_assignment (assignment_id)
+) ENGINE=InnoDB;
+
+
+
 
 CREATE TABLE Attendance (
     attendance_id INT AUTO_INCREMENT PRIMARY KEY,
@@ -149,6 +173,21 @@ CREATE TABLE Attendance (
 
 ) ENGINE=InnoDB;
 
+CREATE TABLE Attendance_Bitmaps (
+    section_id INT NOT NULL,
+    student_id INT NOT NULL,
+    term_year SMALLINT NOT NULL,
+    -- bit n (little-endian) = day n of term_year, see src/attendance_bitmaps.py
+    present BINARY(46) NOT NULL,
+    absent BINARY(46) NOT NULL,
+    excused BINARY(46) NOT NULL,
+    late BINARY(46) NOT NULL,
+
+    PRIMARY KEY (section_id, student_id, term_year),
+    FOREIGN KEY (section_id) REFERENCES Course_Sections(section_id) ON DELETE CASCADE,
+    FOREIGN KEY (student_id) REFERENCES Users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
 
 CREATE TABLE Announcements (
     announcement_id INT AUTO_INCREMENT PRIMARY KEY,
@@ -0,0 +1,236 @@
+import argparse
+import sys
+from datetime import date, timedelta
+from .db import get_db_connection
+
+# One bit per calendar day (bit 0 = Jan 1) for each (section, student, year),
+# with a separate bitmap per status. MySQL 8 applies & | and BIT_COUNT to
+# binary strings directly, so updates and counts never leave the server.
+# Those operators only stay bytewise when both operands are binary, so every
+# bound bitmap goes through the _binary introducer.
+BITMAP_BYTES = 46
+# Same order as the present/absent/excused/late columns.
+STATUSES = ("Present", "Absent", "Excused", "Late")
+ZERO = bytes(BITMAP_BYTES)
+
+UPSERT_SQL = """
+INSERT INTO Attendance_Bitmaps (section_id, student_id, term_year, present, absent, excused, late)
+VALUES {rows}
+ON DUPLICATE KEY UPDATE
+    present = (present & _binary %s) | VALUES(present),
+    absent = (absent & _binary %s) | VALUES(absent),
+    excused = (excused & _binary %s) | VALUES(excused),
+    late = (late & _binary %s) | VALUES(late)
+"""
+ROW_SQL = "(%s, %s, %s, _binary %s, _binary %s, _binary %s, _binary %s)"
+
+
+def _day_index(day: date) -> int:
+    return day.timetuple().tm_yday - 1
+
+
+def _mask(day: date) -> bytes:
+    return (1 << _day_index(day)).to_bytes(BITMAP_BYTES, "little")
+
+
+def _inverse_mask(day: date) -> bytes:
+    return bytes(b ^ 0xFF for b in _mask(day))
+
+
+def record_statuses(cursor, section_id: int, day: date, statuses):
+    # statuses: iterable of (student_id, status) for a single class day.
+    mask = _mask(day)
+    rows = []
+    params = []
+    for student_id, status in statuses:
+        rows.append(ROW_SQL)
+        params.extend([section_id, student_id, day.year])
+        params.extend(mask if s == status else ZERO for s in STATUSES)
+    if not rows:
+        return
+    inverse = _inverse_mask(day)
+    cursor.execute(UPSERT_SQL.format(rows=", ".join(rows)), params + [inverse] * len(STATUSES))
+
+
+def clear_day(cursor, section_id: int, day: date):
+    inverse = _inverse_mask(day)
+    cursor.execute("""
+        UPDATE Attendance_Bitmaps
+        SET present = present & _binary %s, absent = absent & _binary %s,
+            excused = excused & _binary %s, late = late & _binary %s
+        WHERE section_id = %s AND term_year = %s
+    """, (inverse, inverse, inverse, inverse, section_id, day.year))
+
+
+def status_counts(cursor, section_id: int, student_id: int):
+    cursor.execute("""
+        SELECT COALESCE(SUM(BIT_COUNT(present)), 0),
+               COALESCE(SUM(BIT_COUNT(excused)), 0),
+               COALESCE(SUM(BIT_COUNT(absent)), 0),
+               COALESCE(SUM(BIT_COUNT(late)), 0)
+        FROM Attendance_Bitmaps
+        WHERE section_id = %s AND student_id = %s
+    """, (section_id, student_id))
+    present, excused, absent, late = (int(v) for v in cursor.fetchone())
+    return present, excused, absent, late
+
+
+def section_summary_query(section_ids):
+    # Every enrolled student of the given sections, including those with no
+    # attendance yet, ordered for per-section output.
+    placeholders = ", ".join(["%s"] * len(section_ids))
+    sql = f"""
+        SELECT
+            en.section_id,
+            en.student_id,
+            u.full_name AS student_name,
+            COALESCE(SUM(BIT_COUNT(ab.present)), 0) AS present,
+            COALESCE(SUM(BIT_COUNT(ab.excused)), 0) AS excused,
+            COALESCE(SUM(BIT_COUNT(ab.absent)), 0) AS absent,
+            COALESCE(SUM(BIT_COUNT(ab.late)), 0) AS late
+        FROM Enrollments en
+        JOIN Users u ON u.user_id = en.student_id
+        LEFT JOIN Attendance_Bitmaps ab
+            ON ab.section_id = en.section_id AND ab.student_id = en.student_id
+        WHERE en.section_id IN ({placeholders})
+          AND en.completion_status <> 'Dropped'
+        GROUP BY en.section_id, en.student_id, u.full_name
+        ORDER BY en.section_id, u.full_name
+    """
+    return sql, list(section_ids)
+
+
+def summary_row(section_id, student_id, student_name, present, excused, absent, late):
+    present, excused, absent, late = int(present), int(excused), int(absent), int(late)
+    # Late counts as a held class but not toward participation, as before.
+    total = present + excused + absent + late
+    return {
+        "section_id": section_id,
+        "student_id": student_id,
+        "student_name": student_name,
+        "total_classes": total,
+        "present": present,
+        "excused": excused,
+        "absent": absent,
+        "late": late,
+        "participation_rate": round((present + excused) / total * 100, 2) if total else None
+    }
+
+
+def _bits(value: bytes) -> int:
+    return int.from_bytes(value, "little")
+
+
+def _days(year: int, bits: int):
+    start = date(year, 1, 1)
+    while bits:
+        low = bits & -bits
+        yield start + timedelta(days=low.bit_length() - 1)
+        bits ^= low
+
+
+def attendance_streaks(cursor, section_id: int, student_id: int):
+    cursor.execute("""
+        SELECT term_year, present, absent, excused, late
+        FROM Attendance_Bitmaps
+        WHERE section_id = %s AND student_id = %s
+        ORDER BY term_year
+    """, (section_id, student_id))
+
+    current = longest = sessions = 0
+    for year, present, absent, excused, late in cursor.fetchall():
+        attended = _bits(present) | _bits(excused) | _bits(late)
+        held = attended | _bits(absent)
+        sessions += bin(held).count("1")
+        # Walk only the days that had a session; excused and late keep a
+        # streak alive.
+        for day in _days(year, held):
+            if attended >> _day_index(day) & 1:
+                current += 1
+                longest = max(longest, current)
+            else:
+                current = 0
+    return {"sessions": sessions, "current_streak": current, "longest_streak": longest}
+
+
+def absence_heatmap(cursor, section_id: int):
+    cursor.execute("""
+        SELECT term_year, present, absent, excused, late
+        FROM Attendance_Bitmaps
+        WHERE section_id = %s
+    """, (section_id,))
+
+    days = {}
+    for year, *bitmaps in cursor.fetchall():
+        for status, value in zip(STATUSES, bitmaps):
+            for day in _days(year, _bits(value)):
+                days.setdefault(day, dict.fromkeys(STATUSES, 0))[status] += 1
+
+    return [
+        {
+            "date": day,
+            "present": c["Present"],
+            "absent": c["Absent"],
+            "excused": c["Excused"],
+            "late": c["Late"],
+            "absence_rate": round(c["Absent"] / sum(c.values()) * 100, 2)
+        }
+        for day, c in sorted(days.items())
+    ]
+
+
+def rebuild(section_id=None):
+    # Recreates bitmaps from the Attendance rows, e.g. after the migration.
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        query = "SELECT section_id, student_id, attendance_date, status FROM Attendance"
+        params = []
+        if section_id is not None:
+            query += " WHERE section_id = %s"
+            params.append(section_id)
+        cursor.execute(query, params)
+
+        bitmaps = {}
+        for sec_id, student_id, day, status in cursor.fetchall():
+            if status not in STATUSES:
+                continue
+            key = (sec_id, student_id, day.year)
+            entry = bitmaps.setdefault(key, dict.fromkeys(STATUSES, 0))
+            entry[status] |= 1 << _day_index(day)
+
+        if section_id is None:
+            cursor.execute("DELETE FROM Attendance_Bitmaps")
+        else:
+            cursor.execute("DELETE FROM Attendance_Bitmaps WHERE section_id = %s", (section_id,))
+
+        items = list(bitmaps.items())
+        for start in range(0, len(items), 1000):
+            chunk = items[start:start + 1000]
+            placeholders = ", ".join([ROW_SQL] * len(chunk))
+            params = []
+            for key, entry in chunk:
+                params.extend(key)
+                params.extend(entry[s].to_bytes(BITMAP_BYTES, "little") for s in STATUSES)
+            cursor.execute(
+                "INSERT INTO Attendance_Bitmaps (section_id, student_id, term_year, present, absent, excused, late) "
+                f"VALUES {placeholders}",
+                params
+            )
+        conn.commit()
+        return len(items)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild Attendance_Bitmaps from Attendance rows.")
+    parser.add_argument("--section-id", type=int)
+    args = parser.parse_args()
+    print(f"{rebuild(args.section_id)} bitmaps written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
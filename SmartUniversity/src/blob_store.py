@@ -0,0 +1,198 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from .db import get_db_connection
+from .uploads import UPLOAD_DIR, UPLOAD_CHUNK_BYTES, safe_filename, expire_partials
+
+# Submission files are stored once per content digest. Submissions.file_path
+# holds "sha256:<digest>/<original name>"; Submission_Blobs counts how many
+# submissions reference each digest.
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+BLOB_PREFIX = "sha256:"
+# Files without a row are only collected once they are this old, so a blob
+# placed by a transaction that hasn't committed yet is never swept.
+ORPHAN_GRACE_SECONDS = 3600
+GC_BATCH = 1000
+
+os.makedirs(BLOB_DIR, exist_ok=True)
+
+
+def blob_file(digest: str) -> str:
+    return os.path.join(BLOB_DIR, digest[:2], digest[2:4], digest)
+
+
+def make_file_path(digest: str, filename: str) -> str:
+    return f"{BLOB_PREFIX}{digest}/{safe_filename(filename)}"
+
+
+def digest_of(file_path):
+    if not file_path or not file_path.startswith(BLOB_PREFIX):
+        return None
+    digest = file_path[len(BLOB_PREFIX):len(BLOB_PREFIX) + 64]
+    return digest if re.fullmatch(r"[0-9a-f]{64}", digest) else None
+
+
+def resolve(file_path: str):
+    # Paths written before the blob store are plain filesystem paths. They
+    # come from clients, so anything outside UPLOAD_DIR resolves to None.
+    digest = digest_of(file_path)
+    if digest:
+        return blob_file(digest)
+    if not file_path:
+        return None
+    root = os.path.realpath(UPLOAD_DIR)
+    path = os.path.realpath(file_path)
+    if os.path.commonpath([root, path]) != root:
+        return None
+    return path
+
+
+def hash_file(path: str):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_BYTES):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def store(cursor, tmp_path: str, digest: str, size: int):
+    # Runs inside the caller's transaction, before it touches Submissions:
+    # collect_garbage() locks the blob rows and then reads Submissions, and
+    # taking the locks in the same order keeps the two from deadlocking.
+    # Identical content is replaced in place, which is atomic and harmless
+    # if the blob already exists.
+    cursor.execute("""
+        INSERT INTO Submission_Blobs (digest, size, ref_count)
+        VALUES (%s, %s, 1)
+        ON DUPLICATE KEY UPDATE ref_count = ref_count + 1
+    """, (digest, size))
+    path = blob_file(digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+
+
+def release(cursor, file_paths) -> list[str]:
+    # Drops one reference per path and deletes rows that reach zero. Returns
+    # the unreferenced digests; pass them to remove_files() after commit.
+    counts = Counter(d for d in map(digest_of, file_paths) if d)
+    if not counts:
+        return []
+    for digest, n in counts.items():
+        cursor.execute(
+            "UPDATE Submission_Blobs SET ref_count = ref_count - %s WHERE digest = %s",
+            (n, digest)
+        )
+    placeholders = ", ".join(["%s"] * len(counts))
+    cursor.execute(
+        f"SELECT digest FROM Submission_Blobs WHERE digest IN ({placeholders}) AND ref_count <= 0",
+        list(counts)
+    )
+    unreferenced = [r[0] for r in cursor.fetchall()]
+    if unreferenced:
+        placeholders = ", ".join(["%s"] * len(unreferenced))
+        cursor.execute(f"DELETE FROM Submission_Blobs WHERE digest IN ({placeholders})", unreferenced)
+    return unreferenced
+
+
+def remove_files(conn, digests):
+    # Call after the release has committed. Runs in its own transaction: the
+    # locking read waits for a store() that has already placed the file but
+    # not committed, and the gap lock it leaves on a missing digest holds
+    # back a new store() of that digest until the file is gone.
+    if not digests:
+        return 0
+    cursor = conn.cursor()
+    try:
+        placeholders = ", ".join(["%s"] * len(digests))
+        cursor.execute(
+            f"SELECT digest FROM Submission_Blobs WHERE digest IN ({placeholders}) FOR UPDATE",
+            list(digests)
+        )
+        alive = {r[0] for r in cursor.fetchall()}
+        removed = 0
+        for digest in digests:
+            if digest in alive:
+                continue
+            try:
+                os.remove(blob_file(digest))
+                removed += 1
+            except FileNotFoundError:
+                pass
+        conn.commit()
+        return removed
+    finally:
+        cursor.close()
+
+
+def collect_garbage():
+    # Full reconcile: recount references from Submissions, drop unreferenced
+    # rows, then delete files that have no row and expire abandoned uploads.
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        try:
+            # Locking every blob row first holds back store() and release()
+            # until the recount commits, so a reference that commits in the
+            # meantime is never counted out along with its row.
+            cursor.execute("SELECT digest FROM Submission_Blobs FOR UPDATE")
+            cursor.fetchall()
+            cursor.execute("""
+                UPDATE Submission_Blobs b
+                LEFT JOIN (
+                    SELECT SUBSTRING(file_path, 8, 64) AS digest, COUNT(*) AS refs
+                    FROM Submissions
+                    WHERE file_path LIKE 'sha256:%'
+                    GROUP BY SUBSTRING(file_path, 8, 64)
+                ) s ON s.digest = b.digest
+                SET b.ref_count = COALESCE(s.refs, 0)
+            """)
+            cursor.execute("DELETE FROM Submission_Blobs WHERE ref_count <= 0")
+            rows_deleted = cursor.rowcount
+            conn.commit()
+
+            cursor.execute("SELECT digest FROM Submission_Blobs")
+            live = {r[0] for r in cursor.fetchall()}
+            conn.commit()
+        finally:
+            cursor.close()
+
+        cutoff = time.time() - ORPHAN_GRACE_SECONDS
+        orphans = []
+        for root, _, files in os.walk(BLOB_DIR):
+            for name in files:
+                if name in live or not re.fullmatch(r"[0-9a-f]{64}", name):
+                    continue
+                if os.path.getmtime(os.path.join(root, name)) < cutoff:
+                    orphans.append(name)
+        # remove_files() rechecks each batch under a lock, so a blob stored
+        # since the snapshot above is left alone.
+        files_deleted = 0
+        for start in range(0, len(orphans), GC_BATCH):
+            files_deleted += remove_files(conn, orphans[start:start + GC_BATCH])
+    finally:
+        conn.close()
+
+    return {
+        "blobs": len(live),
+        "rows_deleted": rows_deleted,
+        "files_deleted": files_deleted,
+        "partials_expired": expire_partials()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Garbage-collect unreferenced submission blobs and abandoned uploads.")
+    parser.parse_args()
+    print(json.dumps(collect_garbage(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from .db import get_db_connection
+from .attendance_bitmaps import record_statuses
+
+CHUNK_SESSIONS = 50
+EARLY_MINUTES = int(os.getenv("CARD_EARLY_MINUTES", "15"))
+REQUIRED_COLUMNS = {"timestamp", "room", "card_id"}
+
+
+def _term(day):
+    # Course_Sections only carry (semester, year); the fall term runs into January.
+    if day.month == 1:
+        return "Fall", day.year - 1
+    if day.month <= 6:
+        return "Spring", day.year
+    if day.month <= 8:
+        return "Summer", day.year
+    return "Fall", day.year
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.strip().split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _load_schedule(cursor):
+    # (room, weekday, semester, year) -> [(start, end, section_id)]
+    cursor.execute("""
+        SELECT section_id, semester, year, schedule_day, schedule_time, classroom
+        FROM Course_Sections
+        WHERE classroom IS NOT NULL AND schedule_day IS NOT NULL AND schedule_time IS NOT NULL
+    """)
+    schedule = {}
+    for section_id, semester, year, day, window, room in cursor.fetchall():
+        try:
+            start, end = (_minutes(t) for t in window.split("-"))
+        except ValueError:
+            continue
+        key = (room.strip().upper(), day.strip().capitalize(), semester, int(year))
+        schedule.setdefault(key, []).append((start - EARLY_MINUTES, end, section_id))
+    return schedule
+
+
+def _load_cards(cursor):
+    cursor.execute("SELECT card_id, user_id FROM Users WHERE card_id IS NOT NULL AND is_active = 1")
+    return {card.strip().upper(): user_id for card, user_id in cursor.fetchall()}
+
+
+def _match_swipes(reader, schedule, cards, report):
+    sessions = {}
+    for raw in reader:
+        report["swipes"] += 1
+        try:
+            stamp = datetime.fromisoformat((raw.get("timestamp") or "").strip())
+            room = (raw.get("room") or "").strip().upper()
+            card = (raw.get("card_id") or "").strip().upper()
+        except ValueError:
+            report["malformed"] += 1
+            continue
+
+        student_id = cards.get(card)
+        if student_id is None:
+            report["unknown_cards"] += 1
+            continue
+
+        day = stamp.date()
+        minute = stamp.hour * 60 + stamp.minute
+        key = (room, day.strftime("%A"), *_term(day))
+        section_id = next(
+            (sid for start, end, sid in schedule.get(key, ()) if start <= minute <= end),
+            None
+        )
+        if section_id is None:
+            report["unmatched_swipes"] += 1
+            continue
+
+        sessions.setdefault((section_id, day), set()).add(student_id)
+    return sessions
+
+
+def _upsert_sessions(conn, cursor, chunk, report):
+    section_ids = sorted({section_id for (section_id, _), _ in chunk})
+    placeholders = ", ".join(["%s"] * len(section_ids))
+    cursor.execute(f"""
+        SELECT section_id, student_id FROM Enrollments
+        WHERE section_id IN ({placeholders}) AND completion_status <> 'Dropped'
+    """, section_ids)
+    enrolled = {}
+    for section_id, student_id in cursor.fetchall():
+        enrolled.setdefault(section_id, []).append(student_id)
+
+    # Anything already marked other than Absent, by hand or by an earlier
+    # log, is never downgraded; a partial log only adds Present marks. The
+    # lock keeps the bitmaps in step with a hand mark made meanwhile.
+    pairs = ", ".join(["(%s, %s)"] * len(chunk))
+    cursor.execute(f"""
+        SELECT section_id, attendance_date, student_id FROM Attendance
+        WHERE (section_id, attendance_date) IN ({pairs}) AND status <> 'Absent'
+        FOR UPDATE
+    """, [v for key, _ in chunk for v in key])
+    marked = {(section_id, day, student_id) for section_id, day, student_id in cursor.fetchall()}
+
+    for (section_id, day), swiped in chunk:
+        statuses = []
+        for student_id in enrolled.get(section_id, ()):
+            if (section_id, day, student_id) in marked:
+                report["kept_existing"] += 1
+                continue
+            statuses.append((student_id, "Present" if student_id in swiped else "Absent"))
+        report["not_enrolled_swipes"] += len(swiped - set(enrolled.get(section_id, ())))
+        if not statuses:
+            continue
+
+        values = ", ".join(["(%s, %s, %s, %s)"] * len(statuses))
+        cursor.execute(f"""
+            INSERT INTO Attendance (section_id, student_id, attendance_date, status)
+            VALUES {values}
+            ON DUPLICATE KEY UPDATE status = IF(status = 'Absent', VALUES(status), status)
+        """, [v for student_id, status in statuses for v in (section_id, student_id, day, status)])
+        record_statuses(cursor, section_id, day, statuses)
+
+        report["records"] += len(statuses)
+        report["present"] += sum(1 for _, status in statuses if status == "Present")
+    conn.commit()
+
+
+def ingest_csv(text_stream):
+    # Re-running the same log produces the same rows, and only Absent
+    # records are ever overwritten.
+    started = time.perf_counter()
+    reader = csv.DictReader(text_stream)
+    try:
+        columns = set(reader.fieldnames or [])
+    except csv.Error as e:
+        raise ValueError(f"Unreadable CSV after line {reader.line_num}: {e}")
+    missing = REQUIRED_COLUMNS - columns
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+
+    report = dict.fromkeys((
+        "swipes", "malformed", "unknown_cards", "unmatched_swipes", "not_enrolled_swipes",
+        "sessions", "records", "present", "kept_existing"
+    ), 0)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        schedule, cards = _load_schedule(cursor), _load_cards(cursor)
+        # The whole log is matched before anything is written, so a broken
+        # line leaves the database untouched.
+        try:
+            sessions = _match_swipes(reader, schedule, cards, report)
+        except csv.Error as e:
+            raise ValueError(f"Unreadable CSV after line {reader.line_num}: {e}")
+        items = sorted(sessions.items())
+        report["sessions"] = len(items)
+        for start in range(0, len(items), CHUNK_SESSIONS):
+            _upsert_sessions(conn, cursor, items[start:start + CHUNK_SESSIONS], report)
+    finally:
+        cursor.close()
+        conn.close()
+
+    seconds = time.perf_counter() - started
+    report["absent"] = report["records"] - report["present"]
+    report["seconds"] = round(seconds, 3)
+    report["swipes_per_second"] = round(report["swipes"] / seconds) if seconds else None
+    return report
+
+
+def ingest_file(binary_file):
+    text_stream = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    try:
+        return ingest_csv(text_stream)
+    finally:
+        text_stream.detach()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turn card-reader logs into attendance records.")
+    parser.add_argument("csv_paths", nargs="+", help="CSV with timestamp,room,card_id")
+    args = parser.parse_args()
+
+    for path in args.csv_paths:
+        with open(path, "rb") as f:
+            print(json.dumps({"file": path, **ingest_file(f)}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import time
+from .db import get_db_connection
+
+CHUNK_SIZE = 5000
+
+# Per-student totals over graded enrollments. A grade counts toward the GPA
+# as soon as it is set, whatever the completion status. grade_points is the
+# stored numeric value of the letter grade (see grade_scale).
+AGGREGATE_SQL = """
+SELECT
+    e.student_id,
+    SUM(e.grade_points * c.credits) AS points,
+    SUM(c.credits) AS credits
+FROM Enrollments e
+JOIN Course_Sections s ON e.section_id = s.section_id
+JOIN Courses c ON s.course_id = c.course_id
+WHERE e.grade_points IS NOT NULL {filter}
+GROUP BY e.student_id
+"""
+
+# One set-based statement per chunk: the aggregate is computed inside MySQL
+# and joined straight back onto Student_Profiles.
+RECOMPUTE_SQL = """
+UPDATE Student_Profiles sp
+LEFT JOIN ({aggregate}) g ON g.student_id = sp.student_id
+SET sp.quality_points = COALESCE(g.points, 0),
+    sp.credits_earned = COALESCE(g.credits, 0),
+    sp.current_gpa = IF(COALESCE(g.credits, 0) > 0, ROUND(g.points / g.credits, 2), 0)
+WHERE sp.student_id IN ({placeholders})
+"""
+
+# MySQL evaluates single-table SET assignments left to right, so current_gpa
+# is derived from the already-adjusted totals.
+DELTA_SQL = """
+UPDATE Student_Profiles
+SET quality_points = quality_points + %s,
+    credits_earned = credits_earned + %s,
+    current_gpa = IF(credits_earned > 0, ROUND(quality_points / credits_earned, 2), 0)
+WHERE student_id = %s
+"""
+
+VERIFY_SQL = """
+SELECT
+    sp.student_id,
+    sp.quality_points,
+    sp.credits_earned,
+    sp.current_gpa,
+    COALESCE(g.points, 0) AS expected_points,
+    COALESCE(g.credits, 0) AS expected_credits
+FROM Student_Profiles sp
+LEFT JOIN ({aggregate}) g ON g.student_id = sp.student_id
+WHERE (ABS(sp.quality_points - COALESCE(g.points, 0)) >= 0.005
+   OR sp.credits_earned <> COALESCE(g.credits, 0)) {filter}
+ORDER BY sp.student_id
+LIMIT %s
+"""
+
+
+def _student_ids(cursor, student_ids=None, department_id=None):
+    query = "SELECT student_id FROM Student_Profiles WHERE 1=1"
+    params = []
+    if student_ids:
+        query += f" AND student_id IN ({', '.join(['%s'] * len(student_ids))})"
+        params.extend(student_ids)
+    if department_id is not None:
+        query += " AND department_id = %s"
+        params.append(department_id)
+    cursor.execute(query + " ORDER BY student_id", params)
+    return [r[0] for r in cursor.fetchall()]
+
+
+def recompute_gpas(progress=None, student_ids=None, department_id=None):
+    started = time.perf_counter()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        ids = _student_ids(cursor, student_ids, department_id)
+        if progress:
+            progress.update(0, len(ids))
+
+        changed = 0
+        for start in range(0, len(ids), CHUNK_SIZE):
+            chunk = ids[start:start + CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            aggregate = AGGREGATE_SQL.format(filter=f"AND e.student_id IN ({placeholders})")
+            cursor.execute(
+                RECOMPUTE_SQL.format(aggregate=aggregate, placeholders=placeholders),
+                chunk + chunk
+            )
+            changed += cursor.rowcount
+            conn.commit()
+            if progress:
+                progress.update(start + len(chunk))
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {
+        "students": len(ids),
+        "changed": changed,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def _contribution(points, credits):
+    if points is None:
+        return 0.0, 0
+    return float(points) * credits, credits
+
+
+# Called inside the caller's transaction, after the enrollment row changed.
+def apply_grade_change(cursor, student_id, credits, old_grade_points, new_grade_points):
+    old_points, old_credits = _contribution(old_grade_points, credits)
+    new_points, new_credits = _contribution(new_grade_points, credits)
+    if (old_points, old_credits) == (new_points, new_credits):
+        return
+    cursor.execute(
+        DELTA_SQL,
+        (round(new_points - old_points, 2), new_credits - old_credits, student_id)
+    )
+
+
+def verify_gpas(department_id=None, limit=100):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        filter_sql = ""
+        params = []
+        if department_id is not None:
+            filter_sql = "AND sp.department_id = %s"
+            params.append(department_id)
+        cursor.execute(
+            VERIFY_SQL.format(aggregate=AGGREGATE_SQL.format(filter=""), filter=filter_sql),
+            params + [limit]
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
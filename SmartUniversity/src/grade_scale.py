@@ -0,0 +1,79 @@
+import argparse
+import os
+import sys
+from .db import get_db_connection
+from .gpa import recompute_gpas
+from .transcript_cache import transcript_cache
+
+DEFAULT_SCALE = {
+    "AA": 4.0,
+    "BA": 3.5,
+    "BB": 3.0,
+    "CB": 2.5,
+    "CC": 2.0,
+    "DC": 1.5,
+    "DD": 1.0,
+    "FD": 0.5,
+    "FF": 0.0,
+    "VF": 0.0
+}
+
+
+def _load_scale():
+    # GRADE_SCALE="AA=4.0,BA=3.5,..." replaces the default table entirely.
+    raw = os.getenv("GRADE_SCALE")
+    if not raw:
+        return dict(DEFAULT_SCALE)
+    scale = {}
+    for item in raw.split(","):
+        letter, points = item.split("=")
+        scale[letter.strip().upper()] = float(points)
+    return scale
+
+
+GRADE_SCALE = _load_scale()
+
+
+def normalize_grade(grade: str) -> str:
+    letter = grade.strip().upper()
+    if letter not in GRADE_SCALE:
+        raise ValueError(f"Unknown grade {grade}; expected one of {', '.join(GRADE_SCALE)}")
+    return letter
+
+
+def grade_points(grade):
+    if grade is None:
+        return None
+    return GRADE_SCALE[normalize_grade(grade)]
+
+
+def resync_grade_points():
+    # Rewrites grade_points for every graded enrollment after a scale change.
+    cases = " ".join("WHEN %s THEN %s" for _ in GRADE_SCALE)
+    params = [v for item in GRADE_SCALE.items() for v in item]
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"UPDATE Enrollments SET grade_points = CASE grade {cases} ELSE NULL END "
+            "WHERE grade IS NOT NULL",
+            params
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite Enrollments.grade_points from the configured grade scale and recompute GPAs.")
+    parser.parse_args()
+    print(f"{resync_grade_points()} enrollments updated")
+    print(recompute_gpas())
+    transcript_cache.invalidate_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+import os
+from fastapi import Depends, HTTPException, Request
+from starlette.datastructures import Headers, MutableHeaders
+from .reference_cache import reference_cache
+from .shared_state import current_version
+from .routers.auth import require_token
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def _strip_tag(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix + '"'):
+            return tag[:-len(suffix) - 1] + '"'
+    return tag
+
+
+def _matching_tag(if_none_match, etag):
+    if not if_none_match:
+        return None
+    for tag in if_none_match.split(","):
+        if tag.strip() == "*" or _strip_tag(tag) == etag:
+            return tag.strip()
+    return None
+
+
+def _check_etag(request: Request, versions: str):
+    key = f"{request.url.path}?{request.url.query}|{versions}"
+    etag = '"' + hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '"'
+    request.state.etag = etag
+
+    matched = _matching_tag(request.headers.get("if-none-match"), etag)
+    if matched:
+        raise HTTPException(status_code=304, headers={"ETag": matched if matched != "*" else etag})
+
+
+def conditional_get(*tables: str):
+    # ETags come from the shared table versions, so a matching If-None-Match
+    # is answered with 304 before the endpoint opens a database connection.
+    def check(request: Request, user=Depends(require_token)):
+        _check_etag(request, ",".join(f"{t}:{current_version(t)}" for t in tables))
+        return user
+    return check
+
+
+def conditional_dataset(name: str):
+    # For endpoints served from reference_cache: the ETag is the version
+    # tuple of the cached dataset, so it names exactly the rows the endpoint
+    # returns, and the endpoint can read them with check=False.
+    def check(request: Request, user=Depends(require_token)):
+        _check_etag(request, f"{name}:{reference_cache.versions(name)}")
+        return user
+    return check
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _choose_encoding(accept_encoding: str):
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = _choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            etag = scope.get("state", {}).get("etag")
+            body = message.get("body", b"")
+            # Streaming responses (more_body) are passed through untouched.
+            eligible = (
+                not message.get("more_body", False)
+                and len(body) >= self.minimum_size
+                and "content-encoding" not in headers
+                and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            )
+            if eligible:
+                headers.add_vary_header("Accept-Encoding")
+            if eligible and encoding:
+                body = _compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                message = {**message, "body": body}
+                if etag:
+                    etag = f'{etag[:-1]}-{encoding}"'
+            if etag and "etag" not in headers:
+                headers["ETag"] = etag
+
+            await send(start_message)
+            start_message = None
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,84 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from .shared_state import STATE_DIR
+
+JOBS_DIR = os.path.join(STATE_DIR, "jobs")
+os.makedirs(JOBS_DIR, exist_ok=True)
+
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _write(job: dict):
+    path = _job_path(job["job_id"])
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(job, f)
+    os.replace(tmp_path, path)
+
+
+def get_job(job_id: str):
+    # Job ids are hex uuids; anything else can't name a file in JOBS_DIR.
+    if not job_id.isalnum():
+        return None
+    try:
+        with open(_job_path(job_id)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class Progress:
+    # Handed to the job function. Progress is persisted at most every
+    # half second so a tight loop doesn't turn into a file write per row.
+    def __init__(self, job: dict):
+        self._job = job
+        self._next_write = 0.0
+
+    def update(self, done: int, total: int = None):
+        self._job["done"] = done
+        if total is not None:
+            self._job["total"] = total
+        now = time.monotonic()
+        if now >= self._next_write:
+            self._next_write = now + 0.5
+            _write(self._job)
+
+
+def start_job(kind: str, fn, *args, job_meta: dict = None, **kwargs) -> dict:
+    # Runs fn(progress, *args, **kwargs) on a daemon thread. Job state lives in
+    # STATE_DIR so any worker can answer a status request; job_meta is stored
+    # with it, e.g. for access checks when the status is read.
+    job = {
+        **(job_meta or {}),
+        "job_id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": "running",
+        "done": 0,
+        "total": None,
+        "started_at": time.time(),
+        "finished_at": None,
+        "result": None,
+        "error": None
+    }
+    _write(job)
+    snapshot = dict(job)
+
+    def run():
+        try:
+            job["result"] = fn(Progress(job), *args, **kwargs)
+            job["status"] = "finished"
+        except Exception as e:
+            traceback.print_exc()
+            job["status"] = "failed"
+            job["error"] = str(e)
+        job["finished_at"] = time.time()
+        _write(job)
+
+    threading.Thread(target=run, name=f"job-{kind}", daemon=True).start()
+    return snapshot
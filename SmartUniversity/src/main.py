@@ -1,4 +1,11 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from .http_cache import CompressionMiddleware
+from .server_timing import ServerTimingMiddleware
+from .responses import FastJSONResponse
+from .uploads import UploadLimitMiddleware
+from .reference_cache import reference_cache
+from .submission_ingest import start_writer, stop_writer
 from .routers import (
     auth,
     users,
@@ -14,15 +21,29 @@ from .routers import (
     attendance,
     office_hours,
     announcements,
-    analytics
+    analytics,
+    profiling
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    reference_cache.warm()
+    start_writer()
+    yield
+    stop_writer()
+
 app = FastAPI(
     title="University Database API",
     description="A comprehensive REST API for managing university operations.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
+app.add_middleware(UploadLimitMiddleware, paths=["/submissions/upload"])
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(CompressionMiddleware)
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(departments.router)
@@ -38,6 +59,7 @@ app.include_router(attendance.router)
 app.include_router(office_hours.router)
 app.include_router(announcements.router)
 app.include_router(analytics.router)
+app.include_router(profiling.router)
 
 @app.get("/")
 def root():
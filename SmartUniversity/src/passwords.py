@@ -0,0 +1,120 @@
+import asyncio
+import base64
+import functools
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from fastapi import HTTPException
+
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "16"))
+# Bulk hashing gets the cores the interactive pool doesn't use.
+BULK_HASH_WORKERS = int(os.getenv(
+    "PASSWORD_BULK_HASH_WORKERS",
+    str(max(1, (os.cpu_count() or 1) - HASH_WORKERS))
+))
+
+# hashlib.scrypt releases the GIL, so a small thread pool gives real
+# parallelism. Callers await the job on the event loop rather than blocking a
+# request thread on it, and the semaphore caps running + queued jobs; callers
+# beyond that get a 503 during a login storm.
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="password-hash")
+_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_LIMIT)
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=128 * r * (n + p + 2) + 1024 * 1024,
+        dklen=32
+    )
+
+
+def _hash(password: str) -> str:
+    salt = secrets.token_bytes(16)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+
+# Verified against when the account doesn't exist, so an unknown email costs
+# as much as a wrong password and login timing doesn't reveal which it was.
+@functools.lru_cache(maxsize=None)
+def _dummy_hash() -> str:
+    return _hash(secrets.token_urlsafe(16))
+
+
+def _verify(password: str, stored: str):
+    if not stored:
+        _verify(password, _dummy_hash())
+        return False, False
+    if not stored.startswith("scrypt$"):
+        # Legacy unsalted SHA-256 hex digest.
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored), True
+
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        computed = _scrypt(password, base64.b64decode(salt), n, r, p)
+        ok = hmac.compare_digest(computed, base64.b64decode(digest))
+    except ValueError:
+        # Corrupt stored hash (binascii.Error is a ValueError too): a failed
+        # login, not a 500.
+        return False, False
+    return ok, (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+async def _run(fn, *args, best_effort=False):
+    if not _slots.acquire(blocking=False):
+        if best_effort:
+            return None
+        raise HTTPException(
+            status_code=503,
+            detail="Too many password operations in progress",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        future = _executor.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    # Released when the job finishes, not when the caller stops waiting, so a
+    # disconnected client can't free a slot while its hash is still running.
+    future.add_done_callback(lambda _: _slots.release())
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password)
+
+
+# None when every slot is taken; for upgrades that can wait for a later call.
+async def try_hash_password(password: str) -> Optional[str]:
+    return await _run(_hash, password, best_effort=True)
+
+
+# Returns (matches, needs_rehash); legacy and outdated-parameter hashes need a rehash.
+async def verify_password(password: str, stored: str):
+    return await _run(_verify, password, stored)
+
+
+# Bulk loads get their own short-lived pool so a cohort import never queues
+# ahead of interactive logins on the shared executor.
+def hash_passwords(passwords: list[str]) -> list[str]:
+    with ThreadPoolExecutor(max_workers=BULK_HASH_WORKERS, thread_name_prefix="password-bulk") as pool:
+        return list(pool.map(_hash, passwords))
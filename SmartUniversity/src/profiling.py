@@ -0,0 +1,228 @@
+import functools
+import inspect
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from itertools import count
+
+DEFAULT_INTERVAL_MS = 5.0
+MAX_DUMPS = 50
+MAX_STACK_DEPTH = 128
+
+# Leaf frames in these files belong to threads that are parked, not working.
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+
+class ProfilerState:
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.routes = set()
+        self.interval_ms = DEFAULT_INTERVAL_MS
+        self.dumps = deque(maxlen=MAX_DUMPS)
+        self._ids = count(1)
+        self._lock = threading.Lock()
+
+    def configure(self, enabled, sample_rate, routes, interval_ms, max_dumps):
+        with self._lock:
+            self.sample_rate = sample_rate
+            self.routes = set(routes)
+            self.interval_ms = interval_ms
+            if max_dumps != self.dumps.maxlen:
+                self.dumps = deque(self.dumps, maxlen=max_dumps)
+            self.enabled = enabled and (sample_rate > 0 or bool(self.routes))
+
+    def add_dump(self, dump):
+        with self._lock:
+            dump["dump_id"] = next(self._ids)
+            self.dumps.append(dump)
+
+    # Samplers append from their own threads, so readers take a copy.
+    def list_dumps(self):
+        with self._lock:
+            return list(self.dumps)
+
+    def get_dump(self, dump_id):
+        for dump in self.list_dumps():
+            if dump["dump_id"] == dump_id:
+                return dump
+        return None
+
+    def clear(self):
+        with self._lock:
+            self.dumps.clear()
+
+    def settings(self):
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "routes": sorted(self.routes),
+            "interval_ms": self.interval_ms,
+            "max_dumps": self.dumps.maxlen,
+        }
+
+
+state = ProfilerState()
+
+# Profile of the request being served, if it is being sampled. Set in
+# profile_request() and carried into threadpool threads with the context.
+_active_profile = ContextVar("active_profile", default=None)
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _fold(frame):
+    if os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+        return None
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class StackSampler(threading.Thread):
+    # Samples only the threads working on the profiled request: the event loop
+    # thread, which other requests share between awaits, and any threadpool
+    # thread while it runs one of the request's sync dependencies or endpoint.
+    def __init__(self, interval_ms):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.interval = interval_ms / 1000.0
+        self.stacks = Counter()
+        self.samples = 0
+        self._threads = Counter()
+        self._threads_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def enter(self):
+        with self._threads_lock:
+            self._threads[threading.get_ident()] += 1
+
+    def leave(self):
+        ident = threading.get_ident()
+        with self._threads_lock:
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            with self._threads_lock:
+                threads = list(self._threads)
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    stack = _fold(frame)
+                    if stack:
+                        self.stacks[stack] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _should_profile(name, path):
+    if name in state.routes or path in state.routes:
+        return True
+    return state.sample_rate > 0 and random.random() < state.sample_rate
+
+
+class _Profile:
+    def __init__(self, scope, path):
+        self.scope = scope
+        self.path = path
+        self.sampler = StackSampler(state.interval_ms)
+        self.sampler.enter()
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.sampler.start()
+
+    def finish(self):
+        self.sampler.leave()
+        self.sampler.stop()
+        state.add_dump({
+            "route": self.path,
+            "method": self.scope["method"],
+            "path": self.scope["path"],
+            "started_at": self.started_at,
+            "duration_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "samples": self.sampler.samples,
+            "stacks": self.sampler.stacks,
+        })
+
+
+# Runs the route's whole ASGI handling under the profiler: dependency
+# resolution (JWT decode), body validation, the endpoint, rendering and
+# sending the response. Called by FastJSONRoute once routing is done, so the
+# decision uses the real endpoint name and path template.
+async def profile_request(handle, scope, receive, send, name, path):
+    if not state.enabled or scope["type"] != "http" or not _should_profile(name, path):
+        await handle(scope, receive, send)
+        return
+
+    profile = _Profile(scope, path)
+    token = _active_profile.set(profile)
+    try:
+        await handle(scope, receive, send)
+    finally:
+        _active_profile.reset(token)
+        profile.finish()
+
+
+_tracked = {}
+
+
+# Wraps a sync callable that FastAPI runs in the threadpool so the sampler
+# follows it onto that thread. Wrappers are reused per callable so FastAPI's
+# per-request dependency cache still sees one callable.
+def track_thread(fn):
+    wrapper = _tracked.get(fn)
+    if wrapper is not None:
+        return wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _active_profile.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        profile.sampler.enter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.sampler.leave()
+
+    _tracked[fn] = wrapper
+    return wrapper
+
+
+def _runs_in_threadpool(call):
+    return inspect.isfunction(call) and not (
+        inspect.iscoroutinefunction(call)
+        or inspect.isgeneratorfunction(call)
+        or inspect.isasyncgenfunction(call)
+    )
+
+
+def track_dependencies(dependant):
+    for sub in dependant.dependencies:
+        if _runs_in_threadpool(sub.call):
+            sub.call = track_thread(sub.call)
+        track_dependencies(sub)
+
+
+def to_folded(dumps):
+    lines = []
+    for dump in dumps:
+        for stack, samples in dump["stacks"].items():
+            lines.append(f"{dump['route']};{stack} {samples}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,199 @@
+import argparse
+import csv
+import io
+import json
+import re
+import sys
+from itertools import islice
+import mysql.connector
+from .db import get_db_connection
+from .passwords import hash_passwords
+from .reference_cache import reference_cache
+from .shared_state import commit_versioned
+from .user_search import user_search
+
+CHUNK_SIZE = 500
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+ROLES = {"Student", "Instructor", "Admin"}
+REQUIRED_COLUMNS = {"full_name", "email", "password"}
+
+
+def _validate(raw, department_ids, seen_emails):
+    full_name = (raw.get("full_name") or "").strip()
+    email = (raw.get("email") or "").strip()
+    password = raw.get("password") or ""
+    role = (raw.get("role") or "Student").strip()
+    department_id = (raw.get("department_id") or "").strip()
+    admission_year = (raw.get("admission_year") or "").strip()
+
+    if not full_name:
+        return None, "full_name is required"
+    if not EMAIL_RE.match(email):
+        return None, "Invalid email"
+    if email.lower() in seen_emails:
+        return None, "Duplicate email in file"
+    if not password:
+        return None, "password is required"
+    if role not in ROLES:
+        return None, f"Invalid role {role}"
+
+    row = {
+        "full_name": full_name,
+        "email": email,
+        "password": password,
+        "role": role,
+        "department_id": None,
+        "admission_year": None,
+        "title": (raw.get("title") or "").strip(),
+    }
+    if role in ("Student", "Instructor"):
+        if not department_id.isdigit() or int(department_id) not in department_ids:
+            return None, "Invalid department_id"
+        row["department_id"] = int(department_id)
+    if admission_year:
+        if not admission_year.isdigit():
+            return None, "Invalid admission_year"
+        row["admission_year"] = int(admission_year)
+
+    seen_emails.add(email.lower())
+    return row, None
+
+
+def _values(rows, columns):
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    sql = ", ".join([placeholders] * len(rows))
+    params = [row[c] for row in rows for c in columns]
+    return sql, params
+
+
+def _insert_chunk(conn, cursor, chunk, errors):
+    emails = [row["email"] for _, row in chunk]
+    placeholders = ", ".join(["%s"] * len(emails))
+    cursor.execute(f"SELECT email FROM Users WHERE email IN ({placeholders})", emails)
+    existing = {r[0].lower() for r in cursor.fetchall()}
+
+    rows = []
+    for line, row in chunk:
+        if row["email"].lower() in existing:
+            errors.append({"line": line, "email": row["email"], "error": "Email already exists"})
+        else:
+            rows.append((line, row))
+    if not rows:
+        return []
+
+    hashes = hash_passwords([row["password"] for _, row in rows])
+    for (_, row), password_hash in zip(rows, hashes):
+        row["password_hash"] = password_hash
+
+    try:
+        sql, params = _values([r for _, r in rows], ("full_name", "email", "password_hash", "role"))
+        cursor.execute(f"INSERT INTO Users (full_name, email, password_hash, role) VALUES {sql}", params)
+
+        emails = [row["email"] for _, row in rows]
+        placeholders = ", ".join(["%s"] * len(emails))
+        cursor.execute(f"SELECT user_id, email FROM Users WHERE email IN ({placeholders})", emails)
+        ids = {email.lower(): user_id for user_id, email in cursor.fetchall()}
+        for _, row in rows:
+            row["user_id"] = ids[row["email"].lower()]
+
+        students = [row for _, row in rows if row["role"] == "Student"]
+        if students:
+            sql, params = _values(students, ("user_id", "department_id", "admission_year"))
+            cursor.execute(
+                f"INSERT INTO Student_Profiles (student_id, department_id, admission_year) VALUES {sql}",
+                params
+            )
+        instructors = [row for _, row in rows if row["role"] == "Instructor"]
+        if instructors:
+            sql, params = _values(instructors, ("user_id", "department_id", "title"))
+            cursor.execute(
+                f"INSERT INTO Instructor_Profiles (instructor_id, department_id, title) VALUES {sql}",
+                params
+            )
+        commit_versioned(conn, "Users", "Instructor_Profiles")
+    except mysql.connector.Error as err:
+        conn.rollback()
+        for line, row in rows:
+            errors.append({"line": line, "email": row["email"], "error": f"Chunk rolled back: {err.msg}"})
+        return []
+
+    return [row["user_id"] for _, row in rows]
+
+
+def provision_csv(text_stream):
+    reader = csv.DictReader(text_stream)
+    missing = REQUIRED_COLUMNS - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+
+    department_ids = reference_cache.department_ids()
+    seen_emails = set()
+    errors = []
+    created = []
+    total = 0
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Line 1 is the header; reader.line_num isn't reliable with quoted newlines.
+        numbered = enumerate(reader, start=2)
+        while True:
+            batch = list(islice(numbered, CHUNK_SIZE))
+            if not batch:
+                break
+            total += len(batch)
+            chunk = []
+            for line, raw in batch:
+                row, error = _validate(raw, department_ids, seen_emails)
+                if error:
+                    errors.append({"line": line, "email": raw.get("email"), "error": error})
+                else:
+                    chunk.append((line, row))
+            if chunk:
+                # Invalidate per committed chunk so a file that fails further
+                # down doesn't leave these users out of caches and search.
+                user_ids = _insert_chunk(conn, cursor, chunk, errors)
+                if user_ids:
+                    for user_id in user_ids:
+                        user_search.changed(user_id)
+                    created.extend(user_ids)
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ValueError(
+            f"Unreadable CSV after line {total + 1}: {e}; "
+            f"{len(created)} users from earlier lines were created"
+        )
+    finally:
+        cursor.close()
+        conn.close()
+
+    errors.sort(key=lambda e: e["line"])
+    return {
+        "total": total,
+        "created": len(created),
+        "failed": len(errors),
+        "errors": errors
+    }
+
+
+def provision_file(binary_file):
+    text_stream = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    try:
+        return provision_csv(text_stream)
+    finally:
+        text_stream.detach()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-create users from a CSV file.")
+    parser.add_argument("csv_path", help="CSV with full_name,email,password[,role,department_id,admission_year,title]")
+    args = parser.parse_args()
+
+    with open(args.csv_path, "rb") as f:
+        report = provision_file(f)
+
+    print(json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import math
+import os
+import threading
+import time
+from fastapi import HTTPException
+
+SHARD_COUNT = 16
+SWEEP_INTERVAL_SECONDS = 30.0
+REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+
+# Token bucket in Redis so every worker draws from the same bucket.
+# Returns the number of seconds to wait, or 0 when the hit was allowed.
+REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class _Shard:
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.next_sweep = 0.0
+
+
+class MemoryBackend:
+    # Buckets are spread over shards with their own locks so concurrent
+    # requests for different keys rarely contend.
+    def __init__(self):
+        self._shards = [_Shard() for _ in range(SHARD_COUNT)]
+
+    def hit(self, key, capacity, rate):
+        shard = self._shards[hash(key) % SHARD_COUNT]
+        now = time.monotonic()
+        with shard.lock:
+            if now >= shard.next_sweep:
+                self._sweep(shard, now)
+            tokens, last, _ = shard.buckets.get(key, (capacity, now, 0))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            shard.buckets[key] = (tokens, now, (capacity - tokens) / rate)
+            return wait
+
+    def _sweep(self, shard, now):
+        # A bucket idle long enough to have refilled is the same as no bucket.
+        shard.next_sweep = now + SWEEP_INTERVAL_SECONDS
+        shard.buckets = {
+            k: v for k, v in shard.buckets.items() if now - v[1] < v[2]
+        }
+
+
+class RedisBackend:
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(REDIS_TOKEN_BUCKET)
+
+    def hit(self, key, capacity, rate):
+        return float(self._script(keys=[f"ratelimit:{key}"], args=[capacity, rate, time.time()]))
+
+
+_backend = RedisBackend(REDIS_URL) if REDIS_URL else MemoryBackend()
+
+
+class RateLimit:
+    def __init__(self, name: str, capacity: int, per_minute: float):
+        self.name = name
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+
+    def check(self, key: str):
+        wait = _backend.hit(f"{self.name}:{key}", self.capacity, self.rate)
+        if wait > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+
+
+login_by_ip = RateLimit("login-ip", int(os.getenv("LOGIN_IP_BURST", "20")), float(os.getenv("LOGIN_IP_PER_MINUTE", "20")))
+login_by_email = RateLimit("login-email", int(os.getenv("LOGIN_EMAIL_BURST", "5")), float(os.getenv("LOGIN_EMAIL_PER_MINUTE", "5")))
+register_by_ip = RateLimit("register-ip", int(os.getenv("REGISTER_IP_BURST", "5")), float(os.getenv("REGISTER_IP_PER_MINUTE", "5")))
+
+
+def client_ip(request) -> str:
+    return request.client.host if request.client else "unknown"
@@ -0,0 +1,192 @@
+import threading
+import mysql.connector
+from .db import get_db_connection
+from .shared_state import current_version
+
+# Tables each dataset is built from. A version bump on any of them (from any
+# worker) makes the dataset reload on its next read.
+DATASET_TABLES = {
+    "departments": ("Departments",),
+    "courses": ("Courses", "Departments"),
+    "instructors": ("Instructor_Profiles", "Users", "Departments"),
+    "prerequisites": ("Course_Prerequisites", "Courses"),
+}
+
+
+def _fold(value):
+    return value.casefold() if value else ""
+
+
+def _load_departments(cursor):
+    cursor.execute("""
+        SELECT department_id, name, faculty_name, budget_code, head_of_department
+        FROM Departments
+        ORDER BY department_id
+    """)
+    rows = cursor.fetchall()
+    by_faculty = {}
+    for row in rows:
+        by_faculty.setdefault(_fold(row["faculty_name"]), []).append(row)
+    return {"rows": rows, "by_faculty": by_faculty}
+
+
+def _load_courses(cursor):
+    cursor.execute("""
+        SELECT c.course_code, c.title, c.credits, c.description, d.name AS department_name,
+               c.department_id
+        FROM Courses c
+        LEFT JOIN Departments d ON c.department_id = d.department_id
+        ORDER BY c.course_id
+    """)
+    rows = []
+    by_department = {}
+    for row in cursor.fetchall():
+        department_id = row.pop("department_id")
+        rows.append(row)
+        by_department.setdefault(department_id, []).append(row)
+    return {"rows": rows, "by_department": by_department}
+
+
+def _load_instructors(cursor):
+    cursor.execute("""
+        SELECT
+            u.full_name,
+            u.email,
+            ip.instructor_id,
+            ip.title,
+            ip.office_location,
+            ip.research_interests,
+            d.name AS department_name
+        FROM Instructor_Profiles ip
+        JOIN Users u ON ip.instructor_id = u.user_id
+        LEFT JOIN Departments d ON ip.department_id = d.department_id
+        ORDER BY ip.instructor_id
+    """)
+    rows = cursor.fetchall()
+    by_id = {row["instructor_id"]: row for row in rows}
+    by_department = {}
+    for row in rows:
+        by_department.setdefault(_fold(row["department_name"]), []).append(row)
+    # Lower-cased copies so LIKE '%x%' filters become plain substring checks.
+    folded = {
+        row["instructor_id"]: (_fold(row["research_interests"]), _fold(row["title"]))
+        for row in rows
+    }
+    return {"rows": rows, "by_id": by_id, "by_department": by_department, "folded": folded}
+
+
+def _load_prerequisites(cursor):
+    cursor.execute("""
+        SELECT main.course_code AS main_code, prereq.course_code, prereq.title
+        FROM Course_Prerequisites p
+        JOIN Courses main ON p.course_id = main.course_id
+        JOIN Courses prereq ON p.prerequisite_id = prereq.course_id
+    """)
+    by_course = {}
+    for row in cursor.fetchall():
+        main_code = row.pop("main_code")
+        by_course.setdefault(_fold(main_code), []).append(row)
+    return {"by_course": by_course}
+
+
+LOADERS = {
+    "departments": _load_departments,
+    "courses": _load_courses,
+    "instructors": _load_instructors,
+    "prerequisites": _load_prerequisites,
+}
+
+
+class ReferenceCache:
+    def __init__(self):
+        # name -> (versions, data), replaced as a whole so the pair always
+        # matches.
+        self._entries = {}
+        self._locks = {name: threading.Lock() for name in LOADERS}
+
+    def _versions_for(self, name):
+        return tuple(current_version(t) for t in DATASET_TABLES[name])
+
+    def _load(self, name, versions):
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            self._entries[name] = (versions, LOADERS[name](cursor))
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _entry(self, name, check=True):
+        entry = self._entries.get(name)
+        if entry is not None and not check:
+            return entry
+        versions = self._versions_for(name)
+        if entry is None or entry[0] != versions:
+            with self._locks[name]:
+                entry = self._entries.get(name)
+                if entry is None or entry[0] != versions:
+                    self._load(name, versions)
+                    entry = self._entries[name]
+        return entry
+
+    def get(self, name, check=True):
+        # check=False skips the version files, for requests whose
+        # conditional_dataset() dependency has just checked them.
+        return self._entry(name, check)[1]
+
+    def versions(self, name):
+        # Versions of the data get() now returns, reloading first if stale.
+        return self._entry(name)[0]
+
+    def warm(self):
+        try:
+            for name in LOADERS:
+                self.get(name)
+        except mysql.connector.Error:
+            # Datasets load lazily on first use if the database isn't up yet.
+            pass
+
+    def departments(self, faculty_name=None, department_name=None, check=True):
+        data = self.get("departments", check)
+        rows = data["by_faculty"].get(_fold(faculty_name), []) if faculty_name else data["rows"]
+        if department_name:
+            needle = _fold(department_name)
+            rows = [r for r in rows if needle in _fold(r["name"])]
+        return list(rows)
+
+    def department_ids(self):
+        return {r["department_id"] for r in self.get("departments")["rows"]}
+
+    def courses(self, department_id=None, check=True):
+        data = self.get("courses", check)
+        if department_id:
+            return list(data["by_department"].get(department_id, []))
+        return list(data["rows"])
+
+    def instructors(self, instructor_id=None, department=None, research=None, title=None):
+        data = self.get("instructors")
+        rows = data["rows"]
+        if instructor_id:
+            row = data["by_id"].get(instructor_id)
+            rows = [row] if row else []
+        if department:
+            needle = _fold(department)
+            matching = {
+                row["instructor_id"]
+                for name, group in data["by_department"].items() if needle in name
+                for row in group
+            }
+            rows = [r for r in rows if r["instructor_id"] in matching]
+        if research:
+            needle = _fold(research)
+            rows = [r for r in rows if needle in data["folded"][r["instructor_id"]][0]]
+        if title:
+            needle = _fold(title)
+            rows = [r for r in rows if needle in data["folded"][r["instructor_id"]][1]]
+        return list(rows)
+
+    def prerequisites(self, course_code):
+        return list(self.get("prerequisites")["by_course"].get(_fold(course_code), []))
+
+
+reference_cache = ReferenceCache()
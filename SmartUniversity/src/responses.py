@@ -0,0 +1,100 @@
+import functools
+import inspect
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi import routing
+from fastapi.routing import APIRoute
+from .profiling import profile_request, track_dependencies, track_thread
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _encode_decimal(value: Decimal):
+    exponent = value.as_tuple().exponent
+    if isinstance(exponent, int) and exponent >= 0:
+        return int(value)
+    return float(value)
+
+
+# Mirrors the subset of FastAPI's jsonable_encoder rules that apply to rows
+# returned by mysql-connector, so both paths produce the same JSON.
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return _encode_decimal(obj)
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (bytes, bytearray)):
+        return bytes(obj).decode()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def _direct_response(endpoint, status_code):
+    def wrap(result):
+        if isinstance(result, (list, dict)):
+            return FastJSONResponse(result, status_code=status_code)
+        return result
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            return wrap(await endpoint(*args, **kwargs))
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        return wrap(endpoint(*args, **kwargs))
+    return wrapper
+
+
+class FastJSONRoute(APIRoute):
+    # Endpoints without a response_model return raw fetchall() rows; turning
+    # them into a FastJSONResponse inside the endpoint skips jsonable_encoder.
+    # Every route also runs under the route profiler.
+    def __init__(self, path, endpoint, **kwargs):
+        response_model = kwargs.get("response_model")
+        if response_model is None or isinstance(response_model, DefaultPlaceholder):
+            endpoint = _direct_response(endpoint, kwargs.get("status_code") or 200)
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = track_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        # Routers included into the app build their handler from a merged
+        # dependant, which FastAPI exposes only through this context variable.
+        context_var = getattr(routing, "_effective_route_context_var", None)
+        context = context_var.get() if context_var is not None else None
+        if context is not None and context.original_route is self:
+            track_dependencies(context.dependant)
+        else:
+            track_dependencies(self.dependant)
+        return super().get_route_handler()
+
+    async def handle(self, scope, receive, send):
+        await profile_request(super().handle, scope, receive, send, self.name, self.path)
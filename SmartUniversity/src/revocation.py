@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from .shared_state import SharedLog
+
+SYNC_INTERVAL_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "1.0"))
+# The shared log is rewritten without expired entries once it has doubled
+# since the last compaction and is at least this big.
+COMPACT_MIN_BYTES = int(os.getenv("REVOCATION_COMPACT_BYTES", str(256 * 1024)))
+
+
+class RevocationList:
+    # Revoked token ids (jti) and per-user cutoffs: every token of a user
+    # issued before the cutoff is invalid. Entries are dropped once every
+    # token they could match has expired anyway, so both maps stay small and
+    # a check is two dict lookups. Revocations reach other workers through a
+    # shared log that is polled at most once per SYNC_INTERVAL_SECONDS.
+    def __init__(self, log: SharedLog):
+        self._log = log
+        self._jtis = {}
+        self._user_cutoffs = {}
+        self._lock = threading.Lock()
+        self._next_sync = 0.0
+        self._next_prune = 0.0
+
+    def is_revoked(self, payload: dict) -> bool:
+        if time.monotonic() >= self._next_sync:
+            self._sync()
+        if payload.get("jti") in self._jtis:
+            return True
+        cutoff = self._user_cutoffs.get(payload.get("user_id"))
+        return cutoff is not None and payload.get("iat", 0) < cutoff[0]
+
+    def revoke_token(self, jti: str, expires_at: float):
+        self._apply("jti", jti, expires_at, expires_at)
+        self._log.append(f"jti {jti} {expires_at} {expires_at}")
+
+    def claim_token(self, jti: str, expires_at: float) -> bool:
+        # Revokes jti unless it already is, atomically across workers; single
+        # use tokens are only honoured by the caller that gets True.
+        def unclaimed(new_lines):
+            self._apply_lines(new_lines)
+            return jti not in self._jtis
+
+        if not self._log.append_if(unclaimed, f"jti {jti} {expires_at} {expires_at}"):
+            return False
+        self._apply("jti", jti, expires_at, expires_at)
+        return True
+
+    def revoke_user(self, user_id: int, keep_for_seconds: float):
+        now = time.time()
+        self._apply("user", str(user_id), now, now + keep_for_seconds)
+        self._log.append(f"user {user_id} {now} {now + keep_for_seconds}")
+
+    def _apply(self, kind, key, value, expires_at):
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            if kind == "jti":
+                self._jtis[key] = expires_at
+            else:
+                user_id = int(key)
+                previous = self._user_cutoffs.get(user_id)
+                if previous is None or previous[0] < value:
+                    self._user_cutoffs[user_id] = (value, expires_at)
+
+    def _apply_lines(self, lines):
+        for line in lines:
+            kind, key, value, expires_at = line.split()
+            self._apply(kind, key, float(value), float(expires_at))
+
+    def _sync(self):
+        self._next_sync = time.monotonic() + SYNC_INTERVAL_SECONDS
+        self._apply_lines(self._log.read_new())
+        if time.monotonic() >= self._next_prune:
+            self._prune()
+
+    def _prune(self):
+        self._next_prune = time.monotonic() + 60.0
+        now = time.time()
+        with self._lock:
+            self._jtis = {k: v for k, v in self._jtis.items() if v > now}
+            self._user_cutoffs = {k: v for k, v in self._user_cutoffs.items() if v[1] > now}
+
+        self._log.compact_if_grown(lambda line: float(line.split()[3]) > now, COMPACT_MIN_BYTES)
+
+
+revocations = RevocationList(SharedLog("revocations"))
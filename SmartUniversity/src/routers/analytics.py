@@ -3,10 +3,12 @@ from pydantic import BaseModel
 from typing import Optional
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
 
 router = APIRouter(
     prefix="/analytics",
-    tags=["Analytics"]
+    tags=["Analytics"],
+    route_class=FastJSONRoute
 )
 
 @router.get("/instructor-workload-performance")
@@ -31,7 +33,7 @@ def instructor_workload_performance(
         performance AS (
             SELECT
                 s.instructor_id,
-                AVG(CASE WHEN e.grade >= 2.0 THEN 1 ELSE 0 END) AS success_ratio
+                AVG(CASE WHEN e.grade_points >= 2.0 THEN 1 ELSE 0 END) AS success_ratio
             FROM Course_Sections s
             JOIN Enrollments e ON s.section_id = e.section_id
             WHERE e.completion_status = 'Completed'
@@ -72,7 +74,7 @@ def most_difficult_courses(
                 c.course_code,
                 c.title,
                 COUNT(e.enrollment_id) AS total_students,
-                SUM(CASE WHEN e.grade < 1.0 THEN 1 ELSE 0 END) AS failures
+                SUM(CASE WHEN e.grade_points < 1.0 THEN 1 ELSE 0 END) AS failures
             FROM Courses c
             JOIN Course_Sections s ON c.course_id = s.course_id
             JOIN Enrollments e ON s.section_id = e.section_id
@@ -114,13 +116,13 @@ def top_risk_students(
         ),
         att AS (
             SELECT
-                a.student_id,
-                a.section_id,
-                COUNT(*) AS total_classes,
-                SUM(CASE WHEN a.status = 'Absent' THEN 1 ELSE 0 END) AS absences
-            FROM Attendance a
-            JOIN enrolled en ON en.student_id = a.student_id AND en.section_id = a.section_id
-            GROUP BY a.student_id, a.section_id
+                ab.student_id,
+                ab.section_id,
+                SUM(BIT_COUNT(ab.present) + BIT_COUNT(ab.absent) + BIT_COUNT(ab.excused) + BIT_COUNT(ab.late)) AS total_classes,
+                SUM(BIT_COUNT(ab.absent)) AS absences
+            FROM Attendance_Bitmaps ab
+            JOIN enrolled en ON en.student_id = ab.student_id AND en.section_id = ab.section_id
+            GROUP BY ab.student_id, ab.section_id
         ),
         asg AS (
             SELECT
@@ -145,7 +147,7 @@ def top_risk_students(
         grades AS (
             SELECT
                 e.student_id,
-                AVG(e.grade) AS avg_grade
+                AVG(e.grade_points) AS avg_grade
             FROM Enrollments e
             JOIN Course_Sections cs ON cs.section_id = e.section_id
             WHERE cs.semester = %s
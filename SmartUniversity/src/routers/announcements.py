@@ -3,10 +3,12 @@ from pydantic import BaseModel
 from typing import Optional
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
 
 router = APIRouter(
     prefix="/announcements",
-    tags=["Announcements"]
+    tags=["Announcements"],
+    route_class=FastJSONRoute
 )
 
 @router.get("/")
@@ -4,10 +4,13 @@ from typing import Optional
 from datetime import datetime
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
+from ..blob_store import release, remove_files
 
 router = APIRouter(
     prefix="/assignments",
-    tags=["Assignments"]
+    tags=["Assignments"],
+    route_class=FastJSONRoute
 )
 
 @router.get("/")
@@ -117,6 +120,11 @@ def update_assignment(assignment_id: int, assignment: AssignmentUpdate):
             if other_weight + data["weight"] > 100.0:
                 raise HTTPException(status_code=400, detail="Total weight exceeds 100%")
 
+        if "description" in data:
+            # Signatures leave out the description's shingles; recompute them
+            # on the next similarity scan.
+            cursor.execute("DELETE FROM Submission_Signatures WHERE assignment_id=%s", (assignment_id,))
+
         set_clause = ", ".join([f"{k}=%s" for k in data])
         values = list(data.values()) + [assignment_id]
 
@@ -139,11 +147,19 @@ def delete_assignment(assignment_id: int):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM Assignments WHERE assignment_id=%s", (assignment_id,))
-        conn.commit()
+        cursor.execute(
+            "SELECT file_path FROM Submissions WHERE assignment_id=%s AND file_path LIKE 'sha256:%%'",
+            (assignment_id,)
+        )
+        file_paths = [r[0] for r in cursor.fetchall()]
 
+        # Blob rows before Submissions, the order collect_garbage() locks in.
+        unreferenced = release(cursor, file_paths)
+        cursor.execute("DELETE FROM Assignments WHERE assignment_id=%s", (assignment_id,))
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Assignment not found")
+        conn.commit()
+        remove_files(conn, unreferenced)
 
         return {"message": "Assignment deleted"}
     finally:
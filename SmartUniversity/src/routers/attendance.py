@@ -1,13 +1,29 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Literal
+from typing import Optional, Literal, Dict
+from collections import Counter
+import csv
+import io
 from datetime import date
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
+from ..card_ingest import ingest_file
+from ..attendance_bitmaps import (
+    record_statuses,
+    clear_day,
+    status_counts,
+    attendance_streaks,
+    absence_heatmap,
+    section_summary_query,
+    summary_row
+)
 
 router = APIRouter(
     prefix="/attendance",
-    tags=["Attendance"]
+    tags=["Attendance"],
+    route_class=FastJSONRoute
 )
 
 class AttendanceCreate(BaseModel):
@@ -19,6 +35,12 @@ class AttendanceCreate(BaseModel):
 class AttendanceUpdate(BaseModel):
     status: Literal['Present', 'Absent', 'Excused']
 
+class RosterAttendance(BaseModel):
+    section_id: int
+    date: date
+    statuses: Dict[int, Literal['Present', 'Absent', 'Excused']] = {}
+    default_status: Literal['Present', 'Absent', 'Excused'] = 'Present'
+
 @router.get("/")
 def list_attendance(
     section_id: int,
@@ -44,7 +66,7 @@ def list_attendance(
         query = """
         SELECT 
             a.attendance_id,
-            a.date,
+            a.attendance_date AS date,
             a.status,
             u.full_name as student_name,
             u.user_id as student_id
@@ -59,10 +81,10 @@ def list_attendance(
             params.append(student_id)
 
         if date_filter:
-            query += " AND a.date = %s"
+            query += " AND a.attendance_date = %s"
             params.append(date_filter)
 
-        query += " ORDER BY a.date DESC"
+        query += " ORDER BY a.attendance_date DESC"
 
         cursor.execute(query, params)
         return cursor.fetchall()
@@ -83,27 +105,20 @@ def get_attendance_ratio(
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        cursor.execute("""
-            SELECT COUNT(*),
-                   SUM(status='Present'),
-                   SUM(status='Excused'),
-                   SUM(status='Absent')
-            FROM Attendance
-            WHERE section_id = %s AND student_id = %s
-        """, (section_id, student_id))
-
-        total, present, excused, absent = cursor.fetchone()
+        present, excused, absent, late = status_counts(cursor, section_id, student_id)
+        total = present + excused + absent + late
 
         if total == 0:
             return {"message": "No attendance records found"}
 
-        participation = ((present or 0) + (excused or 0)) / total * 100
+        participation = (present + excused) / total * 100
 
         return {
             "total_classes": total,
-            "present": present or 0,
-            "excused": excused or 0,
-            "absent": absent or 0,
+            "present": present,
+            "excused": excused,
+            "absent": absent,
+            "late": late,
             "participation_rate": f"{participation:.2f}%"
         }
 
@@ -111,10 +126,130 @@ def get_attendance_ratio(
         cursor.close()
         conn.close()
 
-@router.post("/", dependencies=[Depends(require_role(["Instructor", "Admin"]))])
+EXPORT_FETCH_SIZE = 500
+EXPORT_COLUMNS = [
+    "section_id", "student_id", "student_name", "total_classes",
+    "present", "excused", "absent", "late", "participation_rate"
+]
+
+def _check_sections(cursor, section_ids, user):
+    placeholders = ", ".join(["%s"] * len(section_ids))
+    query = f"SELECT section_id FROM Course_Sections WHERE section_id IN ({placeholders})"
+    params = list(section_ids)
+    if user["role"] == "Instructor":
+        query += " AND instructor_id = %s"
+        params.append(user["user_id"])
+    cursor.execute(query, params)
+    found = {r[0] for r in cursor.fetchall()}
+    missing = set(section_ids) - found
+    if missing:
+        raise HTTPException(
+            status_code=403 if user["role"] == "Instructor" else 404,
+            detail=f"Sections not found or not yours: {sorted(missing)}"
+        )
+
+@router.get("/summary/{section_id}")
+def get_section_summary(
+    section_id: int,
+    user=Depends(require_role(["Instructor", "Admin"]))
+):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        _check_sections(cursor, [section_id], user)
+        sql, params = section_summary_query([section_id])
+        cursor.execute(sql, params)
+        return [summary_row(*row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+def _export_csv(section_ids):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        sql, params = section_summary_query(section_ids)
+        cursor.execute(sql, params)
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            writer.writerows(summary_row(*row) for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        cursor.close()
+        conn.close()
+
+@router.get("/summary-export")
+def export_section_summaries(
+    section_ids: list[int] = Query(..., min_length=1, max_length=500),
+    user=Depends(require_role(["Instructor", "Admin"]))
+):
+    section_ids = sorted(set(section_ids))
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        _check_sections(cursor, section_ids, user)
+    finally:
+        cursor.close()
+        conn.close()
+
+    return StreamingResponse(
+        _export_csv(section_ids),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="attendance_summary.csv"'}
+    )
+
+@router.get("/streaks/{section_id}/{student_id}")
+def get_attendance_streaks(
+    section_id: int,
+    student_id: int,
+    user=Depends(require_token)
+):
+    if user["role"] == "Student" and user["user_id"] != student_id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        return attendance_streaks(cursor, section_id, student_id)
+    finally:
+        cursor.close()
+        conn.close()
+
+@router.get("/heatmap/{section_id}")
+def get_absence_heatmap(
+    section_id: int,
+    user=Depends(require_role(["Instructor", "Admin"]))
+):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        if user["role"] == "Instructor":
+            cursor.execute("""
+                SELECT 1 FROM Course_Sections
+                WHERE section_id = %s AND instructor_id = %s
+            """, (section_id, user["user_id"]))
+            if not cursor.fetchone():
+                raise HTTPException(status_code=403, detail="Access denied to this section")
+
+        return absence_heatmap(cursor, section_id)
+    finally:
+        cursor.close()
+        conn.close()
+
+@router.post("/")
 def mark_attendance(
     record: AttendanceCreate,
-    user=Depends(require_token)
+    user=Depends(require_role(["Instructor", "Admin"]))
 ):
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -130,16 +265,17 @@ def mark_attendance(
 
         cursor.execute("""
             SELECT 1 FROM Attendance
-            WHERE section_id=%s AND student_id=%s AND date=%s
+            WHERE section_id=%s AND student_id=%s AND attendance_date=%s
         """, (record.section_id, record.student_id, record.date))
 
         if cursor.fetchone():
             raise HTTPException(status_code=400, detail="Attendance already recorded")
 
         cursor.execute("""
-            INSERT INTO Attendance (section_id, student_id, date, status)
+            INSERT INTO Attendance (section_id, student_id, attendance_date, status)
             VALUES (%s, %s, %s, %s)
         """, (record.section_id, record.student_id, record.date, record.status))
+        record_statuses(cursor, record.section_id, record.date, [(record.student_id, record.status)])
 
         conn.commit()
         return {"message": "Attendance recorded"}
@@ -148,30 +284,99 @@ def mark_attendance(
         cursor.close()
         conn.close()
 
-@router.put("/{attendance_id}", dependencies=[Depends(require_role(["Instructor", "Admin"]))])
+@router.post("/roster")
+def mark_roster_attendance(
+    roster: RosterAttendance,
+    user=Depends(require_role(["Instructor", "Admin"]))
+):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "SELECT instructor_id FROM Course_Sections WHERE section_id = %s",
+            (roster.section_id,)
+        )
+        section = cursor.fetchone()
+        if not section:
+            raise HTTPException(status_code=404, detail="Section not found")
+        if user["role"] == "Instructor" and section[0] != user["user_id"]:
+            raise HTTPException(status_code=403, detail="You do not teach this section")
+
+        cursor.execute("""
+            SELECT student_id FROM Enrollments
+            WHERE section_id = %s AND completion_status <> 'Dropped'
+        """, (roster.section_id,))
+        enrolled = [r[0] for r in cursor.fetchall()]
+        if not enrolled:
+            raise HTTPException(status_code=400, detail="No students enrolled in this section")
+
+        unknown = set(roster.statuses) - set(enrolled)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Students not enrolled in this section: {sorted(unknown)}"
+            )
+
+        rows = [
+            (roster.section_id, student_id, roster.date, roster.statuses.get(student_id, roster.default_status))
+            for student_id in enrolled
+        ]
+        placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(rows))
+        cursor.execute(f"""
+            INSERT INTO Attendance (section_id, student_id, attendance_date, status)
+            VALUES {placeholders}
+            ON DUPLICATE KEY UPDATE status = VALUES(status)
+        """, [v for row in rows for v in row])
+        record_statuses(cursor, roster.section_id, roster.date, [(row[1], row[3]) for row in rows])
+        conn.commit()
+
+        return {
+            "message": "Roster attendance recorded",
+            "students": len(rows),
+            "statuses": Counter(row[3] for row in rows)
+        }
+
+    finally:
+        cursor.close()
+        conn.close()
+
+@router.post("/card-import", dependencies=[Depends(require_role(["Admin"]))])
+def import_card_logs(file: UploadFile = File(...)):
+    try:
+        return ingest_file(file.file)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/{attendance_id}")
 def update_attendance_status(
     attendance_id: int,
     update: AttendanceUpdate,
-    user=Depends(require_token)
+    user=Depends(require_role(["Instructor", "Admin"]))
 ):
     conn = get_db_connection()
     cursor = conn.cursor()
 
     try:
-        if user["role"] == "Instructor":
-            cursor.execute("""
-                SELECT 1
-                FROM Attendance a
-                JOIN Course_Sections s ON a.section_id = s.section_id
-                WHERE a.attendance_id = %s AND s.instructor_id = %s
-            """, (attendance_id, user["user_id"]))
-            if not cursor.fetchone():
-                raise HTTPException(status_code=403, detail="Access denied")
+        cursor.execute("""
+            SELECT a.section_id, a.student_id, a.attendance_date, s.instructor_id
+            FROM Attendance a
+            JOIN Course_Sections s ON a.section_id = s.section_id
+            WHERE a.attendance_id = %s
+        """, (attendance_id,))
+        row = cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Attendance record not found")
+        section_id, student_id, day, instructor_id = row
+
+        if user["role"] == "Instructor" and instructor_id != user["user_id"]:
+            raise HTTPException(status_code=403, detail="Access denied")
 
         cursor.execute(
             "UPDATE Attendance SET status=%s WHERE attendance_id=%s",
             (update.status, attendance_id)
         )
+        record_statuses(cursor, section_id, day, [(student_id, update.status)])
         conn.commit()
 
         return {"message": "Attendance updated"}
@@ -187,15 +392,17 @@ def bulk_delete_attendance(section_id: int, date: date):
 
     try:
         cursor.execute(
-            "DELETE FROM Attendance WHERE section_id=%s AND date=%s",
+            "DELETE FROM Attendance WHERE section_id=%s AND attendance_date=%s",
             (section_id, date)
         )
-        conn.commit()
-
-        if cursor.rowcount == 0:
+        deleted = cursor.rowcount
+        if deleted == 0:
             raise HTTPException(status_code=404, detail="No records found")
 
-        return {"message": f"Deleted {cursor.rowcount} records"}
+        clear_day(cursor, section_id, date)
+        conn.commit()
+
+        return {"message": f"Deleted {deleted} records"}
 
     finally:
         cursor.close()
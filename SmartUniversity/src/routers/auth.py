@@ -1,67 +1,162 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
+from typing import Optional
 from datetime import datetime, timedelta
 import jwt
 import hashlib
+import os
+import time
+import uuid
+from fastapi.concurrency import run_in_threadpool
 from ..db import get_db_connection
+from ..lru import LRUCache
+from ..server_timing import record_timing
+from ..responses import FastJSONRoute
+from ..shared_state import commit_versioned
+from ..revocation import revocations
+from ..user_search import user_search
+from ..passwords import hash_password, try_hash_password, verify_password
+from ..rate_limit import login_by_ip, login_by_email, register_by_ip, client_ip
 
 SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
 TOKEN_EXPIRE_HOURS = 2
+REFRESH_TOKEN_EXPIRE_DAYS = 7
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
 
 router = APIRouter(
     prefix="/auth",
-    tags=["Authentication"]
+    tags=["Authentication"],
+    route_class=FastJSONRoute
 )
 
 security = HTTPBearer()
 
+# Verified payloads keyed by the token's SHA-256 digest, so repeated requests
+# with the same bearer token skip the HMAC check and JSON decode.
+token_cache = LRUCache(TOKEN_CACHE_SIZE)
+
 class LoginRequest(BaseModel):
     email: str
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 class RegisterRequest(BaseModel):
     full_name: str
     email: str
     password: str
     role: str
 
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def create_token(user_id: int, role: str):
+def create_token(user_id: int, role: str, token_type: str = "access"):
+    lifetime = timedelta(hours=TOKEN_EXPIRE_HOURS)
+    if token_type == "refresh":
+        lifetime = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     payload = {
         "user_id": user_id,
         "role": role,
-        "exp": datetime.utcnow() + timedelta(hours=TOKEN_EXPIRE_HOURS)
+        "type": token_type,
+        "jti": uuid.uuid4().hex,
+        # Float so a revocation cutoff can tell apart tokens issued within the same second.
+        "iat": time.time(),
+        "exp": datetime.utcnow() + lifetime
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
-@router.post("/login")
-def login(data: LoginRequest):
+def create_token_pair(user_id: int, role: str):
+    return {
+        "access_token": create_token(user_id, role),
+        "refresh_token": create_token(user_id, role, "refresh"),
+        "token_type": "bearer"
+    }
+
+def revoke_user_tokens(user_id: int):
+    revocations.revoke_user(user_id, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS).total_seconds())
+
+def _find_login_user(email: str, ip: str):
+    login_by_ip.check(ip)
+    login_by_email.check(email.strip().lower())
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute(
-        "SELECT user_id, password_hash, role FROM Users WHERE email = %s AND is_active = 1",
-        (data.email,)
-    )
-    user = cursor.fetchone()
-    if not user or user["password_hash"] != hash_password(data.password):
+    try:
+        cursor.execute(
+            "SELECT user_id, password_hash, role FROM Users WHERE email = %s AND is_active = 1",
+            (email,)
+        )
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+def _store_password_hash(user_id: int, password_hash: str):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "UPDATE Users SET password_hash = %s WHERE user_id = %s",
+            (password_hash, user_id)
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+# Async so the request waits for the hash on the event loop instead of
+# pinning a threadpool thread; the database work still runs in the threadpool.
+@router.post("/login")
+async def login(data: LoginRequest, request: Request):
+    user = await run_in_threadpool(_find_login_user, data.email, client_ip(request))
+    matches, needs_rehash = await verify_password(data.password, user["password_hash"] if user else "")
+    if not user or not matches:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    token = create_token(user["user_id"], user["role"])
-    return {"access_token": token, "token_type": "bearer"}
+    if needs_rehash:
+        # Best effort: a correct password never gets a 503 because the pool
+        # is busy; the upgrade happens on a later login instead.
+        password_hash = await try_hash_password(data.password)
+        if password_hash:
+            await run_in_threadpool(_store_password_hash, user["user_id"], password_hash)
+    return create_token_pair(user["user_id"], user["role"])
 
-@router.post("/register")
-def register(data: RegisterRequest):
+@router.post("/refresh")
+def refresh(data: RefreshRequest):
+    payload = decode_token(data.refresh_token, "refresh")
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "SELECT role FROM Users WHERE user_id = %s AND is_active = 1",
+            (payload["user_id"],)
+        )
+        user = cursor.fetchone()
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid token")
+    finally:
+        cursor.close()
+        conn.close()
+
+    # Refresh tokens are single use: of concurrent refreshes with the same
+    # token only the one that revokes it gets a new pair.
+    if not revocations.claim_token(payload["jti"], payload["exp"]):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return create_token_pair(payload["user_id"], user["role"])
+
+def _insert_registered_user(data: RegisterRequest, password_hash: str):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
         cursor.execute(
             "INSERT INTO Users (full_name, email, password_hash, role) VALUES (%s, %s, %s, %s)",
-            (data.full_name, data.email, hash_password(data.password), data.role)
+            (data.full_name, data.email, password_hash, data.role)
         )
-        conn.commit()
+        commit_versioned(conn, "Users")
+        user_search.changed(cursor.lastrowid)
         return {"message": "User registered successfully"}
     except Exception as e:
         conn.rollback()
@@ -70,19 +165,69 @@ def register(data: RegisterRequest):
         cursor.close()
         conn.close()
 
-def require_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
+@router.post("/register")
+async def register(data: RegisterRequest, request: Request):
+    await run_in_threadpool(register_by_ip.check, client_ip(request))
+    password_hash = await hash_password(data.password)
+    return await run_in_threadpool(_insert_registered_user, data, password_hash)
+
+def decode_token(token: str, token_type: str = "access") -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("type", "access") != token_type:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if revocations.is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return payload
 
-def require_role(allowed_roles: list[str]):
-    def role_checker(payload: dict = Depends(require_token)):
-        if payload["role"] not in allowed_roles:
+def verify_token(token: str) -> dict:
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        if payload["exp"] <= time.time():
+            token_cache.pop(key)
+            raise HTTPException(status_code=401, detail="Token expired")
+        if revocations.is_revoked(payload):
+            raise HTTPException(status_code=401, detail="Token revoked")
+        return payload
+
+    payload = decode_token(token)
+    token_cache.set(key, payload)
+    return payload
+
+def authenticate(request: Request, credentials: HTTPAuthorizationCredentials, allowed_roles=None):
+    start = time.perf_counter()
+    try:
+        payload = verify_token(credentials.credentials)
+        if allowed_roles is not None and payload["role"] not in allowed_roles:
             raise HTTPException(status_code=403, detail="Forbidden")
         return payload
-    return role_checker
\ No newline at end of file
+    finally:
+        record_timing(request, "auth", time.perf_counter() - start)
+
+def require_token(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return authenticate(request, credentials)
+
+def require_role(allowed_roles: list[str]):
+    allowed = frozenset(allowed_roles)
+    def role_checker(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
+        return authenticate(request, credentials, allowed)
+    return role_checker
+
+
+@router.post("/logout")
+def logout(data: LogoutRequest, user=Depends(require_token)):
+    if user.get("jti"):
+        revocations.revoke_token(user["jti"], user["exp"])
+    if data.refresh_token:
+        try:
+            payload = decode_token(data.refresh_token, "refresh")
+        except HTTPException:
+            payload = None
+        if payload and payload["user_id"] == user["user_id"]:
+            revocations.revoke_token(payload["jti"], payload["exp"])
+    return {"message": "Logged out"}
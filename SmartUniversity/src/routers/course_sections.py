@@ -3,13 +3,17 @@ from pydantic import BaseModel
 from typing import Optional
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
+from ..http_cache import conditional_get
+from ..shared_state import commit_versioned
 
 router = APIRouter(
     prefix="/sections",
-    tags=["Course Sections"]
+    tags=["Course Sections"],
+    route_class=FastJSONRoute
 )
 
-@router.get("/")
+@router.get("/", dependencies=[Depends(conditional_get("Course_Sections", "Courses", "Users", "Enrollments"))])
 def list_sections(semester: Optional[str] = None, course_code: Optional[str] = None, user=Depends(require_token)):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
@@ -94,7 +98,7 @@ def create_section(section: SectionCreate):
             section.classroom,
             section.capacity
         ))
-        conn.commit()
+        commit_versioned(conn, "Course_Sections")
         return {"message": "Section created", "section_id": cursor.lastrowid}
     finally:
         cursor.close()
@@ -149,7 +153,7 @@ def update_section(section_id: int, section: SectionUpdate):
             f"UPDATE Course_Sections SET {set_clause} WHERE section_id=%s",
             values
         )
-        conn.commit()
+        commit_versioned(conn, "Course_Sections")
         return {"message": "Section updated"}
     finally:
         cursor.close()
@@ -171,7 +175,7 @@ def delete_section(section_id: int):
             "DELETE FROM Course_Sections WHERE section_id=%s",
             (section_id,)
         )
-        conn.commit()
+        commit_versioned(conn, "Course_Sections")
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Section not found")
@@ -3,31 +3,20 @@ from pydantic import BaseModel
 from typing import Optional
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
+from ..http_cache import conditional_dataset
+from ..reference_cache import reference_cache
+from ..shared_state import commit_versioned
 
 router = APIRouter(
     prefix="/courses",
-    tags=["Courses"]
+    tags=["Courses"],
+    route_class=FastJSONRoute
 )
 
-@router.get("/")
+@router.get("/", dependencies=[Depends(conditional_dataset("courses"))])
 def list_courses(department_id: Optional[int] = None, user=Depends(require_token)):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        query = """
-        SELECT c.course_code, c.title, c.credits, c.description, d.name AS department_name
-        FROM Courses c
-        LEFT JOIN Departments d ON c.department_id = d.department_id
-        """
-        if department_id:
-            query += " WHERE c.department_id = %s"
-            cursor.execute(query, (department_id,))
-        else:
-            cursor.execute(query)
-        return cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+    return reference_cache.courses(department_id, check=False)
 
 @router.get("/teaching-history/{instructor_id}")
 def get_instructor_teaching_history(
@@ -69,7 +58,7 @@ def create_course(course: CourseCreate):
             INSERT INTO Courses (course_code, title, department_id, credits, description)
             VALUES (%s, %s, %s, %s, %s)
         """, (course.course_code, course.title, course.department_id, course.credits, course.description))
-        conn.commit()
+        commit_versioned(conn, "Courses")
         return {"message": "Course created", "course_code": course.course_code}
     finally:
         cursor.close()
@@ -97,7 +86,7 @@ def update_course(course_code: str, course: CourseUpdate):
             f"UPDATE Courses SET {set_clause} WHERE course_code=%s",
             values
         )
-        conn.commit()
+        commit_versioned(conn, "Courses")
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Course not found")
@@ -131,7 +120,7 @@ def delete_course(course_code: str):
             "DELETE FROM Courses WHERE course_code=%s",
             (course_code,)
         )
-        conn.commit()
+        commit_versioned(conn, "Courses")
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Course not found")
@@ -3,41 +3,24 @@ from pydantic import BaseModel
 from typing import Optional
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
+from ..http_cache import conditional_dataset
+from ..reference_cache import reference_cache
+from ..shared_state import commit_versioned
 
 router = APIRouter(
     prefix="/departments",
-    tags=["Departments"]
+    tags=["Departments"],
+    route_class=FastJSONRoute
 )
 
-@router.get("/")
+@router.get("/", dependencies=[Depends(conditional_dataset("departments"))])
 def list_departments(
     faculty_name: Optional[str] = None,
     department_name: Optional[str] = None,
     user=Depends(require_token)
 ):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        query = """
-        SELECT department_id, name, faculty_name, budget_code, head_of_department
-        FROM Departments
-        WHERE 1=1
-        """
-        params = []
-
-        if faculty_name:
-            query += " AND faculty_name = %s"
-            params.append(faculty_name)
-
-        if department_name:
-            query += " AND name LIKE %s"
-            params.append(f"%{department_name}%")
-
-        cursor.execute(query, params)
-        return cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+    return reference_cache.departments(faculty_name, department_name, check=False)
 
 class DepartmentCreate(BaseModel):
     name: str
@@ -54,7 +37,7 @@ def create_department(dept: DepartmentCreate):
             INSERT INTO Departments (name, faculty_name, budget_code, head_of_department)
             VALUES (%s, %s, %s, %s)
         """, (dept.name, dept.faculty_name, dept.budget_code, dept.head_of_department))
-        conn.commit()
+        commit_versioned(conn, "Departments")
         return {"message": "Department created", "department_id": cursor.lastrowid}
     finally:
         cursor.close()
@@ -81,7 +64,7 @@ def update_department(department_id: int, dept: DepartmentUpdate):
             f"UPDATE Departments SET {set_clause} WHERE department_id=%s",
             values
         )
-        conn.commit()
+        commit_versioned(conn, "Departments")
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Department not found")
@@ -121,7 +104,7 @@ def delete_department(department_id: int):
             "DELETE FROM Departments WHERE department_id=%s",
             (department_id,)
         )
-        conn.commit()
+        commit_versioned(conn, "Departments")
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Department not found")
@@ -3,10 +3,16 @@ from pydantic import BaseModel
 from typing import Optional, Literal
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
+from ..shared_state import commit_versioned
+from ..gpa import apply_grade_change
+from ..grade_scale import normalize_grade, grade_points
+from ..transcript_cache import transcript_cache
 
 router = APIRouter(
     prefix="/enrollments",
-    tags=["Enrollments"]
+    tags=["Enrollments"],
+    route_class=FastJSONRoute
 )
 
 @router.get("/")
@@ -26,6 +32,7 @@ def list_enrollments(section_id: Optional[int] = None, student_id: Optional[int]
             c.course_code,
             c.title as course_name,
             e.grade,
+            e.grade_points,
             e.completion_status
         FROM Enrollments e
         JOIN Users u ON e.student_id = u.user_id
@@ -52,8 +59,8 @@ def list_enrollments(section_id: Optional[int] = None, student_id: Optional[int]
 class EnrollmentCreate(BaseModel):
     section_id: int
 
-@router.post("/", dependencies=[Depends(require_role(["Student"]))])
-def enroll_student(enrollment: EnrollmentCreate, user=Depends(require_token)):
+@router.post("/")
+def enroll_student(enrollment: EnrollmentCreate, user=Depends(require_role(["Student"]))):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
@@ -103,7 +110,8 @@ def enroll_student(enrollment: EnrollmentCreate, user=Depends(require_token)):
             VALUES (%s, %s, 'Enrolled')
         """, (student_id, enrollment.section_id))
 
-        conn.commit()
+        commit_versioned(conn, "Enrollments")
+        transcript_cache.invalidate(student_id)
         return {"message": "Enrollment successful"}
 
     except Exception as e:
@@ -118,7 +126,7 @@ def enroll_student(enrollment: EnrollmentCreate, user=Depends(require_token)):
         conn.close()
 
 class GradeUpdate(BaseModel):
-    grade: Optional[float] = None
+    grade: Optional[str] = None
     completion_status: Optional[Literal["Enrolled", "Completed", "Dropped", "Failed"]] = None
 
 @router.put("/{enrollment_id}", dependencies=[Depends(require_role(["Instructor", "Admin"]))])
@@ -130,6 +138,27 @@ def update_grade_or_status(enrollment_id: int, update: GradeUpdate):
         if not data:
             raise HTTPException(status_code=400, detail="No fields provided")
 
+        if "grade" in data:
+            if data["grade"] is not None:
+                try:
+                    data["grade"] = normalize_grade(data["grade"])
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+            data["grade_points"] = grade_points(data["grade"])
+
+        cursor.execute("""
+            SELECT e.student_id, e.grade_points, c.credits
+            FROM Enrollments e
+            JOIN Course_Sections s ON e.section_id = s.section_id
+            JOIN Courses c ON s.course_id = c.course_id
+            WHERE e.enrollment_id = %s
+            FOR UPDATE
+        """, (enrollment_id,))
+        current = cursor.fetchone()
+        if not current:
+            raise HTTPException(status_code=404, detail="Enrollment not found")
+        student_id, old_grade_points, credits = current
+
         set_clause = ", ".join([f"{k}=%s" for k in data])
         values = list(data.values()) + [enrollment_id]
 
@@ -137,10 +166,10 @@ def update_grade_or_status(enrollment_id: int, update: GradeUpdate):
             f"UPDATE Enrollments SET {set_clause} WHERE enrollment_id=%s",
             values
         )
+        if "grade" in data:
+            apply_grade_change(cursor, student_id, credits, old_grade_points, data["grade_points"])
         conn.commit()
-
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Enrollment not found")
+        transcript_cache.invalidate(student_id)
 
         return {"message": "Enrollment updated"}
     finally:
@@ -152,7 +181,14 @@ def drop_course(enrollment_id: int, user=Depends(require_token)):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT student_id FROM Enrollments WHERE enrollment_id = %s", (enrollment_id,))
+        cursor.execute("""
+            SELECT e.student_id, e.grade_points, c.credits
+            FROM Enrollments e
+            JOIN Course_Sections s ON e.section_id = s.section_id
+            JOIN Courses c ON s.course_id = c.course_id
+            WHERE e.enrollment_id = %s
+            FOR UPDATE
+        """, (enrollment_id,))
         enrollment = cursor.fetchone()
         
         if not enrollment:
@@ -162,7 +198,9 @@ def drop_course(enrollment_id: int, user=Depends(require_token)):
             raise HTTPException(status_code=403, detail="You can only drop your own enrollments")
 
         cursor.execute("DELETE FROM Enrollments WHERE enrollment_id = %s", (enrollment_id,))
-        conn.commit()
+        apply_grade_change(cursor, enrollment["student_id"], enrollment["credits"], enrollment["grade_points"], None)
+        commit_versioned(conn, "Enrollments")
+        transcript_cache.invalidate(enrollment["student_id"])
 
         return {"message": "Enrollment dropped"}
     finally:
@@ -3,10 +3,14 @@ from pydantic import BaseModel
 from typing import Optional
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
+from ..reference_cache import reference_cache
+from ..shared_state import commit_versioned
 
 router = APIRouter(
     prefix="/instructor-profiles",
-    tags=["Instructor Profiles"]
+    tags=["Instructor Profiles"],
+    route_class=FastJSONRoute
 )
 
 @router.get("/")
@@ -17,54 +21,14 @@ def list_instructor_profiles(
     title: Optional[str] = None,
     user=Depends(require_token)
 ):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        query = """
-        SELECT 
-            u.full_name,
-            u.email,
-            ip.instructor_id,
-            ip.title,
-            ip.office_location,
-            ip.research_interests,
-            d.name AS department_name
-        FROM Instructor_Profiles ip
-        JOIN Users u ON ip.instructor_id = u.user_id
-        LEFT JOIN Departments d ON ip.department_id = d.department_id
-        WHERE 1=1
-        """
-        params = []
-
-        if instructor_id:
-            query += " AND ip.instructor_id = %s"
-            params.append(instructor_id)
-
-        if department:
-            query += " AND d.name LIKE %s"
-            params.append(f"%{department}%")
-
-        if research:
-            query += " AND ip.research_interests LIKE %s"
-            params.append(f"%{research}%")
-
-        if title:
-            query += " AND ip.title LIKE %s"
-            params.append(f"%{title}%")
+    rows = reference_cache.instructors(instructor_id, department, research, title)
 
-        cursor.execute(query, params)
-
-        if instructor_id:
-            row = cursor.fetchone()
-            if not row:
-                raise HTTPException(status_code=404, detail="Instructor profile not found")
-            return row
-
-        return cursor.fetchall()
+    if instructor_id:
+        if not rows:
+            raise HTTPException(status_code=404, detail="Instructor profile not found")
+        return rows[0]
 
-    finally:
-        cursor.close()
-        conn.close()
+    return rows
 
 class InstructorProfileUpdate(BaseModel):
     title: Optional[str] = None
@@ -97,7 +61,7 @@ def update_instructor_profile(
             f"UPDATE Instructor_Profiles SET {set_clause} WHERE instructor_id = %s",
             values
         )
-        conn.commit()
+        commit_versioned(conn, "Instructor_Profiles")
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Instructor profile not found")
@@ -4,13 +4,17 @@ from typing import Optional, Literal
 from datetime import time
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
+from ..http_cache import conditional_get
+from ..shared_state import commit_versioned
 
 router = APIRouter(
     prefix="/office-hours",
-    tags=["Office Hours"]
+    tags=["Office Hours"],
+    route_class=FastJSONRoute
 )
 
-@router.get("/")
+@router.get("/", dependencies=[Depends(conditional_get("Office_Hours", "Users"))])
 def list_office_hours(
     instructor_id: Optional[int] = None,
     day_filter: Optional[
@@ -83,7 +87,7 @@ def create_office_hour(slot: OfficeHourCreate, user=Depends(require_role(["Instr
             """,
             (instructor_id, slot.day_of_week, slot.start_time, slot.end_time, slot.location)
         )
-        conn.commit()
+        commit_versioned(conn, "Office_Hours")
         return {"message": "Office hour slot added", "id": cursor.lastrowid}
     finally:
         cursor.close()
@@ -118,7 +122,7 @@ def update_office_hour(office_hour_id: int, update: OfficeHourUpdate, user=Depen
         values = list(data.values()) + [office_hour_id]
 
         cursor.execute(f"UPDATE Office_Hours SET {set_clause} WHERE office_hour_id = %s", values)
-        conn.commit()
+        commit_versioned(conn, "Office_Hours")
         return {"message": "Office hour updated"}
     finally:
         cursor.close()
@@ -139,7 +143,7 @@ def delete_office_hour(office_hour_id: int, user=Depends(require_role(["Instruct
             raise HTTPException(status_code=403, detail="You can only delete your own office hours")
 
         cursor.execute("DELETE FROM Office_Hours WHERE office_hour_id = %s", (office_hour_id,))
-        conn.commit()
+        commit_versioned(conn, "Office_Hours")
         return {"message": "Office hour slot removed"}
     finally:
         cursor.close()
@@ -2,32 +2,20 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
+from ..reference_cache import reference_cache
+from ..shared_state import commit_versioned
 import mysql.connector
 
 router = APIRouter(
     prefix="/prerequisites",
-    tags=["Prerequisites"]
+    tags=["Prerequisites"],
+    route_class=FastJSONRoute
 )
 
 @router.get("/{course_code}")
 def get_course_prerequisites(course_code: str, user=Depends(require_token)):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        query = """
-        SELECT 
-            prereq.course_code,
-            prereq.title
-        FROM Course_Prerequisites p
-        JOIN Courses main ON p.course_id = main.course_id
-        JOIN Courses prereq ON p.prerequisite_id = prereq.course_id
-        WHERE main.course_code = %s
-        """
-        cursor.execute(query, (course_code,))
-        return cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+    return reference_cache.prerequisites(course_code)
 
 class PrerequisiteCreate(BaseModel):
     course_code: str
@@ -56,7 +44,7 @@ def add_prerequisite(prereq: PrerequisiteCreate):
             "INSERT INTO Course_Prerequisites (course_id, prerequisite_id) VALUES (%s, %s)",
             (id_map[prereq.course_code], id_map[prereq.prerequisite_code])
         )
-        conn.commit()
+        commit_versioned(conn, "Course_Prerequisites")
 
         return {"message": "Prerequisite added"}
 
@@ -92,7 +80,7 @@ def delete_prerequisite(course_code: str, prerequisite_code: str):
             """,
             (id_map[course_code], id_map[prerequisite_code])
         )
-        conn.commit()
+        commit_versioned(conn, "Course_Prerequisites")
 
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Prerequisite link not found")
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from typing import Optional
+from ..profiling import state, to_folded, DEFAULT_INTERVAL_MS, MAX_DUMPS
+from ..routers.auth import require_role
+from ..responses import FastJSONRoute
+
+router = APIRouter(
+    prefix="/profiling",
+    tags=["Profiling"],
+    route_class=FastJSONRoute
+)
+
+class ProfilerSettings(BaseModel):
+    enabled: bool = True
+    sample_rate: float = 0.0
+    routes: list[str] = []
+    interval_ms: float = DEFAULT_INTERVAL_MS
+    max_dumps: int = MAX_DUMPS
+
+@router.get("/", dependencies=[Depends(require_role(["Admin"]))])
+def get_profiler():
+    return {
+        "settings": state.settings(),
+        "dumps": [
+            {k: v for k, v in dump.items() if k != "stacks"}
+            for dump in state.list_dumps()
+        ]
+    }
+
+@router.put("/", dependencies=[Depends(require_role(["Admin"]))])
+def configure_profiler(settings: ProfilerSettings):
+    if not 0.0 <= settings.sample_rate <= 1.0:
+        raise HTTPException(status_code=400, detail="sample_rate must be between 0 and 1")
+    if settings.interval_ms < 1.0:
+        raise HTTPException(status_code=400, detail="interval_ms must be at least 1")
+    if settings.max_dumps < 1:
+        raise HTTPException(status_code=400, detail="max_dumps must be positive")
+
+    state.configure(
+        settings.enabled,
+        settings.sample_rate,
+        settings.routes,
+        settings.interval_ms,
+        settings.max_dumps
+    )
+    return {"message": "Profiler updated", "settings": state.settings()}
+
+@router.get("/dumps", dependencies=[Depends(require_role(["Admin"]))])
+def download_dumps(route: Optional[str] = None):
+    dumps = [d for d in state.list_dumps() if route is None or d["route"] == route]
+    return PlainTextResponse(
+        to_folded(dumps),
+        headers={"Content-Disposition": 'attachment; filename="profile.folded"'}
+    )
+
+@router.get("/dumps/{dump_id}", dependencies=[Depends(require_role(["Admin"]))])
+def download_dump(dump_id: int):
+    dump = state.get_dump(dump_id)
+    if not dump:
+        raise HTTPException(status_code=404, detail="Dump not found")
+    return PlainTextResponse(
+        to_folded([dump]),
+        headers={"Content-Disposition": f'attachment; filename="profile-{dump_id}.folded"'}
+    )
+
+@router.delete("/dumps", dependencies=[Depends(require_role(["Admin"]))])
+def clear_dumps():
+    state.clear()
+    return {"message": "Profiling dumps cleared"}
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
+from ..jobs import start_job, get_job
+from ..gpa import recompute_gpas, verify_gpas
+from ..transcript_cache import transcript_cache
 
 router = APIRouter(
     prefix="/student-profiles",
-    tags=["Student Profiles"]
+    tags=["Student Profiles"],
+    route_class=FastJSONRoute
 )
 
 @router.get("/")
@@ -101,11 +106,39 @@ def update_student_profile(
         cursor.close()
         conn.close()
 
-@router.get("/{student_id}/transcript")
-def get_transcript(student_id: int, user=Depends(require_token)):
-    if user["role"] == "Student" and user["user_id"] != student_id:
-        raise HTTPException(status_code=403, detail="Access denied to other transcripts")
+class GpaRecomputeRequest(BaseModel):
+    student_ids: Optional[List[int]] = None
+    department_id: Optional[int] = None
 
+@router.post("/recompute-gpa", status_code=202, dependencies=[Depends(require_role(["Admin"]))])
+def recompute_all_gpas(request: GpaRecomputeRequest):
+    return start_job(
+        "gpa-recompute",
+        recompute_gpas,
+        student_ids=request.student_ids,
+        department_id=request.department_id
+    )
+
+@router.get("/recompute-gpa/{job_id}", dependencies=[Depends(require_role(["Admin"]))])
+def get_gpa_recompute_job(job_id: str):
+    job = get_job(job_id)
+    if not job or job["kind"] != "gpa-recompute":
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/gpa-verify", dependencies=[Depends(require_role(["Admin"]))])
+def verify_student_gpas(
+    department_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    mismatches = verify_gpas(department_id, limit)
+    return {"consistent": not mismatches, "mismatches": mismatches}
+
+@router.get("/transcript-cache", dependencies=[Depends(require_role(["Admin"]))])
+def transcript_cache_stats():
+    return transcript_cache.stats()
+
+def _load_transcript(student_id: int):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
@@ -115,6 +148,7 @@ def get_transcript(student_id: int, user=Depends(require_token)):
             c.title AS course_name,
             c.credits,
             e.grade,
+            e.grade_points,
             e.completion_status,
             s.semester
         FROM Enrollments e
@@ -128,6 +162,13 @@ def get_transcript(student_id: int, user=Depends(require_token)):
         cursor.close()
         conn.close()
 
+@router.get("/{student_id}/transcript")
+def get_transcript(student_id: int, user=Depends(require_token)):
+    if user["role"] == "Student" and user["user_id"] != student_id:
+        raise HTTPException(status_code=403, detail="Access denied to other transcripts")
+
+    return transcript_cache.get(student_id, lambda: _load_transcript(student_id))
+
 @router.get("/{student_id}/get-gpa")
 def get_gpa(student_id: int, user=Depends(require_token)):
     if user["role"] == "Student" and user["user_id"] != student_id:
@@ -137,7 +178,7 @@ def get_gpa(student_id: int, user=Depends(require_token)):
     cursor = conn.cursor(dictionary=True)
     try:
         cursor.execute(
-            "SELECT current_gpa FROM Student_Profiles WHERE student_id = %s",
+            "SELECT current_gpa, credits_earned FROM Student_Profiles WHERE student_id = %s",
             (student_id,)
         )
         row = cursor.fetchone()
@@ -150,45 +191,24 @@ def get_gpa(student_id: int, user=Depends(require_token)):
 
 @router.post("/{student_id}/update-gpa", dependencies=[Depends(require_role(["Admin"]))])
 def update_student_gpa(student_id: int):
+    recompute_gpas(student_ids=[student_id])
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("""
-        SELECT e.grade, c.credits
-        FROM Enrollments e
-        JOIN Course_Sections s ON e.section_id = s.section_id
-        JOIN Courses c ON s.course_id = c.course_id
-        WHERE e.student_id = %s AND e.grade IS NOT NULL
-        """, (student_id,))
-        rows = cursor.fetchall()
-
-        if not rows:
-            return {"message": "No grades found", "gpa": 0.0}
-
-        total_points = 0.0
-        total_credits = 0
-
-        for r in rows:
-            total_points += r["grade"] * r["credits"]
-            total_credits += r["credits"]
-
-        new_gpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
-
-        cursor.execute("""
-        UPDATE Student_Profiles
-        SET current_gpa = %s, credits_earned = %s
-        WHERE student_id = %s
-        """, (new_gpa, total_credits, student_id))
-        conn.commit()
-
-        if cursor.rowcount == 0:
+        cursor.execute(
+            "SELECT current_gpa, credits_earned FROM Student_Profiles WHERE student_id = %s",
+            (student_id,)
+        )
+        row = cursor.fetchone()
+        if not row:
             raise HTTPException(status_code=404, detail="Student profile not found")
 
         return {
             "student_id": student_id,
-            "new_gpa": new_gpa,
-            "credits_earned": total_credits
+            "new_gpa": row["current_gpa"],
+            "credits_earned": row["credits_earned"]
         }
     finally:
         cursor.close()
-        conn.close()
\ No newline at end of file
+        conn.close()
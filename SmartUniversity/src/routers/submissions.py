@@ -1,13 +1,35 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Request, Query, Form, UploadFile, File, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional, List
 from datetime import datetime
+import csv
+import io
+import math
+import os
 from ..db import get_db_connection
 from ..routers.auth import require_token, require_role
+from ..responses import FastJSONRoute
+from ..uploads import (
+    MAX_UPLOAD_BYTES,
+    UPLOAD_CHUNK_BYTES,
+    create_session,
+    get_session,
+    append_chunk,
+    discard_session,
+    session_files,
+    save_stream
+)
+from ..blob_store import store, make_file_path, hash_file, collect_garbage
+from ..submission_export import stream_zip
+from ..similarity import index_submission, find_similar
+from ..jobs import start_job, get_job
+from .. import submission_ingest
 
 router = APIRouter(
     prefix="/submissions",
-    tags=["Submissions"]
+    tags=["Submissions"],
+    route_class=FastJSONRoute
 )
 
 class SubmissionCreate(BaseModel):
@@ -15,60 +37,231 @@ class SubmissionCreate(BaseModel):
     submission_text: Optional[str] = None
     file_path: Optional[str] = None
 
-@router.post("/", dependencies=[Depends(require_role(["Student"]))])
-def create_submission(submission: SubmissionCreate, user=Depends(require_token)):
+def _check_file_link(file_path):
+    # Files only arrive through the upload endpoints; a client-supplied path
+    # could name another student's blob or a file on the server.
+    if file_path and not file_path.startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="file_path must be an http(s) link; upload files instead")
+
+def _check_can_submit(cursor, student_id: int, assignment_id: int):
+    cursor.execute(
+        "SELECT due_date FROM Assignments WHERE assignment_id = %s",
+        (assignment_id,)
+    )
+    assignment = cursor.fetchone()
+    if not assignment:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+
+    if datetime.now() > assignment["due_date"]:
+        raise HTTPException(status_code=400, detail="Deadline passed")
+
+    cursor.execute("""
+        SELECT 1
+        FROM Enrollments e
+        JOIN Assignments a ON e.section_id = a.section_id
+        WHERE e.student_id = %s AND a.assignment_id = %s
+    """, (student_id, assignment_id))
+
+    if not cursor.fetchone():
+        raise HTTPException(status_code=403, detail="Not enrolled in this course")
+
+def _insert_submission(cursor, student_id: int, assignment_id: int, submission_text, file_path):
+    cursor.execute("""
+        INSERT INTO Submissions
+        (student_id, assignment_id, submission_text, file_path, submission_date)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (
+        student_id,
+        assignment_id,
+        submission_text,
+        file_path,
+        datetime.now()
+    ))
+    return cursor.lastrowid
+
+def _submission_error(conn, e):
+    conn.rollback()
+    if isinstance(e, HTTPException):
+        return e
+    if "Duplicate entry" in str(e):
+        return HTTPException(status_code=400, detail="Already submitted")
+    return HTTPException(status_code=500, detail=str(e))
+
+@router.post("/")
+def create_submission(
+    submission: SubmissionCreate,
+    background_tasks: BackgroundTasks,
+    user=Depends(require_role(["Student"]))
+):
+    _check_file_link(submission.file_path)
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
         student_id = user["user_id"]
-        
-        cursor.execute(
-            "SELECT due_date FROM Assignments WHERE assignment_id = %s",
-            (submission.assignment_id,)
+        _check_can_submit(cursor, student_id, submission.assignment_id)
+        submission_id = _insert_submission(
+            cursor,
+            student_id,
+            submission.assignment_id,
+            submission.submission_text,
+            submission.file_path
         )
-        assignment = cursor.fetchone()
-        if not assignment:
-            raise HTTPException(status_code=404, detail="Assignment not found")
+        conn.commit()
+        background_tasks.add_task(index_submission, submission_id)
 
-        if datetime.now() > assignment["due_date"]:
-            raise HTTPException(status_code=400, detail="Deadline passed")
+        return {"message": "Submission successful", "submission_id": submission_id}
 
-        cursor.execute("""
-            SELECT 1
-            FROM Enrollments e
-            JOIN Assignments a ON e.section_id = a.section_id
-            WHERE e.student_id = %s AND a.assignment_id = %s
-        """, (student_id, submission.assignment_id))
+    except Exception as e:
+        raise _submission_error(conn, e)
+    finally:
+        cursor.close()
+        conn.close()
 
-        if not cursor.fetchone():
-            raise HTTPException(status_code=403, detail="Not enrolled in this course")
+@router.post("/ingest", status_code=202)
+def ingest_submission(submission: SubmissionCreate, user=Depends(require_role(["Student"]))):
+    # For deadline rushes: no database work on the request path. The receipt
+    # carries the arrival time the deadline is checked against later.
+    _check_file_link(submission.file_path)
+    return submission_ingest.append(
+        user["user_id"],
+        submission.assignment_id,
+        submission.submission_text,
+        submission.file_path
+    )
 
-        cursor.execute("""
-            INSERT INTO Submissions
-            (student_id, assignment_id, submission_text, file_path, submission_date)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (
-            student_id,
-            submission.assignment_id,
-            submission.submission_text,
-            submission.file_path,
-            datetime.now()
-        ))
+@router.get("/receipts/{receipt_id}")
+def get_submission_receipt(receipt_id: str, user=Depends(require_role(["Student"]))):
+    receipt = submission_ingest.get_receipt(receipt_id)
+    if not receipt:
+        return {"receipt_id": receipt_id, "status": "queued"}
+    if receipt["student_id"] != user["user_id"]:
+        raise HTTPException(status_code=403, detail="Not your receipt")
+    return receipt
+
+def _submit_file(student_id: int, assignment_id: int, submission_text, tmp_path: str, filename: str, digest: str, size: int):
+    # Takes ownership of tmp_path: it is either moved into the blob store or
+    # deleted. A blob placed by a transaction that then fails to commit has
+    # no row and is picked up by blob_store.collect_garbage().
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        _check_can_submit(cursor, student_id, assignment_id)
+        file_path = make_file_path(digest, filename)
+        store(cursor, tmp_path, digest, size)
+        submission_id = _insert_submission(cursor, student_id, assignment_id, submission_text, file_path)
         conn.commit()
+        return {"message": "Submission successful", "submission_id": submission_id, "file_path": file_path}
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise _submission_error(conn, e)
+    finally:
+        cursor.close()
+        conn.close()
+
+@router.post("/upload")
+def upload_submission(
+    background_tasks: BackgroundTasks,
+    assignment_id: int = Form(...),
+    submission_text: Optional[str] = Form(None),
+    file: UploadFile = File(...),
+    user=Depends(require_role(["Student"]))
+):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        _check_can_submit(cursor, user["user_id"], assignment_id)
+    finally:
+        cursor.close()
+        conn.close()
 
-        return {"message": "Submission successful", "submission_id": cursor.lastrowid}
+    tmp_path, size, digest = save_stream(file.file)
+    result = _submit_file(user["user_id"], assignment_id, submission_text, tmp_path, file.filename, digest, size)
+    background_tasks.add_task(index_submission, result["submission_id"])
+    return result
 
-    except Exception as e:
-        conn.rollback()
-        if isinstance(e, HTTPException):
-            raise e
-        if "Duplicate entry" in str(e):
-            raise HTTPException(status_code=400, detail="Already submitted")
-        raise HTTPException(status_code=500, detail=str(e))
+class UploadSessionCreate(BaseModel):
+    assignment_id: int
+    filename: str
+    size: int = Field(..., gt=0)
+
+class UploadComplete(BaseModel):
+    submission_text: Optional[str] = None
+
+@router.post("/uploads")
+def start_upload(upload: UploadSessionCreate, user=Depends(require_role(["Student"]))):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        _check_can_submit(cursor, user["user_id"], upload.assignment_id)
     finally:
         cursor.close()
         conn.close()
 
+    session = create_session(user["user_id"], upload.assignment_id, upload.filename, upload.size)
+    return {
+        **session,
+        "received": 0,
+        "chunk_size": UPLOAD_CHUNK_BYTES,
+        "max_size": MAX_UPLOAD_BYTES
+    }
+
+@router.get("/uploads/{upload_id}")
+def get_upload(upload_id: str, user=Depends(require_role(["Student"]))):
+    return get_session(upload_id, user["user_id"])
+
+@router.put("/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    user=Depends(require_role(["Student"]))
+):
+    session = get_session(upload_id, user["user_id"])
+    received = await append_chunk(session, offset, request.stream())
+    return {"upload_id": upload_id, "received": received, "size": session["size"]}
+
+@router.post("/uploads/{upload_id}/complete")
+def complete_upload(
+    upload_id: str,
+    body: UploadComplete,
+    background_tasks: BackgroundTasks,
+    user=Depends(require_role(["Student"]))
+):
+    session = get_session(upload_id, user["user_id"])
+    if session["received"] != session["size"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: {session['received']} of {session['size']} bytes"
+        )
+
+    _, part_path = session_files(upload_id)
+    try:
+        digest, size = hash_file(part_path)
+        result = _submit_file(
+            user["user_id"],
+            session["assignment_id"],
+            body.submission_text,
+            part_path,
+            session["filename"],
+            digest,
+            size
+        )
+        background_tasks.add_task(index_submission, result["submission_id"])
+        return result
+    finally:
+        discard_session(upload_id)
+
+@router.delete("/uploads/{upload_id}")
+def cancel_upload(upload_id: str, user=Depends(require_role(["Student"]))):
+    get_session(upload_id, user["user_id"])
+    discard_session(upload_id)
+    return {"message": "Upload cancelled"}
+
+@router.post("/blobs/gc", dependencies=[Depends(require_role(["Admin"]))])
+def collect_submission_blobs():
+    return collect_garbage()
+
 @router.get("/assignment/{assignment_id}")
 def list_submissions_for_assignment(assignment_id: int, user=Depends(require_token)):
     conn = get_db_connection()
@@ -98,6 +291,82 @@ def list_submissions_for_assignment(assignment_id: int, user=Depends(require_tok
         cursor.close()
         conn.close()
 
+def _check_teaches_assignment(cursor, assignment_id: int, user):
+    cursor.execute("""
+        SELECT a.due_date, a.max_score, cs.instructor_id
+        FROM Assignments a
+        JOIN Course_Sections cs ON cs.section_id = a.section_id
+        WHERE a.assignment_id = %s
+    """, (assignment_id,))
+    assignment = cursor.fetchone()
+    if not assignment:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+    if user["role"] == "Instructor" and assignment["instructor_id"] != user["user_id"]:
+        raise HTTPException(status_code=403, detail="You do not teach this section")
+    return assignment
+
+@router.get("/assignment/{assignment_id}/export")
+def export_assignment_submissions(
+    assignment_id: int,
+    user=Depends(require_role(["Instructor", "Admin"]))
+):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        assignment = _check_teaches_assignment(cursor, assignment_id, user)
+
+        cursor.execute("""
+            SELECT s.student_id, u.full_name, s.submission_date, s.submission_text, s.file_path
+            FROM Submissions s
+            JOIN Users u ON s.student_id = u.user_id
+            WHERE s.assignment_id = %s
+            ORDER BY s.student_id
+        """, (assignment_id,))
+        submissions = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    for row in submissions:
+        row["due_date"] = assignment["due_date"]
+
+    return StreamingResponse(
+        stream_zip(submissions),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="assignment_{assignment_id}_submissions.zip"'}
+    )
+
+@router.post("/assignment/{assignment_id}/similarity", status_code=202)
+def start_similarity_scan(
+    assignment_id: int,
+    min_similarity: float = Query(0.5, gt=0, le=1),
+    user=Depends(require_role(["Instructor", "Admin"]))
+):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        assignment = _check_teaches_assignment(cursor, assignment_id, user)
+    finally:
+        cursor.close()
+        conn.close()
+
+    return start_job(
+        "similarity",
+        find_similar,
+        assignment_id,
+        min_similarity,
+        job_meta={"assignment_id": assignment_id, "instructor_id": assignment["instructor_id"]}
+    )
+
+@router.get("/similarity/{job_id}")
+def get_similarity_scan(job_id: str, user=Depends(require_role(["Instructor", "Admin"]))):
+    job = get_job(job_id)
+    if not job or job["kind"] != "similarity":
+        raise HTTPException(status_code=404, detail="Job not found")
+    if user["role"] == "Instructor" and job.get("instructor_id") != user["user_id"]:
+        raise HTTPException(status_code=403, detail="You do not teach this section")
+    return job
+
 @router.get("/student/{student_id}")
 def list_student_submissions(student_id: int, user=Depends(require_token)):
     if user["role"] == "Student" and user["user_id"] != student_id:
@@ -154,4 +423,147 @@ def grade_submission(submission_id: int, grade_data: GradeSubmission):
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+class BulkGradeItem(BaseModel):
+    submission_id: Optional[int] = None
+    student_id: Optional[int] = None
+    grade: Optional[float] = None
+    feedback: Optional[str] = None
+
+class BulkGradeRequest(BaseModel):
+    grades: List[BulkGradeItem]
+
+MAX_BULK_GRADES = 5000
+
+# invalid maps 1-based row numbers to why that row couldn't be parsed; those
+# rows hold an empty placeholder item and are reported without being applied.
+def _bulk_grade(assignment_id: int, items: List[BulkGradeItem], user, invalid=None):
+    invalid = invalid or {}
+    if len(items) > MAX_BULK_GRADES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_GRADES} grades per request")
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        max_score = _check_teaches_assignment(cursor, assignment_id, user)["max_score"]
+        cursor.execute(
+            "SELECT submission_id, student_id FROM Submissions WHERE assignment_id = %s",
+            (assignment_id,)
+        )
+        by_student = {}
+        by_id = {}
+        for row in cursor.fetchall():
+            by_student[row["student_id"]] = row["submission_id"]
+            by_id[row["submission_id"]] = row["student_id"]
+
+        results = []
+        updates = []
+        seen = set()
+        for i, item in enumerate(items, 1):
+            submission_id = item.submission_id
+            if submission_id is None and item.student_id is not None:
+                submission_id = by_student.get(item.student_id)
+            outcome = {"row": i, "submission_id": submission_id, "student_id": by_id.get(submission_id)}
+
+            if i in invalid:
+                outcome.update(status="invalid", error=invalid[i])
+                results.append(outcome)
+                continue
+            if item.submission_id is None and item.student_id is None:
+                error = "submission_id or student_id is required"
+            elif submission_id not in by_id:
+                error = "No submission for this assignment"
+            elif submission_id in seen:
+                error = "Duplicate row for this submission"
+            elif item.grade is None:
+                error = "grade is required"
+            elif not math.isfinite(item.grade):
+                error = "grade must be a finite number"
+            elif item.grade < 0 or item.grade > max_score:
+                error = f"Grade must be between 0 and {max_score}"
+            else:
+                error = None
+
+            if error:
+                outcome.update(status="error", error=error)
+            else:
+                seen.add(submission_id)
+                updates.append((submission_id, item.grade, item.feedback))
+                outcome["status"] = "graded"
+            results.append(outcome)
+
+        if updates:
+            derived = " UNION ALL ".join(["SELECT %s AS submission_id, %s AS grade, %s AS feedback"] * len(updates))
+            cursor.execute(f"""
+                UPDATE Submissions s
+                JOIN ({derived}) g ON g.submission_id = s.submission_id
+                SET s.grade = g.grade, s.feedback = g.feedback
+                WHERE s.assignment_id = %s
+            """, [v for row in updates for v in row] + [assignment_id])
+            conn.commit()
+
+        return {
+            "assignment_id": assignment_id,
+            "graded": len(updates),
+            "failed": len(results) - len(updates),
+            "results": results
+        }
+    except Exception as e:
+        conn.rollback()
+        if isinstance(e, HTTPException):
+            raise e
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        cursor.close()
+        conn.close()
+
+@router.put("/assignment/{assignment_id}/grades")
+def bulk_grade_submissions(
+    assignment_id: int,
+    request: BulkGradeRequest,
+    user=Depends(require_role(["Instructor", "Admin"]))
+):
+    return _bulk_grade(assignment_id, request.grades, user)
+
+def _optional(value, cast):
+    value = (value or "").strip()
+    return cast(value) if value else None
+
+@router.put("/assignment/{assignment_id}/grades/csv")
+def bulk_grade_submissions_csv(
+    assignment_id: int,
+    file: UploadFile = File(...),
+    user=Depends(require_role(["Instructor", "Admin"]))
+):
+    text_stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text_stream)
+    try:
+        columns = set(reader.fieldnames or [])
+        if "grade" not in columns or not columns & {"submission_id", "student_id"}:
+            raise HTTPException(
+                status_code=400,
+                detail="CSV needs a grade column and a submission_id or student_id column"
+            )
+        items = []
+        invalid = {}
+        for row in reader:
+            try:
+                item = BulkGradeItem(
+                    submission_id=_optional(row.get("submission_id"), int),
+                    student_id=_optional(row.get("student_id"), int),
+                    grade=_optional(row.get("grade"), float),
+                    feedback=_optional(row.get("feedback"), str)
+                )
+            except ValueError:
+                item = BulkGradeItem()
+                invalid[len(items) + 1] = f"Invalid number on line {reader.line_num}"
+            items.append(item)
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable CSV after line {reader.line_num}: {e}")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8")
+    finally:
+        text_stream.detach()
+
+    return _bulk_grade(assignment_id, items, user, invalid)
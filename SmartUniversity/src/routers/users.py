@@ -1,13 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File
 from pydantic import BaseModel
 from typing import Optional, Literal
 import mysql.connector
+from fastapi.concurrency import run_in_threadpool
 from ..db import get_db_connection
-from ..routers.auth import require_token, require_role, hash_password
+from ..routers.auth import require_token, require_role, revoke_user_tokens
+from ..passwords import hash_password, verify_password
+from ..responses import FastJSONRoute
+from ..shared_state import commit_versioned
+from ..user_search import user_search
+from ..provisioning import provision_file
 
 router = APIRouter(
     prefix="/users",
-    tags=["Users"]
+    tags=["Users"],
+    route_class=FastJSONRoute
 )
 
 class UserCreate(BaseModel):
@@ -22,13 +29,52 @@ class UserUpdate(BaseModel):
     email: Optional[str] = None
     password: Optional[str] = None
     role: Optional[Literal["Student", "Instructor", "Admin"]] = None
+    card_id: Optional[str] = None
 
 class PasswordChangeRequest(BaseModel):
     old_password: str
     new_password: str
 
+class UserBatchRequest(BaseModel):
+    user_ids: list[int]
+    fields: Optional[list[str]] = None
+
+MAX_BATCH_IDS = 5000
+DEFAULT_PAGE_SIZE = 50
+
+# Selectable columns for /users/batch and the joins each one needs.
+BATCH_FIELDS = {
+    "user_id": ("u.user_id", ()),
+    "full_name": ("u.full_name", ()),
+    "email": ("u.email", ()),
+    "role": ("u.role", ()),
+    "created_at": ("u.created_at", ()),
+    "department_id": ("COALESCE(sp.department_id, ip.department_id)", ("sp", "ip")),
+    "department_name": ("d.name", ("sp", "ip", "d")),
+    "admission_year": ("sp.admission_year", ("sp",)),
+    "current_gpa": ("sp.current_gpa", ("sp",)),
+    "credits_earned": ("sp.credits_earned", ("sp",)),
+    "title": ("ip.title", ("ip",)),
+    "office_location": ("ip.office_location", ("ip",)),
+    "research_interests": ("ip.research_interests", ("ip",)),
+}
+
+BATCH_JOINS = {
+    "sp": "LEFT JOIN Student_Profiles sp ON sp.student_id = u.user_id",
+    "ip": "LEFT JOIN Instructor_Profiles ip ON ip.instructor_id = u.user_id",
+    "d": "LEFT JOIN Departments d ON d.department_id = COALESCE(sp.department_id, ip.department_id)",
+}
+
 @router.get("/", dependencies=[Depends(require_role(["Admin"]))])
-def list_users(search: Optional[str] = None, role: Optional[str] = None):
+def list_users(
+    search: Optional[str] = None,
+    role: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    offset: int = Query(0, ge=0)
+):
+    if search:
+        return user_search.search(search, role, limit or DEFAULT_PAGE_SIZE, offset)
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
@@ -38,19 +84,63 @@ def list_users(search: Optional[str] = None, role: Optional[str] = None):
         WHERE is_active = 1
         """
         params = []
-        if search:
-            query += " AND (full_name LIKE %s OR email LIKE %s)"
-            s = f"%{search}%"
-            params.extend([s, s])
         if role:
             query += " AND role = %s"
             params.append(role)
+        query += " ORDER BY user_id"
+        # Paging is opt-in here: without limit or offset the whole list comes
+        # back, as it always has.
+        if limit is not None or offset:
+            query += " LIMIT %s OFFSET %s"
+            params.extend([limit or DEFAULT_PAGE_SIZE, offset])
         cursor.execute(query, params)
         return cursor.fetchall()
     finally:
         cursor.close()
         conn.close()
 
+@router.post("/batch")
+def get_users_batch(request: UserBatchRequest, user=Depends(require_role(["Admin", "Instructor"]))):
+    user_ids = list(dict.fromkeys(request.user_ids))
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="No user_ids provided")
+    if len(user_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} user_ids per request")
+
+    fields = request.fields or list(BATCH_FIELDS)
+    unknown = [f for f in fields if f not in BATCH_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if "user_id" not in fields:
+        fields = ["user_id"] + fields
+
+    joins = []
+    for f in fields:
+        for alias in BATCH_FIELDS[f][1]:
+            if alias not in joins:
+                joins.append(alias)
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        columns = ", ".join(f"{BATCH_FIELDS[f][0]} AS {f}" for f in fields)
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        query = f"""
+        SELECT {columns}
+        FROM Users u
+        {" ".join(BATCH_JOINS[alias] for alias in joins)}
+        WHERE u.is_active = 1 AND u.user_id IN ({placeholders})
+        """
+        cursor.execute(query, user_ids)
+        rows = {row["user_id"]: row for row in cursor.fetchall()}
+        return {
+            "users": [rows[i] for i in user_ids if i in rows],
+            "missing_ids": [i for i in user_ids if i not in rows]
+        }
+    finally:
+        cursor.close()
+        conn.close()
+
 @router.get("/me")
 def get_current_user_profile(user=Depends(require_token)):
     conn = get_db_connection()
@@ -65,32 +155,44 @@ def get_current_user_profile(user=Depends(require_token)):
         cursor.close()
         conn.close()
 
-@router.put("/me/change-password")
-def change_own_password(data: PasswordChangeRequest, user=Depends(require_token)):
+def _password_hash_of(user_id: int):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        user_id = user["user_id"]
         cursor.execute("SELECT password_hash FROM Users WHERE user_id = %s", (user_id,))
-        db_user = cursor.fetchone()
-        if not db_user or db_user["password_hash"] != hash_password(data.old_password):
-            raise HTTPException(status_code=401, detail="Current password incorrect")
-        new_hash = hash_password(data.new_password)
-        cursor.execute("UPDATE Users SET password_hash = %s WHERE user_id = %s", (new_hash, user_id))
+        row = cursor.fetchone()
+        return row["password_hash"] if row else None
+    finally:
+        cursor.close()
+        conn.close()
+
+def _set_password_hash(user_id: int, password_hash: str):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE Users SET password_hash = %s WHERE user_id = %s", (password_hash, user_id))
         conn.commit()
-        return {"message": "Password updated successfully"}
+        revoke_user_tokens(user_id)
     finally:
         cursor.close()
         conn.close()
 
-@router.post("/", dependencies=[Depends(require_role(["Admin"]))])
-def create_new_user(user: UserCreate):
+@router.put("/me/change-password")
+async def change_own_password(data: PasswordChangeRequest, user=Depends(require_token)):
+    user_id = user["user_id"]
+    stored = await run_in_threadpool(_password_hash_of, user_id)
+    if stored is None or not (await verify_password(data.old_password, stored))[0]:
+        raise HTTPException(status_code=401, detail="Current password incorrect")
+    await run_in_threadpool(_set_password_hash, user_id, await hash_password(data.new_password))
+    return {"message": "Password updated successfully"}
+
+def _insert_user(user: UserCreate, password_hash: str):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
         cursor.execute(
             "INSERT INTO Users (full_name, email, password_hash, role) VALUES (%s, %s, %s, %s)",
-            (user.full_name, user.email, hash_password(user.password), user.role)
+            (user.full_name, user.email, password_hash, user.role)
         )
         user_id = cursor.lastrowid
         
@@ -113,7 +215,8 @@ def create_new_user(user: UserCreate):
                 (user_id, user.department_id)
             )
             
-        conn.commit()
+        commit_versioned(conn, "Users")
+        user_search.changed(user_id)
         return {"user_id": user_id, "message": "User created"}
         
     except mysql.connector.IntegrityError as err:
@@ -130,36 +233,55 @@ def create_new_user(user: UserCreate):
         cursor.close()
         conn.close()
 
-@router.put("/{user_id}", dependencies=[Depends(require_role(["Admin"]))])
-def update_user(user_id: int, user_data: UserUpdate):
+@router.post("/", dependencies=[Depends(require_role(["Admin"]))])
+async def create_new_user(user: UserCreate):
+    return await run_in_threadpool(_insert_user, user, await hash_password(user.password))
+
+@router.post("/bulk-import", dependencies=[Depends(require_role(["Admin"]))])
+def bulk_import_users(file: UploadFile = File(...)):
+    try:
+        return provision_file(file.file)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _update_user(user_id: int, data: dict):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        data = user_data.dict(exclude_unset=True)
-        if not data:
-            raise HTTPException(status_code=400, detail="No fields provided")
-        if "password" in data:
-            data["password_hash"] = hash_password(data.pop("password"))
         set_clause = ", ".join([f"{k}=%s" for k in data])
         values = list(data.values()) + [user_id]
         cursor.execute(f"UPDATE Users SET {set_clause} WHERE user_id = %s", values)
-        conn.commit()
+        commit_versioned(conn, "Users")
+        user_search.changed(user_id)
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="User not found")
+        if "role" in data or "password_hash" in data:
+            revoke_user_tokens(user_id)
         return {"message": "User updated"}
     finally:
         cursor.close()
         conn.close()
 
+@router.put("/{user_id}", dependencies=[Depends(require_role(["Admin"]))])
+async def update_user(user_id: int, user_data: UserUpdate):
+    data = user_data.dict(exclude_unset=True)
+    if not data:
+        raise HTTPException(status_code=400, detail="No fields provided")
+    if "password" in data:
+        data["password_hash"] = await hash_password(data.pop("password"))
+    return await run_in_threadpool(_update_user, user_id, data)
+
 @router.delete("/{user_id}", dependencies=[Depends(require_role(["Admin"]))])
 def delete_user(user_id: int):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
         cursor.execute("UPDATE Users SET is_active = 0 WHERE user_id = %s", (user_id,))
-        conn.commit()
+        commit_versioned(conn, "Users")
+        user_search.changed(user_id)
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="User not found")
+        revoke_user_tokens(user_id)
         return {"message": "User deactivated"}
     finally:
         cursor.close()
@@ -180,7 +302,9 @@ def hard_delete_user(user_id: int):
         elif role == "Instructor":
             cursor.execute("DELETE FROM Instructor_Profiles WHERE instructor_id = %s", (user_id,))
         cursor.execute("DELETE FROM Users WHERE user_id = %s", (user_id,))
-        conn.commit()
+        commit_versioned(conn, "Users")
+        user_search.changed(user_id)
+        revoke_user_tokens(user_id)
         return {"message": "User permanently deleted"}
     finally:
         cursor.close()
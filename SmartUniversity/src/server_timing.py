@@ -0,0 +1,30 @@
+from starlette.datastructures import MutableHeaders
+
+
+def record_timing(request, name: str, seconds: float):
+    timings = request.scope.setdefault("state", {}).setdefault("server_timing", {})
+    timings[name] = timings.get(name, 0.0) + seconds
+
+
+class ServerTimingMiddleware:
+    # Emits the per-request timings collected by record_timing() as a
+    # Server-Timing header, e.g. "auth;dur=0.041".
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                timings = scope.get("state", {}).get("server_timing")
+                if timings:
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.append("Server-Timing", ", ".join(
+                        f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items()
+                    ))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,162 @@
+import fcntl
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Small files shared by every uvicorn worker on the host. Versions are bumped
+# by write handlers so other workers can tell their cached views are stale.
+STATE_DIR = os.getenv(
+    "SHARED_STATE_DIR",
+    os.path.join(tempfile.gettempdir(), "smart_university")
+)
+
+os.makedirs(os.path.join(STATE_DIR, "versions"), exist_ok=True)
+
+
+def _version_path(name: str) -> str:
+    return os.path.join(STATE_DIR, "versions", name)
+
+
+def current_version(name: str) -> int:
+    try:
+        with open(_version_path(name)) as f:
+            return int(f.read() or 0)
+    except (FileNotFoundError, ValueError):
+        return bump_version(name)
+
+
+def bump_version(*names: str) -> int:
+    version = 0
+    for name in names:
+        path = _version_path(name)
+        try:
+            with open(path) as f:
+                previous = int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            previous = 0
+        # Wall-clock based so a restarted worker never reuses an old version.
+        version = max(previous + 1, time.time_ns())
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(version))
+        os.replace(tmp_path, path)
+    return version
+
+
+def commit_versioned(conn, *names: str):
+    # Bumped on both sides of the commit. The first bump retires every
+    # version (and ETag) issued for the old rows before the new rows become
+    # visible; the second retires whatever readers cached in between.
+    bump_version(*names)
+    conn.commit()
+    bump_version(*names)
+
+
+# First line of a compacted log. A reader that comes across it may have missed
+# lines the compaction dropped.
+COMPACTED_MARK = "#compacted"
+
+
+class SharedLog:
+    # Append-only line log in STATE_DIR. Each reader keeps its own offset and
+    # only reads what other workers appended since its last poll. compact()
+    # swaps in a rewritten file; readers notice the new inode and start over,
+    # so applying a line must be idempotent.
+    def __init__(self, name: str):
+        os.makedirs(os.path.join(STATE_DIR, "logs"), exist_ok=True)
+        self.path = os.path.join(STATE_DIR, "logs", f"{name}.log")
+        self._lock_path = f"{self.path}.lock"
+        self._offset = 0
+        self._inode = None
+        self._compacted_size = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _file_lock(self, mode):
+        # Appends share the lock; compaction and append_if() take it
+        # exclusively so no line lands in a file that is being replaced.
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, mode)
+            yield
+
+    def _write(self, line: str):
+        with open(self.path, "ab") as f:
+            f.write(line.encode() + b"\n")
+
+    def append(self, line: str):
+        with self._file_lock(fcntl.LOCK_SH):
+            self._write(line)
+
+    def append_if(self, check, line: str) -> bool:
+        # check(new_lines) sees everything appended since the last poll and
+        # decides under the exclusive lock, so the decision is atomic across
+        # workers.
+        with self._file_lock(fcntl.LOCK_EX):
+            if not check(self.read_new()):
+                return False
+            self._write(line)
+            return True
+
+    def skip_to_end(self):
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+                self._offset, self._inode = stat.st_size, stat.st_ino
+            except FileNotFoundError:
+                self._offset, self._inode = 0, None
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def read_new(self) -> list[str]:
+        return self.poll()[0]
+
+    def poll(self):
+        # Returns (lines, restarted); restarted means the log was compacted
+        # since this reader's last poll and lines it never saw may be gone.
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    inode = os.fstat(f.fileno()).st_ino
+                    if inode != self._inode:
+                        self._offset, self._inode = 0, inode
+                    f.seek(self._offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return [], False
+            # Leave a partially written last line for the next poll.
+            end = data.rfind(b"\n") + 1
+            self._offset += end
+            lines = data[:end].decode().splitlines()
+            if lines and lines[0] == COMPACTED_MARK:
+                return lines[1:], True
+            return lines, False
+
+    def compact(self, keep) -> int:
+        # Rewrites the log with the lines keep(line) accepts and returns the
+        # new size.
+        with self._file_lock(fcntl.LOCK_EX):
+            try:
+                with open(self.path, "rb") as f:
+                    lines = f.read().decode().splitlines()
+            except FileNotFoundError:
+                return 0
+            kept = [line for line in lines if line != COMPACTED_MARK and keep(line)]
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write("".join(f"{line}\n" for line in [COMPACTED_MARK] + kept).encode())
+            os.replace(tmp_path, self.path)
+            return self.size()
+
+    def compact_if_grown(self, keep, min_bytes: int) -> bool:
+        # Compacts once the log is at least min_bytes and has doubled since
+        # this worker last compacted it, so rewrites stay rare as it grows.
+        if self.size() < max(min_bytes, 2 * self._compacted_size):
+            return False
+        self._compacted_size = self.compact(keep)
+        return True
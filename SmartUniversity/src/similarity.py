@@ -0,0 +1,187 @@
+import hashlib
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from itertools import combinations
+from .db import get_db_connection
+from .blob_store import resolve
+
+NUM_BINS = 128
+BANDS = 32
+ROWS = NUM_BINS // BANDS
+SHINGLE_WORDS = 5
+MAX_FILE_BYTES = 512 * 1024
+MIN_SIMILARITY = 0.5
+
+_BIN_SHIFT = 64 - (NUM_BINS.bit_length() - 1)
+_BIN_WIDTH = 1 << _BIN_SHIFT
+
+
+def _words(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.findall(r"\w+", text)
+
+
+def _shingles(text: str) -> set[int]:
+    words = _words(text)
+    if len(words) < SHINGLE_WORDS:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = (" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1))
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode(), digest_size=8).digest(), "little")
+        for g in grams
+    }
+
+
+def signature(text: str, template: set[int] = frozenset()):
+    # One-permutation MinHash: the 64-bit shingle hashes are split into
+    # NUM_BINS ranges by their top bits and each bin keeps its smallest
+    # offset. One sort and NUM_BINS bisects replace a pass per permutation.
+    # Shingles of the assignment template are left out, so text every
+    # student was handed does not make submissions look alike.
+    shingles = sorted(_shingles(text) - template)
+    if not shingles:
+        return None, 0
+    mins = []
+    for i in range(NUM_BINS):
+        low = i << _BIN_SHIFT
+        j = bisect_left(shingles, low)
+        mins.append(shingles[j] - low if j < len(shingles) and shingles[j] < low + _BIN_WIDTH else None)
+
+    # Empty bins borrow from the next filled bin to the right, tagged with
+    # the distance so they only match bins borrowed the same way.
+    sig = array("Q", bytes(8 * NUM_BINS))
+    for i in range(NUM_BINS):
+        for k in range(NUM_BINS):
+            value = mins[(i + k) % NUM_BINS]
+            if value is not None:
+                sig[i] = value + (k << _BIN_SHIFT)
+                break
+    return sig, len(shingles)
+
+
+def _submission_text(row) -> str:
+    parts = [row["submission_text"] or ""]
+    path = resolve(row["file_path"]) if row["file_path"] else None
+    if path:
+        try:
+            with open(path, "rb") as f:
+                parts.append(f.read(MAX_FILE_BYTES).decode("utf-8", errors="ignore"))
+        except OSError:
+            # Missing, unreadable or a directory: compare the text alone.
+            pass
+    return "\n".join(parts)
+
+
+def _template_shingles(cursor, assignment_id: int) -> set[int]:
+    cursor.execute("SELECT description FROM Assignments WHERE assignment_id = %s", (assignment_id,))
+    row = cursor.fetchone()
+    return _shingles(row["description"] or "") if row else set()
+
+
+def _store_signatures(cursor, rows, template: set[int]):
+    for row in rows:
+        sig, count = signature(_submission_text(row), template)
+        cursor.execute("""
+            INSERT INTO Submission_Signatures (submission_id, assignment_id, shingle_count, signature)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE shingle_count = VALUES(shingle_count), signature = VALUES(signature)
+        """, (row["submission_id"], row["assignment_id"], count, sig.tobytes() if sig else None))
+
+
+def index_submission(submission_id: int):
+    # Run as a background task after the submission commits.
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT submission_id, assignment_id, submission_text, file_path
+            FROM Submissions WHERE submission_id = %s
+        """, (submission_id,))
+        rows = cursor.fetchall()
+        if rows:
+            _store_signatures(cursor, rows, _template_shingles(cursor, rows[0]["assignment_id"]))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def find_similar(progress, assignment_id: int, min_similarity: float = MIN_SIMILARITY):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        # Submissions from before signatures existed are indexed first.
+        cursor.execute("""
+            SELECT s.submission_id, s.assignment_id, s.submission_text, s.file_path
+            FROM Submissions s
+            LEFT JOIN Submission_Signatures ss ON ss.submission_id = s.submission_id
+            WHERE s.assignment_id = %s AND ss.submission_id IS NULL
+        """, (assignment_id,))
+        missing = cursor.fetchall()
+        progress.update(0, len(missing))
+        template = _template_shingles(cursor, assignment_id) if missing else set()
+        for i, row in enumerate(missing, 1):
+            _store_signatures(cursor, [row], template)
+            progress.update(i)
+        conn.commit()
+
+        cursor.execute("""
+            SELECT ss.submission_id, s.student_id, u.full_name, ss.signature
+            FROM Submission_Signatures ss
+            JOIN Submissions s ON s.submission_id = ss.submission_id
+            JOIN Users u ON u.user_id = s.student_id
+            WHERE ss.assignment_id = %s AND ss.signature IS NOT NULL
+        """, (assignment_id,))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    signatures = {}
+    for row in rows:
+        sig = array("Q")
+        sig.frombytes(row["signature"])
+        signatures[row["submission_id"]] = sig
+
+    # LSH: submissions that agree on every row of some band share a bucket;
+    # only bucket-mates are compared.
+    buckets = {}
+    for submission_id, sig in signatures.items():
+        for band in range(BANDS):
+            key = (band, tuple(sig[band * ROWS:(band + 1) * ROWS]))
+            buckets.setdefault(key, []).append(submission_id)
+
+    # The template is already subtracted, so even a large bucket means
+    # shared text worth checking; only pairs above min_similarity are kept.
+    candidates = set()
+    for members in buckets.values():
+        if len(members) > 1:
+            candidates.update(combinations(sorted(members), 2))
+
+    info = {row["submission_id"]: row for row in rows}
+    pairs = []
+    for a, b in candidates:
+        sig_a, sig_b = signatures[a], signatures[b]
+        estimate = sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_BINS
+        if estimate >= min_similarity:
+            pairs.append({
+                "submission_a": a,
+                "student_a": info[a]["student_id"],
+                "name_a": info[a]["full_name"],
+                "submission_b": b,
+                "student_b": info[b]["student_id"],
+                "name_b": info[b]["full_name"],
+                "similarity": round(estimate, 3)
+            })
+    pairs.sort(key=lambda p: -p["similarity"])
+
+    return {
+        "assignment_id": assignment_id,
+        "submissions": len(signatures),
+        "candidates_checked": len(candidates),
+        "pairs": pairs
+    }
@@ -0,0 +1,91 @@
+import csv
+import io
+import os
+import re
+import zipfile
+from datetime import datetime
+from .blob_store import resolve, digest_of
+from .uploads import UPLOAD_CHUNK_BYTES, safe_filename
+
+
+class _ChunkSink:
+    # Write-only file object for ZipFile. It has no tell()/seek(), so
+    # zipfile switches to streaming mode and writes data descriptors instead
+    # of seeking back to patch local headers.
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _stored_name(file_path: str) -> str:
+    if digest_of(file_path):
+        return file_path.rsplit("/", 1)[-1]
+    return os.path.basename(file_path)
+
+
+def _folder(row) -> str:
+    # Keep non-ASCII letters; zipfile flags UTF-8 names itself.
+    name = re.sub(r"[^\w.-]+", "_", row["full_name"] or "").strip("._")
+    return f"{row['student_id']}_{name}"
+
+
+def _zip_chunks(submissions):
+    # submissions: dict rows with student_id, full_name, submission_date,
+    # due_date, submission_text and file_path. Memory stays at one read
+    # buffer plus zipfile's compressor state, whatever the archive size.
+    sink = _ChunkSink()
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(["student_id", "full_name", "submission_date", "late", "file", "status"])
+
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for row in submissions:
+            folder = _folder(row)
+            late = bool(row["due_date"] and row["submission_date"] and row["submission_date"] > row["due_date"])
+            entry = ""
+            status = "no file"
+
+            if row["submission_text"]:
+                archive.writestr(f"{folder}/submission.txt", row["submission_text"])
+                yield sink.drain()
+
+            if row["file_path"]:
+                entry = f"{folder}/{_stored_name(row['file_path'])}"
+                path = resolve(row["file_path"])
+                try:
+                    if path is None:
+                        raise FileNotFoundError(row["file_path"])
+                    with open(path, "rb") as src:
+                        stamp = row["submission_date"] or datetime.now()
+                        info = zipfile.ZipInfo(entry, date_time=stamp.timetuple()[:6])
+                        info.compress_type = zipfile.ZIP_DEFLATED
+                        with archive.open(info, mode="w", force_zip64=True) as dest:
+                            while chunk := src.read(UPLOAD_CHUNK_BYTES):
+                                dest.write(chunk)
+                                yield sink.drain()
+                    status = "ok"
+                except OSError:
+                    # Unreadable or outside the upload area; the rest of the
+                    # archive still goes out.
+                    status = "missing"
+
+            writer.writerow([row["student_id"], row["full_name"], row["submission_date"], late, entry, status])
+            yield sink.drain()
+
+        archive.writestr("manifest.csv", manifest.getvalue())
+    yield sink.drain()
+
+
+def stream_zip(submissions):
+    return (chunk for chunk in _zip_chunks(submissions) if chunk)
@@ -0,0 +1,363 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+import mysql.connector
+from fastapi import HTTPException
+from .db import get_db_connection
+from .shared_state import STATE_DIR
+
+# Submissions accepted in ingest mode are appended to one log shared by all
+# workers on the host and fsync'd before the receipt goes out. The worker
+# holding the writer lock drains the log into Submissions in batches; the
+# committed offset is kept next to the log, so whatever a crashed or
+# restarted worker left unprocessed is replayed by the next writer.
+INGEST_DIR = os.path.join(STATE_DIR, "ingest")
+RECEIPT_DIR = os.path.join(INGEST_DIR, "receipts")
+LOG_PATH = os.path.join(INGEST_DIR, "submissions.log")
+OFFSET_PATH = os.path.join(INGEST_DIR, "submissions.offset")
+LOCK_PATH = os.path.join(INGEST_DIR, "writer.lock")
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+INTERVAL_SECONDS = float(os.getenv("INGEST_INTERVAL_SECONDS", "0.5"))
+RECEIPT_TTL_SECONDS = int(os.getenv("INGEST_RECEIPT_TTL_SECONDS", str(7 * 24 * 3600)))
+# Column limits of Submissions; anything longer would fail the batch insert.
+MAX_FILE_PATH_CHARS = 255
+MAX_TEXT_BYTES = 65535
+RECORD_KEYS = {"receipt_id", "student_id", "assignment_id", "submission_text", "file_path", "received_at"}
+
+logger = logging.getLogger(__name__)
+
+os.makedirs(RECEIPT_DIR, exist_ok=True)
+
+
+def _receipt_path(receipt_id: str) -> str:
+    return os.path.join(RECEIPT_DIR, f"{receipt_id}.json")
+
+
+def _write_json(path: str, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def append(student_id: int, assignment_id: int, submission_text, file_path) -> dict:
+    # The arrival time is taken here, not when the writer gets to the record,
+    # so a submission queued before the deadline stays on time. TIMESTAMP
+    # columns keep whole seconds.
+    if file_path and len(file_path) > MAX_FILE_PATH_CHARS:
+        raise HTTPException(status_code=400, detail=f"file_path is longer than {MAX_FILE_PATH_CHARS} characters")
+    if submission_text and len(submission_text.encode()) > MAX_TEXT_BYTES:
+        raise HTTPException(status_code=400, detail=f"submission_text is larger than {MAX_TEXT_BYTES} bytes")
+    record = {
+        "receipt_id": uuid.uuid4().hex,
+        "student_id": student_id,
+        "assignment_id": assignment_id,
+        "submission_text": submission_text,
+        "file_path": file_path,
+        "received_at": datetime.now().replace(microsecond=0).isoformat()
+    }
+    line = json.dumps(record).encode() + b"\n"
+    fd = os.open(LOG_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        # Shared lock: appends run concurrently, truncation waits for them.
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        os.write(fd, line)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    if _writer:
+        _writer.wake()
+    return {
+        "receipt_id": record["receipt_id"],
+        "assignment_id": assignment_id,
+        "received_at": record["received_at"],
+        "status": "queued"
+    }
+
+
+def get_receipt(receipt_id: str):
+    if not receipt_id.isalnum():
+        return None
+    try:
+        with open(_receipt_path(receipt_id)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _read_offset() -> int:
+    try:
+        with open(OFFSET_PATH) as f:
+            return int(f.read() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _read_batch(offset: int):
+    try:
+        with open(LOG_PATH, "rb") as f:
+            f.seek(offset)
+            records = []
+            while len(records) < BATCH_SIZE:
+                line = f.readline()
+                # A line without its newline is still being written.
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                    if set(record) != RECORD_KEYS:
+                        raise ValueError(line)
+                    record["received_at"] = datetime.fromisoformat(record["received_at"])
+                    records.append(record)
+                except (ValueError, TypeError):
+                    logger.warning("Skipping unreadable ingest record at byte %d", offset - len(line))
+            return records, offset
+    except FileNotFoundError:
+        return [], offset
+
+
+def _in_clause(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _insert_batch(cursor, rows, outcomes):
+    values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(rows))
+    cursor.execute(f"""
+        INSERT INTO Submissions
+        (student_id, assignment_id, submission_text, file_path, submission_date)
+        VALUES {values}
+    """, [
+        v for r in rows
+        for v in (r["student_id"], r["assignment_id"], r["submission_text"], r["file_path"], r["received_at"])
+    ])
+    # Multi-row inserts may get non-consecutive ids, so they are read back
+    # by the unique key.
+    cursor.execute(f"""
+        SELECT assignment_id, student_id, submission_id
+        FROM Submissions
+        WHERE (assignment_id, student_id) IN ({", ".join(["(%s, %s)"] * len(rows))})
+    """, [v for r in rows for v in (r["assignment_id"], r["student_id"])])
+    inserted = {(a, s): sid for a, s, sid in cursor.fetchall()}
+    for r in rows:
+        outcomes[r["receipt_id"]] = ("accepted", inserted[(r["assignment_id"], r["student_id"])], None)
+
+
+def _insert_rows(cursor, rows, outcomes):
+    # Fallback for a batch the database refused: a failed statement only
+    # rolls back itself, so the good rows still go in this transaction.
+    for r in rows:
+        try:
+            cursor.execute("""
+                INSERT INTO Submissions
+                (student_id, assignment_id, submission_text, file_path, submission_date)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (r["student_id"], r["assignment_id"], r["submission_text"], r["file_path"], r["received_at"]))
+            outcomes[r["receipt_id"]] = ("accepted", cursor.lastrowid, None)
+        except mysql.connector.IntegrityError as e:
+            error = "Already submitted" if "Duplicate entry" in str(e) else "Rejected by the database"
+            outcomes[r["receipt_id"]] = ("rejected", None, error)
+        except mysql.connector.DataError:
+            outcomes[r["receipt_id"]] = ("rejected", None, "Rejected by the database")
+
+
+def _store_batch(records):
+    assignment_ids = sorted({r["assignment_id"] for r in records})
+    student_ids = sorted({r["student_id"] for r in records})
+    pairs = sorted({(r["assignment_id"], r["student_id"]) for r in records})
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT assignment_id, due_date FROM Assignments WHERE assignment_id IN ({_in_clause(assignment_ids)})",
+            assignment_ids
+        )
+        due_dates = dict(cursor.fetchall())
+
+        cursor.execute(f"""
+            SELECT a.assignment_id, e.student_id
+            FROM Enrollments e
+            JOIN Assignments a ON e.section_id = a.section_id
+            WHERE a.assignment_id IN ({_in_clause(assignment_ids)})
+              AND e.student_id IN ({_in_clause(student_ids)})
+        """, assignment_ids + student_ids)
+        enrolled = set(cursor.fetchall())
+
+        pair_params = [v for pair in pairs for v in pair]
+        pair_clause = ", ".join(["(%s, %s)"] * len(pairs))
+        cursor.execute(f"""
+            SELECT assignment_id, student_id, submission_id, submission_date
+            FROM Submissions
+            WHERE (assignment_id, student_id) IN ({pair_clause})
+        """, pair_params)
+        existing = {(a, s): (sid, date) for a, s, sid, date in cursor.fetchall()}
+
+        outcomes = {}
+        accepted = []
+        for record in records:
+            key = (record["assignment_id"], record["student_id"])
+            if key in existing:
+                submission_id, submission_date = existing[key]
+                # A replay after a crash between commit and offset update
+                # finds its own row again.
+                if submission_date == record["received_at"]:
+                    outcomes[record["receipt_id"]] = ("accepted", submission_id, None)
+                    existing[key] = (submission_id, None)
+                else:
+                    outcomes[record["receipt_id"]] = ("rejected", None, "Already submitted")
+            elif record["assignment_id"] not in due_dates:
+                outcomes[record["receipt_id"]] = ("rejected", None, "Assignment not found")
+            elif record["received_at"] > due_dates[record["assignment_id"]]:
+                outcomes[record["receipt_id"]] = ("rejected", None, "Deadline passed")
+            elif key not in enrolled:
+                outcomes[record["receipt_id"]] = ("rejected", None, "Not enrolled in this course")
+            else:
+                # Later records for the same pair in this batch are duplicates.
+                existing[key] = (None, None)
+                accepted.append(record)
+
+        if accepted:
+            try:
+                _insert_batch(cursor, accepted, outcomes)
+            except (mysql.connector.IntegrityError, mysql.connector.DataError):
+                _insert_rows(cursor, accepted, outcomes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    for record in records:
+        status, submission_id, error = outcomes[record["receipt_id"]]
+        _write_json(_receipt_path(record["receipt_id"]), {
+            "receipt_id": record["receipt_id"],
+            "student_id": record["student_id"],
+            "assignment_id": record["assignment_id"],
+            "received_at": record["received_at"].isoformat(),
+            "status": status,
+            "submission_id": submission_id,
+            "error": error
+        })
+    return sum(1 for status, _, _ in outcomes.values() if status == "accepted")
+
+
+def _truncate_if_drained(offset: int) -> int:
+    try:
+        fd = os.open(LOG_PATH, os.O_WRONLY)
+    except FileNotFoundError:
+        return 0
+    try:
+        # Exclusive lock waits out appends in flight.
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        if os.fstat(fd).st_size != offset:
+            return offset
+        os.ftruncate(fd, 0)
+        _write_json(OFFSET_PATH, 0)
+        return 0
+    finally:
+        os.close(fd)
+
+
+def drain() -> int:
+    # Caller must hold the writer lock.
+    offset = _read_offset()
+    try:
+        if offset > os.path.getsize(LOG_PATH):
+            # Crashed between truncating the log and resetting the offset.
+            offset = 0
+    except FileNotFoundError:
+        return 0
+
+    stored = 0
+    while True:
+        records, next_offset = _read_batch(offset)
+        if next_offset == offset:
+            break
+        if records:
+            stored += _store_batch(records)
+        _write_json(OFFSET_PATH, next_offset)
+        offset = next_offset
+    _truncate_if_drained(offset)
+    return stored
+
+
+def expire_receipts() -> int:
+    cutoff = time.time() - RECEIPT_TTL_SECONDS
+    removed = 0
+    for entry in os.scandir(RECEIPT_DIR):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+class IngestWriter(threading.Thread):
+    def __init__(self):
+        super().__init__(name="submission-ingest", daemon=True)
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self):
+        self._wake_event.set()
+
+    def run(self):
+        # One writer per host: the other workers wait on the lock and take
+        # over, replaying from the saved offset, if its holder exits.
+        with open(LOCK_PATH, "a") as lock:
+            while not self._stop_event.is_set():
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    self._stop_event.wait(INTERVAL_SECONDS)
+
+            next_expiry = 0.0
+            while not self._stop_event.is_set():
+                self._wake_event.clear()
+                try:
+                    drain()
+                    if time.monotonic() >= next_expiry:
+                        next_expiry = time.monotonic() + 3600
+                        expire_receipts()
+                except Exception:
+                    # The database may be down; the log keeps everything
+                    # and the same batch is retried.
+                    traceback.print_exc()
+                    self._stop_event.wait(INTERVAL_SECONDS * 10)
+                self._wake_event.wait(INTERVAL_SECONDS)
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+        self.join()
+
+
+_writer = None
+
+
+def start_writer():
+    # Threads can't be restarted, so every app lifespan gets a fresh one.
+    global _writer
+    if _writer and _writer.is_alive():
+        return
+    _writer = IngestWriter()
+    _writer.start()
+
+
+def stop_writer():
+    global _writer
+    if _writer:
+        _writer.stop()
+        _writer = None
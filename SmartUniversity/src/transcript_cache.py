@@ -0,0 +1,70 @@
+import os
+import threading
+from .lru import LRUCache
+from .shared_state import SharedLog, current_version
+
+TRANSCRIPT_CACHE_SIZE = int(os.getenv("TRANSCRIPT_CACHE_SIZE", "10000"))
+# The invalidation log is emptied once it reaches this size; workers that see
+# the compaction drop their whole cache.
+COMPACT_MIN_BYTES = int(os.getenv("TRANSCRIPT_COMPACT_BYTES", str(256 * 1024)))
+# Course titles and credits appear in every transcript, so a change to either
+# table invalidates all entries through their version counters.
+SHARED_TABLES = ("Courses", "Course_Sections")
+
+
+class TranscriptCache:
+    # Per-student transcript rows. Enrollment writes call invalidate(), which
+    # drops the entry here and appends the student id to a shared log that
+    # other workers replay before their next read.
+    def __init__(self, max_size: int):
+        self._cache = LRUCache(max_size)
+        self._log = SharedLog("transcript-invalidations")
+        self._log.skip_to_end()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, student_id: int, loader):
+        self._sync()
+        versions = tuple(current_version(t) for t in SHARED_TABLES)
+        entry = self._cache.get(student_id)
+        if entry is not None and entry[0] == versions:
+            return entry[1]
+
+        generation = self._generation
+        rows = loader()
+        with self._lock:
+            # Skip the fill if an invalidation landed while we were loading;
+            # the rows may predate it.
+            if generation == self._generation:
+                self._cache.set(student_id, (versions, rows))
+        return rows
+
+    def invalidate(self, student_id: int):
+        self._drop(student_id)
+        self._log.append(str(student_id))
+
+    def invalidate_all(self):
+        self._drop(None)
+        self._log.append("*")
+
+    def _drop(self, student_id):
+        with self._lock:
+            self._generation += 1
+            if student_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(student_id)
+
+    def _sync(self):
+        lines, restarted = self._log.poll()
+        if restarted:
+            self._drop(None)
+        for line in lines:
+            self._drop(None if line == "*" else int(line))
+        self._log.compact_if_grown(lambda line: False, COMPACT_MIN_BYTES)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+transcript_cache = TranscriptCache(TRANSCRIPT_CACHE_SIZE)
@@ -0,0 +1,193 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Room for the multipart framing and form fields around the file itself.
+MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+# Sessions and temp files untouched for this long are abandoned.
+PARTIAL_TTL_SECONDS = int(os.getenv("UPLOAD_PARTIAL_TTL_SECONDS", str(24 * 3600)))
+PARTIAL_DIR = os.path.join(UPLOAD_DIR, "partial")
+
+os.makedirs(PARTIAL_DIR, exist_ok=True)
+
+
+def _too_large():
+    return HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES} bytes")
+
+
+def safe_filename(filename: str) -> str:
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", os.path.basename(filename or "")).strip("._")
+    return name[:100] or "upload"
+
+
+def session_files(upload_id: str):
+    if not re.fullmatch(r"[0-9a-f]{32}", upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    base = os.path.join(PARTIAL_DIR, upload_id)
+    return f"{base}.json", f"{base}.part"
+
+
+def create_session(student_id: int, assignment_id: int, filename: str, size: int) -> dict:
+    if size > MAX_UPLOAD_BYTES:
+        raise _too_large()
+    session = {
+        "upload_id": uuid.uuid4().hex,
+        "student_id": student_id,
+        "assignment_id": assignment_id,
+        "filename": safe_filename(filename),
+        "size": size,
+        "created_at": time.time()
+    }
+    meta_path, part_path = session_files(session["upload_id"])
+    open(part_path, "wb").close()
+    with open(meta_path, "w") as f:
+        json.dump(session, f)
+    return session
+
+
+def get_session(upload_id: str, student_id: int) -> dict:
+    meta_path, part_path = session_files(upload_id)
+    try:
+        with open(meta_path) as f:
+            session = json.load(f)
+        received = os.path.getsize(part_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if session["student_id"] != student_id:
+        raise HTTPException(status_code=403, detail="Not your upload")
+    session["received"] = received
+    return session
+
+
+async def append_chunk(session: dict, offset: int, chunks) -> int:
+    # Clients resume by asking for `received` and sending from there; a chunk
+    # that doesn't start exactly at the end of the file is rejected. File
+    # writes run in the threadpool, batched to UPLOAD_CHUNK_BYTES.
+    _, part_path = session_files(session["upload_id"])
+    f = await run_in_threadpool(open, part_path, "ab")
+    try:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise HTTPException(status_code=409, detail="Another chunk is being written")
+        received = os.fstat(f.fileno()).st_size
+        if offset != received:
+            raise HTTPException(
+                status_code=409,
+                detail="Offset does not match received bytes",
+                headers={"Upload-Offset": str(received)}
+            )
+        pending = bytearray()
+        async for chunk in chunks:
+            received += len(chunk)
+            if received > session["size"]:
+                await run_in_threadpool(f.truncate, offset)
+                raise HTTPException(status_code=413, detail="Chunk runs past the declared size")
+            pending += chunk
+            if len(pending) >= UPLOAD_CHUNK_BYTES:
+                await run_in_threadpool(f.write, bytes(pending))
+                pending.clear()
+        if pending:
+            await run_in_threadpool(f.write, bytes(pending))
+    finally:
+        await run_in_threadpool(f.close)
+    return received
+
+
+def discard_session(upload_id: str):
+    for path in session_files(upload_id):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def expire_partials() -> int:
+    # Abandoned resumable sessions and temp files left by a crashed request.
+    # A session's .part file is touched by every chunk, so active uploads
+    # are never expired.
+    cutoff = time.time() - PARTIAL_TTL_SECONDS
+    removed = 0
+    for entry in os.scandir(PARTIAL_DIR):
+        name, ext = os.path.splitext(entry.name)
+        try:
+            if ext == ".json":
+                stamp = os.path.getmtime(os.path.join(PARTIAL_DIR, f"{name}.part"))
+            else:
+                stamp = entry.stat().st_mtime
+        except FileNotFoundError:
+            stamp = 0
+        if stamp < cutoff:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+class UploadLimitMiddleware:
+    # Starlette spools a whole multipart body to disk before the endpoint
+    # runs, so for the given paths the size limit is enforced on the raw
+    # body: up front from Content-Length, and while it streams in otherwise.
+    def __init__(self, app, paths):
+        self.app = app
+        self.paths = set(paths)
+        self.limit = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.limit:
+            response = JSONResponse({"detail": f"File exceeds {MAX_UPLOAD_BYTES} bytes"}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    raise _too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def save_stream(fileobj):
+    # Copies an uploaded file to a temp file under UPLOAD_DIR in fixed-size
+    # reads, hashing as it goes and aborting as soon as it goes over the limit.
+    tmp_path = os.path.join(PARTIAL_DIR, f"{uuid.uuid4().hex}.tmp")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = fileobj.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise _too_large()
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, size, digest.hexdigest()
@@ -0,0 +1,153 @@
+import os
+import re
+import threading
+import unicodedata
+from itertools import islice
+from .db import get_db_connection
+from .shared_state import SharedLog
+
+MIN_SIMILARITY = 0.3
+USER_COLUMNS = "user_id, full_name, email, role, created_at"
+# Grams shared by more users than this (the email domain, "an", ...) don't
+# narrow a search down, so they only count toward the score of candidates
+# found through rarer grams. Together with the candidate cap this bounds the
+# work per search whatever the table size.
+COMMON_GRAM_USERS = int(os.getenv("USER_SEARCH_COMMON_GRAM_USERS", "2000"))
+MAX_CANDIDATES = int(os.getenv("USER_SEARCH_MAX_CANDIDATES", "5000"))
+# The change log is emptied once it reaches this size; workers that see the
+# compaction reload the whole index.
+COMPACT_MIN_BYTES = int(os.getenv("USER_SEARCH_COMPACT_BYTES", str(256 * 1024)))
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.casefold().replace("ı", "i"))
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _tokens(text: str) -> list[str]:
+    return [t for t in re.split(r"[^0-9a-z]+", _normalize(text)) if t]
+
+
+def _trigrams(tokens) -> set[str]:
+    # Two leading spaces make the first letters of every word their own
+    # trigrams, which is what gives prefix matches a high score.
+    grams = set()
+    for token in tokens:
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class UserSearchIndex:
+    # In-process trigram index over active users' names and emails. Handlers
+    # report changed user ids to a shared log; every worker re-reads just
+    # those users before its next search.
+    def __init__(self):
+        self._log = SharedLog("user-changes")
+        self._docs = {}
+        self._doc_grams = {}
+        self._postings = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def changed(self, user_id: int):
+        self._log.append(str(user_id))
+
+    def _add(self, row):
+        tokens = _tokens(row["full_name"]) + _tokens(row["email"])
+        grams = _trigrams(tokens)
+        self._docs[row["user_id"]] = (row, tokens)
+        self._doc_grams[row["user_id"]] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(row["user_id"])
+
+    def _remove(self, user_id):
+        self._docs.pop(user_id, None)
+        for gram in self._doc_grams.pop(user_id, ()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(user_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def _fetch(self, query, params=()):
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _load_all(self):
+        self._docs, self._doc_grams, self._postings = {}, {}, {}
+        for row in self._fetch(f"SELECT {USER_COLUMNS} FROM Users WHERE is_active = 1"):
+            self._add(row)
+
+    def _sync(self):
+        if not self._loaded:
+            self._log.skip_to_end()
+            self._load_all()
+            self._loaded = True
+            return
+
+        lines, restarted = self._log.poll()
+        if restarted:
+            self._load_all()
+        elif lines:
+            user_ids = list({int(line) for line in lines})
+            placeholders = ", ".join(["%s"] * len(user_ids))
+            rows = self._fetch(
+                f"SELECT {USER_COLUMNS} FROM Users WHERE is_active = 1 AND user_id IN ({placeholders})",
+                user_ids
+            )
+            for user_id in user_ids:
+                self._remove(user_id)
+            for row in rows:
+                self._add(row)
+        # Every line is applied by now, so this worker can drop them all.
+        self._log.compact_if_grown(lambda line: False, COMPACT_MIN_BYTES)
+
+    def _candidates(self, query_grams):
+        postings = sorted((self._postings.get(g, ()) for g in query_grams), key=len)
+        rare = [p for p in postings if len(p) <= COMMON_GRAM_USERS]
+        if rare:
+            candidates = set()
+            for posting in rare:
+                candidates.update(posting)
+                if len(candidates) >= MAX_CANDIDATES:
+                    break
+            return islice(candidates, MAX_CANDIDATES)
+        # Only common grams: users that have all of them, walking the
+        # rarest posting list first.
+        rarest, others = postings[0], postings[1:]
+        return islice((u for u in rarest if all(u in p for p in others)), MAX_CANDIDATES)
+
+    def search(self, text: str, role=None, limit: int = 50, offset: int = 0):
+        query_tokens = _tokens(text)
+        query_grams = _trigrams(query_tokens)
+        if not query_grams:
+            return []
+
+        with self._lock:
+            self._sync()
+            ranked = []
+            for user_id in self._candidates(query_grams):
+                score = len(self._doc_grams[user_id] & query_grams) / len(query_grams)
+                if score < MIN_SIMILARITY:
+                    continue
+                row, tokens = self._docs[user_id]
+                if role and row["role"] != role:
+                    continue
+                if all(any(t.startswith(q) for t in tokens) for q in query_tokens):
+                    score += 1.0
+                elif all(any(q in t for t in tokens) for q in query_tokens):
+                    score += 0.5
+                ranked.append((-score, _normalize(row["full_name"]), user_id, row))
+
+        ranked.sort(key=lambda r: r[:3])
+        return [r[3] for r in ranked[offset:offset + limit]]
+
+
+user_search = UserSearchIndex()
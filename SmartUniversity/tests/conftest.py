@@ -0,0 +1,125 @@
+import os
+import sys
+import tempfile
+
+# Module-level settings are read at import time, so they have to be in place
+# before anything under src is imported.
+_state = tempfile.mkdtemp(prefix="smartuni-tests-")
+os.environ.setdefault("SHARED_STATE_DIR", os.path.join(_state, "state"))
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_state, "uploads"))
+os.environ.setdefault("PASSWORD_SCRYPT_N", "1024")
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+class FakeCursor:
+    def __init__(self, db, dictionary):
+        self.db = db
+        self.dictionary = dictionary
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def execute(self, query, params=None):
+        query = " ".join(query.split())
+        self.db.log.append((query, params))
+        result = self.db.handler(query, params)
+        if isinstance(result, int):
+            self.rows, self.rowcount = [], result
+        else:
+            self.rows = list(result or [])
+            self.rowcount = len(self.rows)
+        self.lastrowid = self.db.lastrowid
+
+    def executemany(self, query, seq):
+        self.rowcount = 0
+        for params in seq:
+            self.execute(query, params)
+
+    def _shape(self, row):
+        if self.dictionary or not isinstance(row, dict):
+            return row
+        return tuple(row.values())
+
+    def fetchone(self):
+        return self._shape(self.rows.pop(0)) if self.rows else None
+
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return [self._shape(r) for r in rows]
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return [self._shape(r) for r in rows]
+
+    def __iter__(self):
+        while self.rows:
+            yield self.fetchone()
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, dictionary=False, **kwargs):
+        return FakeCursor(self.db, dictionary)
+
+    def start_transaction(self, **kwargs):
+        self.db.log.append(("BEGIN", None))
+
+    def commit(self):
+        self.db.log.append(("COMMIT", None))
+
+    def rollback(self):
+        self.db.log.append(("ROLLBACK", None))
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    # handler(query, params) returns the result rows (dicts) or a rowcount.
+    # Queries reach it with whitespace collapsed to single spaces.
+    def __init__(self, handler=None):
+        self.handler = handler or (lambda query, params: [])
+        self.log = []
+        self.lastrowid = None
+
+    def connect(self):
+        return FakeConnection(self)
+
+    def queries(self, prefix=""):
+        return [q for q, _ in self.log if q.startswith(prefix)]
+
+
+@pytest.fixture
+def app():
+    from src.main import app
+    return app
+
+
+@pytest.fixture
+def fake_db(app, monkeypatch):
+    db = FakeDB()
+    for name, module in list(sys.modules.items()):
+        if name.startswith("src") and hasattr(module, "get_db_connection"):
+            monkeypatch.setattr(module, "get_db_connection", db.connect)
+    return db
+
+
+@pytest.fixture
+def client(app, fake_db):
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_header(app):
+    from src.routers.auth import create_token
+
+    def header(user_id, role):
+        return {"Authorization": f"Bearer {create_token(user_id, role)}"}
+    return header
@@ -0,0 +1,83 @@
+from datetime import date
+
+from src import attendance_bitmaps as bitmaps
+
+MONDAY = date(2024, 10, 21)
+TUESDAY = date(2024, 10, 22)
+
+
+def _bitmap(*days):
+    value = 0
+    for day in days:
+        value |= 1 << bitmaps._day_index(day)
+    return value.to_bytes(bitmaps.BITMAP_BYTES, "little")
+
+
+def _sql_mask(day):
+    # The CONCAT/REPEAT expression used by the rebuild in migrations.sql.
+    index = day.timetuple().tm_yday - 1
+    return bytes(index // 8) + bytes([1 << index % 8]) + bytes(45 - index // 8)
+
+
+def test_upsert_sets_one_status_and_clears_the_others(fake_db):
+    cursor = fake_db.connect().cursor()
+    bitmaps.record_statuses(cursor, 1, MONDAY, [(4, "Present"), (5, "Late")])
+
+    [(query, params)] = fake_db.log
+    assert query.count("_binary %s") == 4 * 2 + 4
+    mask, zero, inverse = _bitmap(MONDAY), bitmaps.ZERO, bitmaps._inverse_mask(MONDAY)
+    assert params == [
+        1, 4, 2024, mask, zero, zero, zero,
+        1, 5, 2024, zero, zero, zero, mask,
+        inverse, inverse, inverse, inverse
+    ]
+
+
+def test_no_rows_no_query(fake_db):
+    bitmaps.record_statuses(fake_db.connect().cursor(), 1, MONDAY, [])
+    assert not fake_db.log
+
+
+def test_masks_match_the_sql_rebuild():
+    for day in (date(2024, 1, 1), date(2024, 1, 8), MONDAY, date(2024, 12, 31), date(2023, 12, 31)):
+        assert bitmaps._mask(day) == _sql_mask(day)
+
+
+def test_rebuild_reads_attendance_date_and_keeps_late(fake_db):
+    rows = [(1, 4, MONDAY, "Present"), (1, 4, TUESDAY, "Late"), (1, 5, MONDAY, "Absent")]
+    fake_db.handler = lambda q, p: rows if q.startswith("SELECT section_id, student_id, attendance_date, status") else []
+
+    assert bitmaps.rebuild() == 2
+    [(query, params)] = [(q, p) for q, p in fake_db.log if q.startswith("INSERT INTO Attendance_Bitmaps")]
+    zero = bitmaps.ZERO
+    assert params == [
+        1, 4, 2024, _bitmap(MONDAY), zero, zero, _bitmap(TUESDAY),
+        1, 5, 2024, zero, _bitmap(MONDAY), zero, zero
+    ]
+    assert fake_db.queries("COMMIT")
+
+
+def test_counts_streaks_and_heatmap_read_late(fake_db):
+    wednesday = date(2024, 10, 23)
+    row = (2024, _bitmap(MONDAY), _bitmap(TUESDAY), bitmaps.ZERO, _bitmap(wednesday))
+    fake_db.handler = lambda q, p: [(1, 1, 1, 1)] if "BIT_COUNT" in q else [row]
+    cursor = fake_db.connect().cursor()
+
+    assert bitmaps.status_counts(cursor, 1, 4) == (1, 1, 1, 1)
+    assert bitmaps.attendance_streaks(cursor, 1, 4) == {"sessions": 3, "current_streak": 1, "longest_streak": 1}
+    heatmap = bitmaps.absence_heatmap(cursor, 1)
+    assert [(d["date"], d["late"], d["absence_rate"]) for d in heatmap] == [
+        (MONDAY, 0, 0.0), (TUESDAY, 0, 100.0), (wednesday, 1, 0.0)
+    ]
+
+
+def test_marking_attendance_writes_the_row_and_the_bitmap(client, fake_db, auth_header):
+    r = client.post(
+        "/attendance/",
+        json={"section_id": 1, "student_id": 4, "date": str(MONDAY), "status": "Present"},
+        headers=auth_header(1, "Admin")
+    )
+    assert r.status_code == 200
+    queries = [q for q, _ in fake_db.log]
+    assert any(q.startswith("INSERT INTO Attendance (section_id, student_id, attendance_date, status)") for q in queries)
+    assert any(q.startswith("INSERT INTO Attendance_Bitmaps") for q in queries)
@@ -0,0 +1,126 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from src import blob_store
+
+LIVE = "a" * 64
+ORPHAN = "b" * 64
+STORED_MEANWHILE = "c" * 64
+FRESH = "d" * 64
+
+
+@pytest.fixture
+def blob_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_DIR", str(tmp_path / "blobs"))
+    return tmp_path / "blobs"
+
+
+def _place(digest, age):
+    path = blob_store.blob_file(digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(digest.encode())
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_gc_recounts_under_a_lock_and_spares_blobs_stored_meanwhile(fake_db, blob_dir):
+    old = blob_store.ORPHAN_GRACE_SECONDS * 2
+    paths = {d: _place(d, old) for d in (LIVE, ORPHAN, STORED_MEANWHILE)}
+    paths[FRESH] = _place(FRESH, 0)
+
+    def handler(query, params):
+        if query == "SELECT digest FROM Submission_Blobs":
+            return [(LIVE,)]
+        if query.startswith("SELECT digest FROM Submission_Blobs WHERE digest IN"):
+            # A store() of this digest committed after the snapshot above.
+            return [(d,) for d in params if d == STORED_MEANWHILE]
+        if query.startswith("DELETE FROM Submission_Blobs"):
+            return 2
+        return []
+    fake_db.handler = handler
+
+    report = blob_store.collect_garbage()
+
+    assert report["rows_deleted"] == 2
+    assert report["files_deleted"] == 1
+    assert not os.path.exists(paths[ORPHAN])
+    assert all(os.path.exists(paths[d]) for d in (LIVE, STORED_MEANWHILE, FRESH))
+
+    queries = [q for q, _ in fake_db.log]
+    lock = queries.index("SELECT digest FROM Submission_Blobs FOR UPDATE")
+    recount = next(i for i, q in enumerate(queries) if q.startswith("UPDATE Submission_Blobs b"))
+    delete = next(i for i, q in enumerate(queries) if q.startswith("DELETE FROM Submission_Blobs"))
+    assert lock < recount < delete < queries.index("COMMIT")
+    assert [q for q in queries if q.endswith("FOR UPDATE")][1].startswith("SELECT digest FROM Submission_Blobs WHERE digest IN")
+
+
+def test_release_only_returns_digests_that_reach_zero(fake_db):
+    def handler(query, params):
+        if query.startswith("SELECT digest FROM Submission_Blobs WHERE digest IN"):
+            return [(LIVE,)]
+        return []
+    fake_db.handler = handler
+    cursor = fake_db.connect().cursor()
+    paths = [f"sha256:{LIVE}/a.pdf", f"sha256:{LIVE}/b.pdf", f"sha256:{ORPHAN}/c.pdf", "https://x/y"]
+
+    assert blob_store.release(cursor, paths) == [LIVE]
+    updates = [p for q, p in fake_db.log if q.startswith("UPDATE Submission_Blobs SET ref_count")]
+    assert sorted(updates) == [(1, ORPHAN), (2, LIVE)]
+
+
+def test_remove_files_skips_digests_that_came_back(fake_db, blob_dir):
+    a, b = _place(LIVE, 0), _place(ORPHAN, 0)
+    fake_db.handler = lambda q, p: [(LIVE,)] if "FOR UPDATE" in q else []
+    assert blob_store.remove_files(fake_db.connect(), [LIVE, ORPHAN]) == 1
+    assert os.path.exists(a) and not os.path.exists(b)
+
+
+def test_upload_stores_the_blob_before_the_submission(client, fake_db, blob_dir, auth_header):
+    def handler(query, params):
+        if query.startswith("SELECT due_date FROM Assignments"):
+            return [{"due_date": datetime.now() + timedelta(days=1)}]
+        if query.startswith("SELECT 1 FROM Enrollments"):
+            return [{"1": 1}]
+        return []
+    fake_db.handler = handler
+
+    r = client.post(
+        "/submissions/upload",
+        data={"assignment_id": "1"},
+        files={"file": ("../../etc/report.pdf", b"hello", "application/pdf")},
+        headers=auth_header(4, "Student")
+    )
+    assert r.status_code == 200
+    digest = blob_store.digest_of(r.json()["file_path"])
+    assert r.json()["file_path"].endswith("/report.pdf")
+    assert os.path.exists(blob_store.blob_file(digest))
+
+    queries = [q for q, _ in fake_db.log]
+    blob = next(i for i, q in enumerate(queries) if q.startswith("INSERT INTO Submission_Blobs"))
+    submission = next(i for i, q in enumerate(queries) if q.startswith("INSERT INTO Submissions"))
+    assert blob < submission
+
+
+@pytest.mark.parametrize("file_path", ["/etc/passwd", f"sha256:{LIVE}/x.pdf", "../uploads/a.pdf", "file:///etc/passwd"])
+def test_clients_cannot_name_server_files(client, fake_db, auth_header, file_path):
+    r = client.post(
+        "/submissions/",
+        json={"assignment_id": 1, "file_path": file_path},
+        headers=auth_header(4, "Student")
+    )
+    assert r.status_code == 400
+    assert not fake_db.log
+
+
+def test_resolve_stays_inside_the_upload_dir():
+    assert blob_store.resolve("/etc/passwd") is None
+    assert blob_store.resolve(os.path.join(blob_store.UPLOAD_DIR, "..", "x")) is None
+    assert blob_store.resolve(f"sha256:{'z' * 64}/x") is None
+    assert blob_store.resolve(f"sha256:{LIVE}/x.pdf") == blob_store.blob_file(LIVE)
+    inside = os.path.join(blob_store.UPLOAD_DIR, "old.pdf")
+    assert blob_store.resolve(inside) == os.path.realpath(inside)
@@ -0,0 +1,69 @@
+import pytest
+
+
+@pytest.fixture
+def assignment(fake_db):
+    def handler(query, params):
+        if query.startswith("SELECT a.due_date, a.max_score"):
+            return [{"due_date": None, "max_score": 100, "instructor_id": 2}]
+        if query.startswith("SELECT submission_id, student_id FROM Submissions"):
+            return [{"submission_id": 10, "student_id": 4}, {"submission_id": 11, "student_id": 5}]
+        return []
+    fake_db.handler = handler
+    return fake_db
+
+
+def _graded(fake_db):
+    [(query, params)] = [(q, p) for q, p in fake_db.log if q.startswith("UPDATE Submissions s")]
+    return [tuple(params[i:i + 3]) for i in range(0, len(params) - 1, 3)]
+
+
+def _upload(client, headers, text):
+    return client.put(
+        "/submissions/assignment/1/grades/csv",
+        files={"file": ("grades.csv", text.encode(), "text/csv")},
+        headers=headers
+    )
+
+
+def test_json_rejects_non_finite_grades(client, assignment, auth_header):
+    r = client.put(
+        "/submissions/assignment/1/grades",
+        content='{"grades": [{"submission_id": 10, "grade": NaN}, {"submission_id": 11, "grade": 80}]}',
+        headers={**auth_header(2, "Instructor"), "Content-Type": "application/json"}
+    )
+    assert r.status_code == 200
+    body = r.json()
+    assert [o["status"] for o in body["results"]] == ["error", "graded"]
+    assert body["results"][0]["error"] == "grade must be a finite number"
+    assert _graded(assignment) == [(11, 80.0, None)]
+
+
+def test_csv_reports_unparsable_rows_and_grades_the_rest(client, assignment, auth_header):
+    r = _upload(client, auth_header(2, "Instructor"), "student_id,grade,feedback\n4,abc,x\n5,90,good\n")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["graded"] == 1 and body["failed"] == 1
+    assert body["results"][0] == {
+        "row": 1, "submission_id": None, "student_id": None,
+        "status": "invalid", "error": "Invalid number on line 2"
+    }
+    assert body["results"][1]["status"] == "graded"
+    assert _graded(assignment) == [(11, 90.0, "good")]
+
+
+def test_csv_rejects_nan(client, assignment, auth_header):
+    r = _upload(client, auth_header(2, "Instructor"), "submission_id,grade\n10,nan\n")
+    assert r.json()["results"][0]["error"] == "grade must be a finite number"
+
+
+def test_malformed_csv_is_a_bad_request(client, assignment, auth_header):
+    # A field past csv.field_size_limit() makes the reader raise csv.Error.
+    r = _upload(client, auth_header(2, "Instructor"), "submission_id,grade,feedback\n10,5," + "x" * 200_000 + "\n")
+    assert r.status_code == 400
+    assert r.json()["detail"].startswith("Unreadable CSV after line 1")
+
+
+def test_other_instructors_cannot_grade(client, assignment, auth_header):
+    r = _upload(client, auth_header(3, "Instructor"), "submission_id,grade\n10,50\n")
+    assert r.status_code == 403
@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+
+DAY = date(2024, 10, 21)
+
+
+@pytest.fixture
+def campus(fake_db):
+    def handler(query, params):
+        if query.startswith("SELECT section_id, semester, year"):
+            return [(1, "Fall", 2024, "Monday", "09:00-12:00", "B-101")]
+        if query.startswith("SELECT card_id, user_id FROM Users"):
+            return [("C1", 4), ("C2", 5), ("C3", 6)]
+        if query.startswith("SELECT section_id, student_id FROM Enrollments"):
+            return [(1, 4), (1, 5), (1, 6)]
+        if query.startswith("SELECT section_id, attendance_date, student_id FROM Attendance"):
+            return [(1, DAY, 6)]
+        return []
+    fake_db.handler = handler
+    return fake_db
+
+
+def _import(client, headers, text):
+    return client.post(
+        "/attendance/card-import",
+        files={"file": ("log.csv", text.encode(), "text/csv")},
+        headers=headers
+    )
+
+
+def test_marks_present_and_absent_but_keeps_existing_marks(client, campus, auth_header):
+    r = _import(client, auth_header(1, "Admin"), "timestamp,room,card_id\n2024-10-21T09:05:00,b-101,c1\n")
+    assert r.status_code == 200
+    report = r.json()
+    assert (report["records"], report["present"], report["absent"], report["kept_existing"]) == (2, 1, 1, 1)
+
+    [(query, params)] = [(q, p) for q, p in campus.log if q.startswith("INSERT INTO Attendance (")]
+    assert "status = IF(status = 'Absent', VALUES(status), status)" in query
+    assert params == [1, 4, DAY, "Present", 1, 5, DAY, "Absent"]
+
+
+def test_malformed_log_is_a_bad_request_and_writes_nothing(client, campus, auth_header):
+    # A field past csv.field_size_limit() makes the reader raise csv.Error.
+    text = "timestamp,room,card_id\n2024-10-21T09:05:00,B-101,C1\n2024-10-21T09:06:00,B-101," + "x" * 200_000 + "\n"
+    r = _import(client, auth_header(1, "Admin"), text)
+    assert r.status_code == 400
+    assert r.json()["detail"].startswith("Unreadable CSV after line 2")
+    assert not campus.queries("INSERT")
+    assert not campus.queries("COMMIT")
+
+
+def test_missing_columns(client, campus, auth_header):
+    r = _import(client, auth_header(1, "Admin"), "timestamp,room\n")
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Missing columns: card_id"
@@ -0,0 +1,157 @@
+import copy
+import re
+from decimal import Decimal, ROUND_HALF_UP
+
+import pytest
+
+from src import gpa
+
+CREDITS = {1: 3, 2: 4, 3: 5}
+
+
+def _money(value):
+    return Decimal(str(value)).quantize(Decimal("0.01"), ROUND_HALF_UP)
+
+
+class GradeBook:
+    # Just enough of Enrollments/Student_Profiles to run the GPA statements,
+    # with MySQL's left-to-right evaluation of single-table SET clauses.
+    def __init__(self, enrollments):
+        self.enrollments = {
+            eid: {"student_id": sid, "course_id": cid, "grade": grade,
+                  "grade_points": points, "completion_status": status}
+            for eid, (sid, cid, grade, points, status) in enrollments.items()
+        }
+        self.profiles = {
+            sid: {"quality_points": Decimal("0.00"), "credits_earned": 0, "current_gpa": Decimal("0.00")}
+            for sid, *_ in enrollments.values()
+        }
+        self.rebuild()
+
+    def expected(self, student_id):
+        points, credits = Decimal("0"), 0
+        for e in self.enrollments.values():
+            if e["student_id"] == student_id and e["grade_points"] is not None:
+                points += Decimal(str(e["grade_points"])) * CREDITS[e["course_id"]]
+                credits += CREDITS[e["course_id"]]
+        return _money(points), credits
+
+    def rebuild(self):
+        for sid, profile in self.profiles.items():
+            points, credits = self.expected(sid)
+            profile["quality_points"] = points
+            profile["credits_earned"] = credits
+            profile["current_gpa"] = _money(points / credits) if credits else Decimal("0.00")
+
+    def __call__(self, query, params):
+        if query.startswith("SELECT e.student_id, e.grade_points, c.credits"):
+            e = self.enrollments.get(params[0])
+            if not e:
+                return []
+            return [{"student_id": e["student_id"], "grade_points": e["grade_points"],
+                     "credits": CREDITS[e["course_id"]]}]
+        if query.startswith("UPDATE Enrollments SET"):
+            columns = re.findall(r"(\w+)=%s", query.split(" WHERE ")[0])
+            self.enrollments[params[-1]].update(zip(columns, params))
+            return 1
+        if query.startswith("DELETE FROM Enrollments"):
+            return 1 if self.enrollments.pop(params[0], None) else 0
+        if query == " ".join(gpa.DELTA_SQL.split()):
+            points, credits, sid = params
+            profile = self.profiles[sid]
+            profile["quality_points"] = _money(profile["quality_points"] + Decimal(str(points)))
+            profile["credits_earned"] += credits
+            profile["current_gpa"] = (
+                _money(profile["quality_points"] / profile["credits_earned"])
+                if profile["credits_earned"] > 0 else Decimal("0.00")
+            )
+            return 1
+        if query.startswith("SELECT sp.student_id, sp.quality_points"):
+            rows = []
+            for sid, profile in sorted(self.profiles.items()):
+                points, credits = self.expected(sid)
+                if abs(profile["quality_points"] - points) >= Decimal("0.005") or profile["credits_earned"] != credits:
+                    rows.append({"student_id": sid, **profile,
+                                 "expected_points": points, "expected_credits": credits})
+            return rows
+        return []
+
+
+@pytest.fixture
+def book(fake_db):
+    book = GradeBook({
+        1: (4, 1, "AA", 4.0, "Completed"),
+        2: (4, 2, None, None, "Enrolled"),
+        3: (5, 1, "CC", 2.0, "Completed"),
+        4: (5, 3, "BA", 3.5, "Completed"),
+    })
+    fake_db.handler = book
+    return book
+
+
+def _assert_matches_full_recompute(book):
+    assert gpa.verify_gpas() == []
+    incremental = copy.deepcopy(book.profiles)
+    book.rebuild()
+    assert incremental == book.profiles
+
+
+def test_grade_change_applies_the_delta(client, book, auth_header):
+    r = client.put("/enrollments/3", json={"grade": "BB"}, headers=auth_header(1, "Admin"))
+    assert r.status_code == 200
+    assert book.profiles[5]["quality_points"] == Decimal("26.50")
+    _assert_matches_full_recompute(book)
+
+
+def test_first_grade_adds_credits(client, book, auth_header):
+    client.put("/enrollments/2", json={"grade": "BA"}, headers=auth_header(1, "Admin"))
+    assert book.profiles[4]["credits_earned"] == 7
+    _assert_matches_full_recompute(book)
+
+
+def test_ff_counts_credits_without_points(client, book, auth_header):
+    client.put("/enrollments/2", json={"grade": "FF"}, headers=auth_header(1, "Admin"))
+    assert book.profiles[4]["quality_points"] == Decimal("12.00")
+    assert book.profiles[4]["credits_earned"] == 7
+    assert book.profiles[4]["current_gpa"] == Decimal("1.71")
+    _assert_matches_full_recompute(book)
+
+
+def test_status_change_to_dropped_keeps_the_grade(client, book, auth_header, fake_db):
+    r = client.put("/enrollments/1", json={"completion_status": "Dropped"}, headers=auth_header(1, "Admin"))
+    assert r.status_code == 200
+    assert not fake_db.queries("UPDATE Student_Profiles")
+    _assert_matches_full_recompute(book)
+
+
+def test_clearing_a_grade_removes_its_contribution(client, book, auth_header):
+    client.put("/enrollments/4", json={"grade": None}, headers=auth_header(1, "Admin"))
+    assert book.profiles[5]["credits_earned"] == 3
+    _assert_matches_full_recompute(book)
+
+
+def test_dropping_a_graded_course(client, book, auth_header):
+    r = client.delete("/enrollments/1", headers=auth_header(1, "Admin"))
+    assert r.status_code == 200
+    assert book.profiles[4]["credits_earned"] == 0
+    assert book.profiles[4]["current_gpa"] == Decimal("0.00")
+    _assert_matches_full_recompute(book)
+
+
+def test_a_sequence_of_changes_stays_in_step(client, book, auth_header):
+    admin = auth_header(1, "Admin")
+    for eid, body in [
+        (2, {"grade": "DD"}),
+        (2, {"grade": "FF"}),
+        (3, {"grade": "AA", "completion_status": "Completed"}),
+        (4, {"completion_status": "Dropped"}),
+        (2, {"grade": "CB"}),
+    ]:
+        assert client.put(f"/enrollments/{eid}", json=body, headers=admin).status_code == 200
+    assert client.delete("/enrollments/3", headers=admin).status_code == 200
+    _assert_matches_full_recompute(book)
+
+
+def test_verify_reports_totals_that_were_never_built(book):
+    book.profiles[4]["quality_points"] = Decimal("0.00")
+    assert [row["student_id"] for row in gpa.verify_gpas()] == [4]
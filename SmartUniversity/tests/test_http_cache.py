@@ -0,0 +1,80 @@
+import pytest
+
+from src import reference_cache as reference_module
+from src import http_cache, shared_state
+from src.reference_cache import reference_cache
+
+ENGINEERING = {"department_id": 1, "name": "Computer Engineering", "faculty_name": "Computing",
+               "budget_code": "CS", "head_of_department": None}
+ARCHITECTURE = {"department_id": 2, "name": "Architecture", "faculty_name": "Architecture",
+                "budget_code": "AR", "head_of_department": None}
+
+
+@pytest.fixture
+def departments(fake_db, monkeypatch):
+    monkeypatch.setattr(reference_cache, "_entries", {})
+    state = {"rows": [ENGINEERING]}
+    fake_db.handler = lambda q, p: list(state["rows"]) if q.startswith("SELECT department_id, name") else 1
+    return state
+
+
+def test_writes_bump_on_both_sides_of_the_commit(client, fake_db, auth_header, departments, monkeypatch):
+    bump = shared_state.bump_version
+    monkeypatch.setattr(shared_state, "bump_version", lambda *names: fake_db.log.append(("BUMP", names)) or bump(*names))
+
+    r = client.post("/departments/", json={"name": "Architecture", "faculty_name": "Architecture", "budget_code": "AR"},
+                    headers=auth_header(1, "Admin"))
+    assert r.status_code == 200
+    assert [entry for entry in fake_db.log if entry[0] in ("BUMP", "COMMIT")] == [
+        ("BUMP", ("Departments",)), ("COMMIT", None), ("BUMP", ("Departments",))
+    ]
+
+
+def test_no_etag_from_before_or_during_a_write_validates_the_new_rows(client, auth_header, departments, monkeypatch):
+    admin = auth_header(1, "Admin")
+
+    def get(etag=None):
+        # A worker with nothing cached, so it reads whatever is committed.
+        monkeypatch.setattr(reference_cache, "_entries", {})
+        return client.get("/departments/", headers={**admin, "If-None-Match": etag or '"none"'})
+
+    before = get().headers["etag"]
+    bump = shared_state.bump_version
+    during = []
+
+    def bump_with_readers(*names):
+        if during:
+            # Committed, second bump not written yet.
+            departments["rows"] = [ENGINEERING, ARCHITECTURE]
+            assert get(before).status_code == 200
+        during.append(get().headers["etag"])
+        return bump(*names)
+
+    monkeypatch.setattr(shared_state, "bump_version", bump_with_readers)
+    client.post("/departments/", json={"name": "Architecture", "faculty_name": "Architecture", "budget_code": "AR"},
+                headers=admin)
+    monkeypatch.setattr(shared_state, "bump_version", bump)
+
+    for etag in [before] + during:
+        r = get(etag)
+        assert r.status_code == 200 and len(r.json()) == 2
+    assert get(r.headers["etag"]).status_code == 304
+
+
+def test_catalog_gets_read_each_version_file_once(client, auth_header, departments, monkeypatch):
+    reads = []
+    current = reference_module.current_version
+    monkeypatch.setattr(reference_module, "current_version", lambda name: reads.append(name) or current(name))
+    monkeypatch.setattr(http_cache, "current_version", lambda name: pytest.fail("conditional_get read " + name))
+
+    admin = auth_header(1, "Admin")
+    r = client.get("/departments/", headers=admin)
+    assert r.status_code == 200 and reads == ["Departments"]
+
+    reads.clear()
+    assert client.get("/departments/", headers={**admin, "If-None-Match": r.headers["etag"]}).status_code == 304
+    assert reads == ["Departments"]
+
+    reads.clear()
+    assert client.get("/courses/", headers=admin).status_code == 200
+    assert reads == ["Courses", "Departments"]
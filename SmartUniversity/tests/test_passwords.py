@@ -0,0 +1,74 @@
+import asyncio
+import hashlib
+import threading
+
+import pytest
+
+from src import passwords, rate_limit
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_backend", rate_limit.MemoryBackend())
+
+
+class OneSlot:
+    # Lets the verify through and reports the pool as full afterwards.
+    def __init__(self):
+        self.free = 1
+
+    def acquire(self, blocking=True):
+        if not self.free:
+            return False
+        self.free -= 1
+        return True
+
+    def release(self):
+        pass
+
+
+def _login(client, fake_db, stored):
+    fake_db.handler = lambda q, p: (
+        [{"user_id": 4, "password_hash": stored, "role": "Student"}] if q.startswith("SELECT user_id, password_hash") else 1
+    )
+    return client.post("/auth/login", json={"email": "omer@itu.edu.tr", "password": "secret"})
+
+
+@pytest.mark.parametrize("stored", [
+    "scrypt$abc$8$1$c2FsdA==$ZGlnZXN0",
+    "scrypt$1024$8$1$not-base64$ZGlnZXN0",
+    "scrypt$1000$8$1$c2FsdA==$ZGlnZXN0",
+    "scrypt$1024$8$1$c2FsdA==",
+])
+def test_unparsable_stored_hash_is_a_failed_login(client, fake_db, stored):
+    assert asyncio.run(passwords.verify_password("secret", stored)) == (False, False)
+    assert _login(client, fake_db, stored).status_code == 401
+
+
+def test_correct_password_round_trips():
+    stored = asyncio.run(passwords.hash_password("secret"))
+    assert asyncio.run(passwords.verify_password("secret", stored)) == (True, False)
+    assert asyncio.run(passwords.verify_password("wrong", stored)) == (False, False)
+
+
+def test_legacy_hash_is_upgraded_on_login(client, fake_db):
+    r = _login(client, fake_db, hashlib.sha256(b"secret").hexdigest())
+    assert r.status_code == 200
+    [params] = [p for q, p in fake_db.log if q.startswith("UPDATE Users SET password_hash")]
+    assert params[0].startswith("scrypt$") and params[1] == 4
+
+
+def test_rehash_is_skipped_when_the_pool_is_full(client, fake_db, monkeypatch):
+    monkeypatch.setattr(passwords, "_slots", OneSlot())
+    r = _login(client, fake_db, hashlib.sha256(b"secret").hexdigest())
+    assert r.status_code == 200
+    assert not fake_db.queries("UPDATE Users SET password_hash")
+
+
+def test_full_pool_still_rejects_new_hashes(monkeypatch):
+    monkeypatch.setattr(passwords, "_slots", threading.BoundedSemaphore(1))
+    passwords._slots.acquire()
+    assert asyncio.run(passwords.try_hash_password("secret")) is None
+    with pytest.raises(passwords.HTTPException) as e:
+        asyncio.run(passwords.hash_password("secret"))
+    assert e.value.status_code == 503
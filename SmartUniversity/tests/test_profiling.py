@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from src import profiling, responses
+from src.routers import auth
+
+
+@pytest.fixture
+def profiler():
+    yield profiling.state
+    profiling.state.configure(False, 0.0, [], profiling.DEFAULT_INTERVAL_MS, profiling.MAX_DUMPS)
+    profiling.state.clear()
+
+
+def _stacks(dump):
+    return "\n".join(dump["stacks"])
+
+
+def test_samples_dependencies_and_rendering(client, fake_db, auth_header, profiler, monkeypatch):
+    profiler.configure(True, 0.0, ["/users/me"], 1.0, 10)
+    fake_db.handler = lambda q, p: [{"user_id": 4, "full_name": "x", "email": "x@y", "role": "Student", "created_at": None}]
+
+    verify = auth.verify_token
+    dumps = responses.dumps
+
+    def slow_verify_token(token):
+        time.sleep(0.05)
+        return verify(token)
+
+    def slow_dumps(content):
+        time.sleep(0.05)
+        return dumps(content)
+
+    monkeypatch.setattr(auth, "verify_token", slow_verify_token)
+    monkeypatch.setattr(responses, "dumps", slow_dumps)
+
+    r = client.get("/users/me", headers=auth_header(4, "Student"))
+    assert r.status_code == 200
+
+    [dump] = profiler.list_dumps()
+    assert dump["route"] == "/users/me"
+    assert dump["duration_ms"] >= 100
+    stacks = _stacks(dump)
+    assert "slow_verify_token" in stacks
+    assert "slow_dumps" in stacks
+
+
+def test_unselected_routes_are_not_profiled(client, auth_header, profiler):
+    profiler.configure(True, 0.0, ["/users/me"], 1.0, 10)
+    client.get("/", headers=auth_header(1, "Admin"))
+    client.get("/departments/", headers=auth_header(1, "Admin"))
+    assert profiler.list_dumps() == []
+
+
+def test_listing_dumps_while_samplers_add_them(client, auth_header, profiler):
+    profiler.configure(True, 0.0, ["/nothing"], 1.0, 5)
+    stop = threading.Event()
+
+    def add():
+        while not stop.is_set():
+            profiler.add_dump({"route": "/x", "method": "GET", "path": "/x", "stacks": {"a;b": 1}})
+
+    writer = threading.Thread(target=add)
+    writer.start()
+    try:
+        admin = auth_header(1, "Admin")
+        for _ in range(50):
+            assert client.get("/profiling/", headers=admin).status_code == 200
+            assert client.get("/profiling/dumps", headers=admin).status_code == 200
+    finally:
+        stop.set()
+        writer.join()
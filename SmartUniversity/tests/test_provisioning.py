@@ -0,0 +1,64 @@
+import pytest
+
+from src import provisioning
+from src.reference_cache import reference_cache
+
+HEADER = "full_name,email,password,role,department_id\n"
+
+
+@pytest.fixture
+def directory(fake_db, monkeypatch):
+    monkeypatch.setattr(reference_cache, "_entries", {})
+    monkeypatch.setattr(provisioning, "CHUNK_SIZE", 2)
+    changed = []
+    monkeypatch.setattr(provisioning.user_search, "changed", changed.append)
+    ids = {}
+
+    def handler(query, params):
+        if query.startswith("SELECT department_id, name"):
+            return [{"department_id": 1, "name": "CS", "faculty_name": "F", "budget_code": "B", "head_of_department": None}]
+        if query.startswith("SELECT email FROM Users"):
+            return [(e,) for e in params if e == "taken@itu.edu.tr"]
+        if query.startswith("INSERT INTO Users"):
+            for email in params[1::4]:
+                ids.setdefault(email, 100 + len(ids))
+            return len(params) // 4
+        if query.startswith("SELECT user_id, email FROM Users"):
+            return [(ids[e], e) for e in params]
+        return []
+    fake_db.handler = handler
+    return changed
+
+
+def _import(client, headers, text):
+    return client.post("/users/bulk-import", files={"file": ("users.csv", text.encode(), "text/csv")}, headers=headers)
+
+
+def test_rows_are_validated_and_inserted_per_chunk(client, fake_db, auth_header, directory):
+    text = HEADER + "".join([
+        "A,a@itu.edu.tr,pw,Student,1\n",
+        "B,taken@itu.edu.tr,pw,Student,1\n",
+        "C,c@itu.edu.tr,pw,Student,9\n",
+        "D,d@itu.edu.tr,pw,Instructor,1\n",
+        "E,a@itu.edu.tr,pw,Student,1\n",
+    ])
+    r = _import(client, auth_header(1, "Admin"), text)
+    assert r.status_code == 200
+    report = r.json()
+    assert (report["total"], report["created"], report["failed"]) == (5, 2, 3)
+    assert [(e["line"], e["error"]) for e in report["errors"]] == [
+        (3, "Email already exists"), (4, "Invalid department_id"), (6, "Duplicate email in file")
+    ]
+    assert directory == [100, 101]
+    assert len(fake_db.queries("INSERT INTO Users")) == 2
+    assert len(fake_db.queries("COMMIT")) == 2
+
+
+def test_unreadable_csv_is_a_bad_request_after_earlier_chunks_commit(client, fake_db, auth_header, directory):
+    text = HEADER + "A,a@itu.edu.tr,pw,Student,1\nB,b@itu.edu.tr,pw,Student,1\nC,c@itu.edu.tr,pw," + "x" * 200_000 + "\n"
+    r = _import(client, auth_header(1, "Admin"), text)
+    assert r.status_code == 400
+    assert r.json()["detail"].startswith("Unreadable CSV after line 3")
+    assert r.json()["detail"].endswith("2 users from earlier lines were created")
+    # The committed chunk is already searchable.
+    assert directory == [100, 101]
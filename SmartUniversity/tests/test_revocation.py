@@ -0,0 +1,98 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+from src import revocation as revocation_module
+from src.revocation import RevocationList
+from src.routers.auth import create_token_pair
+from src.shared_state import SharedLog
+
+
+def _workers(count=2):
+    name = f"revocations-{uuid.uuid4().hex}"
+    workers = [RevocationList(SharedLog(name)) for _ in range(count)]
+    for worker in workers:
+        worker._log.skip_to_end()
+    return workers
+
+
+def _payload(jti="a", user_id=4, iat=None):
+    return {"jti": jti, "user_id": user_id, "iat": time.time() if iat is None else iat}
+
+
+def test_revocations_reach_other_workers(monkeypatch):
+    monkeypatch.setattr(revocation_module, "SYNC_INTERVAL_SECONDS", 0.0)
+    a, b = _workers()
+    old = _payload("old", iat=time.time() - 10)
+
+    a.revoke_token("t1", time.time() + 60)
+    a.revoke_user(4, 60)
+    assert b.is_revoked(_payload("t1", user_id=5))
+    assert b.is_revoked(old)
+    assert not b.is_revoked(_payload("new", iat=time.time() + 1))
+
+
+def test_expired_entries_are_ignored():
+    [a] = _workers(1)
+    a.revoke_token("t1", time.time() - 1)
+    assert not a.is_revoked(_payload("t1", user_id=5))
+
+
+def test_only_one_worker_claims_a_token():
+    workers = _workers(4)
+    expires = time.time() + 60
+    results = []
+    barrier = threading.Barrier(len(workers))
+
+    def claim(worker):
+        barrier.wait()
+        results.append(worker.claim_token("refresh-1", expires))
+
+    threads = [threading.Thread(target=claim, args=(w,)) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(results) == [False, False, False, True]
+
+
+def test_compaction_keeps_live_entries_for_every_reader(monkeypatch):
+    monkeypatch.setattr(revocation_module, "COMPACT_MIN_BYTES", 64)
+    monkeypatch.setattr(revocation_module, "SYNC_INTERVAL_SECONDS", 0.0)
+    a, b = _workers()
+    for i in range(20):
+        a.revoke_token(f"gone-{i}", time.time() + 0.05)
+    a.revoke_token("live", time.time() + 60)
+    grown = a._log.size()
+    time.sleep(0.1)
+
+    a._prune()
+    assert a._log.size() < grown
+    assert b.is_revoked(_payload("live", user_id=5))
+    assert not b.is_revoked(_payload("gone-0", user_id=5))
+
+
+@pytest.fixture
+def active_user(fake_db):
+    fake_db.handler = lambda q, p: [{"role": "Student"}] if q.startswith("SELECT role FROM Users") else []
+    return fake_db
+
+
+def test_refresh_tokens_are_single_use(client, active_user):
+    pair = create_token_pair(4, "Student")
+    r = client.post("/auth/refresh", json={"refresh_token": pair["refresh_token"]})
+    assert r.status_code == 200
+    assert client.post("/auth/refresh", json={"refresh_token": pair["refresh_token"]}).status_code == 401
+
+    rotated = r.json()["refresh_token"]
+    assert client.post("/auth/refresh", json={"refresh_token": rotated}).status_code == 200
+
+
+def test_logout_revokes_both_tokens(client, active_user):
+    pair = create_token_pair(4, "Student")
+    headers = {"Authorization": f"Bearer {pair['access_token']}"}
+    assert client.post("/auth/logout", json={"refresh_token": pair["refresh_token"]}, headers=headers).status_code == 200
+    assert client.get("/users/me", headers=headers).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": pair["refresh_token"]}).status_code == 401
@@ -0,0 +1,113 @@
+import os
+import random
+import time
+
+import pytest
+
+from src import blob_store, similarity
+from src.jobs import get_job
+
+WORDS = [f"w{i}" for i in range(5000)]
+
+
+class NoProgress:
+    def update(self, done, total=None):
+        pass
+
+
+def _essay(rng, n=300):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+@pytest.fixture
+def assignment(fake_db):
+    state = {"description": "", "texts": {}, "signatures": {}}
+
+    def handler(query, params):
+        if query.startswith("SELECT description FROM Assignments"):
+            return [{"description": state["description"]}]
+        if query.startswith("SELECT s.submission_id, s.assignment_id, s.submission_text"):
+            return [
+                {"submission_id": i, "assignment_id": 1, "submission_text": text, "file_path": None}
+                for i, text in state["texts"].items() if i not in state["signatures"]
+            ]
+        if query.startswith("INSERT INTO Submission_Signatures"):
+            state["signatures"][params[0]] = params[3]
+            return 1
+        if query.startswith("SELECT ss.submission_id, s.student_id"):
+            return [
+                {"submission_id": i, "student_id": i, "full_name": f"Student {i}", "signature": sig}
+                for i, sig in state["signatures"].items() if sig is not None
+            ]
+        return []
+    fake_db.handler = handler
+    return state
+
+
+def _pairs(report):
+    return {(p["submission_a"], p["submission_b"]) for p in report["pairs"]}
+
+
+def test_near_identical_texts_pair_and_unrelated_do_not(assignment):
+    rng = random.Random(1)
+    original = _essay(rng).split()
+    copy = list(original)
+    for i in (40, 150, 260):
+        copy[i] = "changed"
+    assignment["texts"] = {1: " ".join(original), 2: " ".join(copy), 3: _essay(rng), 4: _essay(rng)}
+
+    report = similarity.find_similar(NoProgress(), 1)
+    assert _pairs(report) == {(1, 2)}
+    assert report["pairs"][0]["similarity"] >= 0.8
+
+
+def test_template_text_alone_does_not_pair(assignment):
+    rng = random.Random(2)
+    template = _essay(rng, 1000)
+    assignment["description"] = template
+    assignment["texts"] = {i: template + " " + _essay(rng, 100) for i in range(1, 6)}
+    assignment["texts"][6] = assignment["texts"][5] + " extra words at the end"
+
+    assert _pairs(similarity.find_similar(NoProgress(), 1)) == {(5, 6)}
+
+
+def test_large_buckets_are_still_compared(assignment):
+    rng = random.Random(3)
+    essay = _essay(rng)
+    assignment["texts"] = {i: essay for i in range(1, 211)}
+    assignment["texts"][211] = _essay(rng)
+
+    pairs = _pairs(similarity.find_similar(NoProgress(), 1))
+    assert len(pairs) == 210 * 209 // 2
+    assert not any(211 in pair for pair in pairs)
+
+
+def test_template_shingles_are_removed_from_the_signature():
+    rng = random.Random(4)
+    template, own = _essay(rng, 200), _essay(rng, 50)
+    shingles = similarity._shingles(template)
+    assert similarity.signature(template + " " + own, shingles)[1] < len(similarity._shingles(template + " " + own))
+    assert similarity.signature(template, shingles) == (None, 0)
+
+
+def test_unreadable_files_fall_back_to_the_text():
+    directory = os.path.join(blob_store.UPLOAD_DIR, "a-directory")
+    os.makedirs(directory, exist_ok=True)
+    row = {"submission_text": "typed answer", "file_path": directory}
+    assert similarity._submission_text(row) == "typed answer"
+
+
+def test_only_the_sections_instructor_reads_a_scan(client, fake_db, auth_header):
+    fake_db.handler = lambda q, p: (
+        [{"due_date": None, "max_score": 100, "instructor_id": 2}] if q.startswith("SELECT a.due_date, a.max_score") else []
+    )
+    r = client.post("/submissions/assignment/1/similarity", headers=auth_header(2, "Instructor"))
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+
+    deadline = time.monotonic() + 5
+    while get_job(job_id)["status"] == "running" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert client.get(f"/submissions/similarity/{job_id}", headers=auth_header(2, "Instructor")).json()["status"] == "finished"
+    assert client.get(f"/submissions/similarity/{job_id}", headers=auth_header(3, "Instructor")).status_code == 403
+    assert client.get(f"/submissions/similarity/{job_id}", headers=auth_header(1, "Admin")).status_code == 200
@@ -0,0 +1,58 @@
+import csv
+import io
+import os
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from src import blob_store
+from src.submission_export import stream_zip
+
+DIGEST = "e" * 64
+
+
+@pytest.fixture
+def stored_blob(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_DIR", str(tmp_path / "blobs"))
+    path = blob_store.blob_file(DIGEST)
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"report")
+    return path
+
+
+def _row(student_id, file_path, text=None, name="Ömer Atmaca"):
+    return {
+        "student_id": student_id, "full_name": name, "submission_text": text, "file_path": file_path,
+        "submission_date": datetime(2024, 11, 1, 12), "due_date": datetime(2024, 11, 1, 10)
+    }
+
+
+def _archive(rows):
+    return zipfile.ZipFile(io.BytesIO(b"".join(stream_zip(rows))))
+
+
+def test_exports_blobs_and_skips_paths_outside_the_upload_area(stored_blob):
+    archive = _archive([
+        _row(4, f"sha256:{DIGEST}/report.pdf", text="see attached"),
+        _row(5, "/etc/passwd"),
+        _row(6, "../../etc/hostname"),
+        _row(7, None, text="inline only"),
+    ])
+
+    assert archive.read("4_Ömer_Atmaca/report.pdf") == b"report"
+    assert archive.read("4_Ömer_Atmaca/submission.txt") == b"see attached"
+    assert not any("passwd" in n or "hostname" in n for n in archive.namelist() if n != "manifest.csv")
+
+    manifest = list(csv.DictReader(io.StringIO(archive.read("manifest.csv").decode())))
+    assert [(m["student_id"], m["status"], m["late"]) for m in manifest] == [
+        ("4", "ok", "True"), ("5", "missing", "True"), ("6", "missing", "True"), ("7", "no file", "True")
+    ]
+
+
+def test_a_missing_blob_does_not_stop_the_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_DIR", str(tmp_path / "blobs"))
+    archive = _archive([_row(4, f"sha256:{DIGEST}/report.pdf"), _row(5, None, text="x")])
+    assert archive.read("5_Ömer_Atmaca/submission.txt") == b"x"
+    assert "4_Ömer_Atmaca/report.pdf" not in archive.namelist()
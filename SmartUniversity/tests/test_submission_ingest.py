@@ -0,0 +1,139 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import mysql.connector
+import pytest
+from fastapi import HTTPException
+
+from src import submission_ingest as ingest
+
+
+@pytest.fixture
+def log_dir(tmp_path, monkeypatch):
+    receipts = tmp_path / "receipts"
+    receipts.mkdir()
+    monkeypatch.setattr(ingest, "RECEIPT_DIR", str(receipts))
+    monkeypatch.setattr(ingest, "LOG_PATH", str(tmp_path / "submissions.log"))
+    monkeypatch.setattr(ingest, "OFFSET_PATH", str(tmp_path / "submissions.offset"))
+    monkeypatch.setattr(ingest, "_writer", None)
+    return tmp_path
+
+
+class Database:
+    # Assignment 1 is open and student 4, 5 and 6 take it; student 6
+    # already submitted. Rows in `racing` were inserted by someone else after
+    # the duplicate check.
+    def __init__(self, refuse_batch=False, racing=()):
+        self.refuse_batch = refuse_batch
+        self.racing = set(racing)
+        self.existing = {(1, 6): (60, datetime(2024, 1, 1))}
+        self.next_id = 100
+
+    def __call__(self, query, params):
+        if query.startswith("SELECT assignment_id, due_date FROM Assignments"):
+            return [(1, datetime.now() + timedelta(days=1))]
+        if query.startswith("SELECT a.assignment_id, e.student_id"):
+            return [(1, 4), (1, 5), (1, 6)]
+        if query.startswith("SELECT assignment_id, student_id, submission_id"):
+            pairs = set(zip(params[::2], params[1::2]))
+            return [(a, s, *v[:1 + query.count("submission_date")]) for (a, s), v in self.existing.items() if (a, s) in pairs]
+        if query.startswith("INSERT INTO Submissions"):
+            rows = [params[i:i + 5] for i in range(0, len(params), 5)]
+            if self.refuse_batch and len(rows) > 1:
+                raise mysql.connector.DataError(msg="Data too long for column")
+            if any((a, s) in self.racing for s, a, *_ in rows):
+                raise mysql.connector.IntegrityError(msg="Duplicate entry for key 'assignment_id'")
+            for student_id, assignment_id, *_ in rows:
+                self.next_id += 1
+                self.existing[(assignment_id, student_id)] = (self.next_id, None)
+            return len(rows)
+        return []
+
+
+def _receipt(receipt):
+    return ingest.get_receipt(receipt["receipt_id"])
+
+
+def test_append_rejects_what_the_table_cannot_hold(log_dir):
+    with pytest.raises(HTTPException) as e:
+        ingest.append(4, 1, None, "x" * (ingest.MAX_FILE_PATH_CHARS + 1))
+    assert e.value.status_code == 400
+    with pytest.raises(HTTPException):
+        ingest.append(4, 1, "ş" * (ingest.MAX_TEXT_BYTES // 2 + 1), None)
+    assert not os.path.exists(ingest.LOG_PATH)
+
+
+def test_drain_stores_a_batch_and_writes_receipts(log_dir, fake_db):
+    fake_db.handler = Database()
+    accepted = ingest.append(4, 1, "answer", None)
+    duplicate = ingest.append(6, 1, "again", None)
+    unknown = ingest.append(4, 2, "wrong assignment", None)
+    not_enrolled = ingest.append(7, 1, "hello", None)
+
+    assert ingest.drain() == 1
+    assert _receipt(accepted)["status"] == "accepted"
+    assert _receipt(accepted)["submission_id"] == 101
+    assert _receipt(duplicate)["error"] == "Already submitted"
+    assert _receipt(unknown)["error"] == "Assignment not found"
+    assert _receipt(not_enrolled)["error"] == "Not enrolled in this course"
+    # Everything was processed, so the log starts over.
+    assert os.path.getsize(ingest.LOG_PATH) == 0
+    assert ingest._read_offset() == 0
+
+
+def test_a_refused_batch_falls_back_to_one_row_at_a_time(log_dir, fake_db):
+    fake_db.handler = Database(refuse_batch=True, racing=[(1, 5)])
+    first = ingest.append(4, 1, "answer", None)
+    second = ingest.append(5, 1, "answer", None)
+
+    assert ingest.drain() == 1
+    assert _receipt(first)["status"] == "accepted"
+    assert (_receipt(second)["status"], _receipt(second)["error"]) == ("rejected", "Already submitted")
+    assert fake_db.queries("COMMIT")
+
+
+def test_an_unreadable_record_does_not_stall_the_log(log_dir, fake_db):
+    fake_db.handler = Database()
+    before = ingest.append(4, 1, "answer", None)
+    with open(ingest.LOG_PATH, "ab") as f:
+        f.write(b'{"not": "a record"}\n')
+        f.write(b"garbage\n")
+    after = ingest.append(5, 1, "answer", None)
+
+    assert ingest.drain() == 2
+    assert _receipt(before)["status"] == _receipt(after)["status"] == "accepted"
+
+
+def test_a_partial_line_waits_for_its_newline(log_dir, fake_db):
+    fake_db.handler = Database()
+    ingest.append(4, 1, "answer", None)
+    with open(ingest.LOG_PATH, "ab") as f:
+        f.write(b'{"receipt_id": "half')
+
+    assert ingest.drain() == 1
+    assert ingest._read_offset() == os.path.getsize(ingest.LOG_PATH) - len(b'{"receipt_id": "half')
+
+
+def test_a_replay_finds_its_own_row(log_dir, fake_db):
+    db = Database()
+    fake_db.handler = db
+    receipt = ingest.append(4, 1, "answer", None)
+    db.existing[(1, 4)] = (77, datetime.fromisoformat(receipt["received_at"]))
+
+    assert ingest.drain() == 1
+    assert _receipt(receipt)["submission_id"] == 77
+    assert not fake_db.queries("INSERT INTO Submissions")
+
+
+def test_old_receipts_expire(log_dir):
+    old = os.path.join(ingest.RECEIPT_DIR, "old.json")
+    new = os.path.join(ingest.RECEIPT_DIR, "new.json")
+    for path in (old, new):
+        with open(path, "w") as f:
+            f.write("{}")
+    stamp = time.time() - ingest.RECEIPT_TTL_SECONDS - 60
+    os.utime(old, (stamp, stamp))
+
+    assert ingest.expire_receipts() == 1
+    assert not os.path.exists(old) and os.path.exists(new)
@@ -0,0 +1,86 @@
+import io
+import os
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from src import uploads
+
+
+@pytest.fixture
+def partial_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "PARTIAL_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def limited():
+    app = FastAPI()
+    bodies = []
+
+    @app.post("/up")
+    async def up(request: Request):
+        bodies.append(await request.body())
+        return {"size": len(bodies[-1])}
+
+    middleware = uploads.UploadLimitMiddleware(app, ["/up"])
+    middleware.limit = 10
+    return TestClient(middleware, raise_server_exceptions=False), bodies
+
+
+def test_declared_length_over_the_limit_is_refused_before_reading(limited):
+    client, bodies = limited
+    r = client.post("/up", content=b"x" * 11)
+    assert r.status_code == 413
+    assert not bodies
+    assert client.post("/up", content=b"x" * 10).json() == {"size": 10}
+
+
+def test_streamed_body_is_cut_off_at_the_limit(limited):
+    client, bodies = limited
+
+    def chunks():
+        # No Content-Length: the body arrives chunked.
+        for _ in range(5):
+            yield b"xxxx"
+
+    r = client.post("/up", content=chunks())
+    assert r.status_code == 413
+    assert not bodies
+
+
+def test_save_stream_stops_at_the_limit_and_leaves_nothing(partial_dir, monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 10)
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_BYTES", 4)
+    with pytest.raises(HTTPException) as e:
+        uploads.save_stream(io.BytesIO(b"x" * 11))
+    assert e.value.status_code == 413
+    assert not os.listdir(partial_dir)
+
+    path, size, digest = uploads.save_stream(io.BytesIO(b"x" * 10))
+    assert (os.path.dirname(path), size) == (str(partial_dir), 10)
+
+
+def _age(path, seconds):
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_expire_partials_keeps_sessions_that_still_receive_chunks(partial_dir):
+    old = uploads.PARTIAL_TTL_SECONDS + 60
+    active = uploads.create_session(4, 1, "a.pdf", 100)
+    abandoned = uploads.create_session(4, 1, "b.pdf", 100)
+    active_meta, active_part = uploads.session_files(active["upload_id"])
+    abandoned_meta, abandoned_part = uploads.session_files(abandoned["upload_id"])
+    # The metadata is never rewritten, only the .part file grows.
+    _age(active_meta, old)
+    _age(abandoned_meta, old)
+    _age(abandoned_part, old)
+    stale_tmp = partial_dir / "crashed.tmp"
+    stale_tmp.write_bytes(b"x")
+    _age(stale_tmp, old)
+
+    assert uploads.expire_partials() == 3
+    assert sorted(os.listdir(partial_dir)) == sorted(os.path.basename(p) for p in (active_meta, active_part))
@@ -0,0 +1,124 @@
+import pytest
+
+from src import user_search as search_module
+from src.shared_state import SharedLog
+from src.transcript_cache import TranscriptCache
+from src.user_search import UserSearchIndex
+
+
+class Users:
+    def __init__(self, count):
+        self.rows = {
+            i: {"user_id": i, "full_name": f"Student {i:05d} Name", "email": f"s{i}@itu.edu.tr",
+                "role": "Student", "created_at": None}
+            for i in range(1, count + 1)
+        }
+        self.full_loads = 0
+
+    def __call__(self, query, params):
+        if "user_id IN" in query:
+            return [self.rows[i] for i in params if i in self.rows]
+        if query.startswith("SELECT user_id, full_name, email, role, created_at FROM Users"):
+            self.full_loads += 1
+            return list(self.rows.values())
+        return []
+
+
+class CountingGrams(dict):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.reads = 0
+
+    def __getitem__(self, key):
+        self.reads += 1
+        return super().__getitem__(key)
+
+
+@pytest.fixture
+def users(fake_db):
+    users = Users(3000)
+    users.rows[4242] = {"user_id": 4242, "full_name": "Zeynep Çelik", "email": "zeynep@itu.edu.tr",
+                        "role": "Student", "created_at": None}
+    fake_db.handler = users
+    return users
+
+
+def test_finds_a_rare_name_among_many_similar_users(users):
+    index = UserSearchIndex()
+    assert [r["user_id"] for r in index.search("zeyn celik")][:1] == [4242]
+
+
+def test_work_per_search_is_capped(users, monkeypatch):
+    monkeypatch.setattr(search_module, "MAX_CANDIDATES", 100)
+    index = UserSearchIndex()
+    index.search("warm up")
+    index._doc_grams = CountingGrams(index._doc_grams)
+
+    # Every user shares the domain grams; the rare "zeynep" grams decide.
+    assert index.search("zeynep itu edu tr")[0]["user_id"] == 4242
+    assert index._doc_grams.reads <= 100
+
+    # Only common grams: the scan stops at the cap instead of touching everyone.
+    index._doc_grams.reads = 0
+    assert len(index.search("itu edu", limit=500)) == 100
+    assert index._doc_grams.reads == 100
+
+
+def test_small_tables_still_rank_every_match(fake_db):
+    fake_db.handler = Users(50)
+    index = UserSearchIndex()
+    assert len(index.search("student", limit=100)) == 50
+
+
+def test_changes_reach_other_workers_and_the_log_is_compacted(users, monkeypatch):
+    monkeypatch.setattr(search_module, "COMPACT_MIN_BYTES", 64)
+    a, b = UserSearchIndex(), UserSearchIndex()
+    a.search("x"), b.search("x")
+    assert users.full_loads == 2
+
+    users.rows[7] = {**users.rows[7], "full_name": "Ali Veli"}
+    for _ in range(50):
+        a.changed(7)
+    assert a._log.size() >= 64
+    assert a.search("ali veli")[0]["user_id"] == 7
+    assert a._log.size() < 64
+    assert users.full_loads == 2
+
+    # b never saw the lines a dropped, so it rebuilds from the database.
+    assert b.search("ali veli")[0]["user_id"] == 7
+    assert users.full_loads == 3
+
+
+def test_list_users_pages_only_when_asked(client, fake_db, auth_header):
+    admin = auth_header(1, "Admin")
+    client.get("/users/", headers=admin)
+    client.get("/users/?limit=10", headers=admin)
+    client.get("/users/?offset=100", headers=admin)
+    queries = [(q, p) for q, p in fake_db.log if q.startswith("SELECT user_id, full_name")]
+    assert [q.endswith("LIMIT %s OFFSET %s") for q, _ in queries] == [False, True, True]
+    assert [p for _, p in queries] == [[], [10, 0], [50, 100]]
+
+
+def test_compacted_log_tells_readers_they_may_have_missed_lines():
+    writer, reader = SharedLog("compaction-test"), SharedLog("compaction-test")
+    writer.append("1")
+    assert reader.poll() == (["1"], False)
+    writer.append("2")
+    writer.compact(lambda line: line == "3")
+    writer.append("3")
+    assert reader.poll() == (["3"], True)
+    assert reader.poll() == ([], False)
+
+
+def test_transcript_cache_drops_everything_after_a_compaction(monkeypatch):
+    from src import transcript_cache as module
+    monkeypatch.setattr(module, "COMPACT_MIN_BYTES", 32)
+    a, b = TranscriptCache(100), TranscriptCache(100)
+    assert b.get(1, lambda: ["old"]) == ["old"]
+    assert b.get(2, lambda: ["kept?"]) == ["kept?"]
+    for _ in range(20):
+        a.invalidate(3)
+    assert a._log.size() >= 32
+    a.get(3, lambda: [])
+    assert a._log.size() < 32
+    assert b.get(2, lambda: ["reloaded"]) == ["reloaded"]